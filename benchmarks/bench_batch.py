@@ -0,0 +1,68 @@
+"""
+Operations per second of one request per operation vs the transactional batch.
+
+Each round creates ``size`` contacts, updates them and deletes them.
+
+    python -m benchmarks.bench_batch
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from benchmarks.common import create_schema, seed, session_maker, sqlite_url
+from src.repository import contacts as repository_contacts
+from src.schemas.contacts import BatchOperation, ContactModel
+
+
+def body(i: int) -> ContactModel:
+    return ContactModel(firstname="Olena", lastname=f"Batch{i}", email=f"olena.{i}@batch.example",
+                        mobilenamber="+380501112233", databirthday=date(1990, 5, 17), note="bench")
+
+
+async def single(Session, user, size: int):
+    ids = []
+    for i in range(size):
+        async with Session() as db:
+            ids.append((await repository_contacts.create_contact(body(i), db, user)).id)
+    for i, contact_id in enumerate(ids):
+        async with Session() as db:
+            await repository_contacts.update_contact(contact_id, body(i), db, user)
+    for contact_id in ids:
+        async with Session() as db:
+            await repository_contacts.remove_contact(contact_id, db, user)
+
+
+async def batched(Session, user, size: int):
+    async with Session() as db:
+        creates = [BatchOperation(op="create", contact=body(i)) for i in range(size)]
+        ids = [result.id for result in await repository_contacts.batch_contacts(creates, db, user)]
+    async with Session() as db:
+        operations = [BatchOperation(op="update", id=contact_id, contact=body(i)) for i, contact_id in enumerate(ids)]
+        await repository_contacts.batch_contacts(operations, db, user)
+    async with Session() as db:
+        operations = [BatchOperation(op="delete", id=contact_id) for contact_id in ids]
+        await repository_contacts.batch_contacts(operations, db, user)
+
+
+async def main(contacts: int):
+    engine = await create_schema(sqlite_url())
+    user = await seed(engine, contacts)
+    Session = session_maker(engine)
+
+    print(f"{'size':>6} {'single ops/s':>14} {'batch ops/s':>13}")
+    for size in (1, 10, 100, 1000):
+        rates = []
+        for fn in (single, batched):
+            start = time.perf_counter()
+            await fn(Session, user, size)
+            rates.append(3 * size / (time.perf_counter() - start))
+        print(f"{size:>6} {rates[0]:>14.0f} {rates[1]:>13.0f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contacts", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.contacts))
@@ -0,0 +1,91 @@
+"""
+Polling clients with and without ``If-None-Match``: bytes on the wire and server CPU
+per poll of ``GET /api/contacts/`` and ``GET /api/users/me`` when nothing changed.
+
+    python -m benchmarks.bench_conditional_get --contacts 100 --polls 500
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi_limiter import FastAPILimiter
+
+from benchmarks.common import create_schema, seed, session_maker, sqlite_url
+from main import app
+from src.database.db import get_db, get_read_db
+from src.entity.snapshot import UserSnapshot
+from src.services.auth import auth_service
+from src.services.response_cache import ResponseCache, get_response_cache
+from tests.memory_redis import MemoryRedis
+
+
+def wire_bytes(response: httpx.Response) -> int:
+    status_line = len(f"HTTP/1.1 {response.status_code} {response.reason_phrase}\r\n")
+    headers = sum(len(name) + len(value) + 4 for name, value in response.headers.raw)
+    return status_line + headers + 2 + len(response.content)
+
+
+async def poll(client: httpx.AsyncClient, url: str, polls: int, conditional: bool, before=None) -> tuple[float, float]:
+    headers = {}
+    if conditional:
+        headers["If-None-Match"] = (await client.get(url)).headers["etag"]
+    total = 0
+    start = time.process_time()
+    for _ in range(polls):
+        if before is not None:
+            await before()
+        response = await client.get(url, headers=headers)
+        assert response.status_code == (304 if conditional else 200), response.status_code
+        total += wire_bytes(response)
+    return total / polls, (time.process_time() - start) / polls * 1e6
+
+
+async def main(contacts: int, polls: int):
+    engine = await create_schema(sqlite_url())
+    user = await seed(engine, contacts)
+    session = session_maker(engine)
+    cache = ResponseCache(MemoryRedis(), ttl=300, max_bytes=1 << 24)
+    snapshot = UserSnapshot.from_user(user)
+
+    async def override_get_db():
+        async with session() as db:
+            yield db
+
+    async def current_user():
+        return snapshot
+
+    async def identifier(request):
+        return "bench"
+
+    app.dependency_overrides.update({get_db: override_get_db, get_read_db: override_get_db,
+                                     get_response_cache: lambda: cache,
+                                     auth_service.get_current_user: current_user})
+    FastAPILimiter.redis, FastAPILimiter.identifier, FastAPILimiter.lua_sha = MemoryRedis(), identifier, "bench"
+
+    async def cold():
+        await cache.invalidate(user.id)
+
+    contacts_url = f"/api/contacts/?limit={min(max(contacts, 10), 500)}"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {
+            "contacts, no cache": await poll(client, contacts_url, polls, False, before=cold),
+            "contacts, cached body": await poll(client, contacts_url, polls, False),
+            "contacts, If-None-Match": await poll(client, contacts_url, polls, True),
+            "users/me": await poll(client, "/api/users/me", polls, False),
+            "users/me, If-None-Match": await poll(client, "/api/users/me", polls, True),
+        }
+    await engine.dispose()
+
+    print(f"{'poll':>26} {'bytes/poll':>11} {'cpu us/poll':>12}")
+    for name, (size, cpu) in results.items():
+        print(f"{name:>26} {size:>11.0f} {cpu:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contacts", type=int, default=100)
+    parser.add_argument("--polls", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.contacts, args.polls))
@@ -0,0 +1,67 @@
+"""
+Latency and allocations of a contacts page read as ORM contacts vs response rows,
+with the orjson serialization the routes do on top.
+
+Every read runs in a fresh session, as a request does, so ORM contacts are always
+built from scratch: identity map entries, instance state and the joined user.
+
+    python -m benchmarks.bench_core_rows --contacts 20000 --pages 100 500 2000
+"""
+import argparse
+import asyncio
+import tracemalloc
+
+from benchmarks.common import create_schema, seed, session_maker, sqlite_url, timed
+from src.repository import contacts as repository_contacts
+from src.services.fast_json import dump_contacts
+
+# name: (ORM read, row read, call with the session, owner and page size)
+READS = {
+    "list": (repository_contacts.get_contacts, repository_contacts.get_contact_rows,
+             lambda read, db, user, limit: read(limit, 0, db, user)),
+    "birthday": (repository_contacts.get_contact_birthday, repository_contacts.get_contact_birthday_rows,
+                 lambda read, db, user, limit: read(0, limit, db, user, days=365)),
+}
+
+
+async def peak_kib(fn) -> float:
+    tracemalloc.start()
+    try:
+        await fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+async def main(contacts: int, pages: list, repeat: int):
+    engine = await create_schema(sqlite_url())
+    user = await seed(engine, contacts)
+    Session = session_maker(engine)
+
+    def page(call, read, limit):
+        async def run():
+            async with Session() as db:
+                result = await call(read, db, user, limit)
+                assert len(result) == limit, "not enough contacts for the page"
+                return dump_contacts(result)
+        return run
+
+    print(f"{'read':>9} {'page':>6} {'orm ms':>8} {'rows ms':>8} {'speedup':>8} {'orm KiB':>9} {'rows KiB':>9}")
+    for name, (orm_read, row_read, call) in READS.items():
+        for limit in pages:
+            orm, rows = page(call, orm_read, limit), page(call, row_read, limit)
+            assert await orm() == await rows(), "ORM and row reads disagree"
+            orm_stats, row_stats = await timed(orm, repeat), await timed(rows, repeat)
+            orm_kib, row_kib = await peak_kib(orm), await peak_kib(rows)
+            print(f"{name:>9} {limit:>6} {orm_stats['mean_ms']:>8} {row_stats['mean_ms']:>8} "
+                  f"{orm_stats['mean_ms'] / row_stats['mean_ms']:>7.1f}x {orm_kib:>9.0f} {row_kib:>9.0f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contacts", type=int, default=20_000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.contacts, args.pages, args.repeat))
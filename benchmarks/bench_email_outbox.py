@@ -0,0 +1,70 @@
+"""
+Email throughput: one SMTP connection per message, like the former background task,
+vs the outbox worker sending batches over pooled connections. Both talk to the local
+SMTP sink, ``--latency`` delays every server reply like a remote mail server would.
+
+    python -m benchmarks.bench_email_outbox --messages 500 --latency 0.005
+"""
+import argparse
+import asyncio
+import time
+
+import aiosmtplib
+from sqlalchemy import func, select
+
+from benchmarks.common import create_schema, session_maker, sqlite_url
+from benchmarks.smtp_sink import SMTPSink
+from src.entity.models import EmailOutbox
+from src.services.email import build_message, send_email
+from src.services.email_worker import EmailWorker, SMTPPool
+
+
+async def connection_per_message(sink: SMTPSink, messages: list[EmailOutbox]) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        await aiosmtplib.send(build_message(message), hostname=sink.host, port=sink.port)
+    return time.perf_counter() - start
+
+
+async def outbox_worker(sink: SMTPSink, count: int, pool_size: int, batch_size: int) -> tuple[float, int]:
+    engine = await create_schema(sqlite_url("outbox.db"))
+    session = session_maker(engine)
+    async with session() as db:
+        for number in range(count):
+            await send_email(f"user{number}@example.com", f"user{number}", "http://localhost:8000/", db)
+    pool = SMTPPool(sink.host, sink.port, size=pool_size)
+    worker = EmailWorker(pool, batch_size=batch_size, session=session)
+    start = time.perf_counter()
+    while await worker.run_once():
+        pass
+    elapsed = time.perf_counter() - start
+    await pool.close()
+    async with session() as db:
+        sent = await db.scalar(select(func.count()).where(EmailOutbox.status == "sent"))
+    await engine.dispose()
+    assert sent == count, sent
+    return elapsed, pool.opened
+
+
+async def main(count: int, latency: float, pool_size: int, batch_size: int):
+    async with SMTPSink(latency=latency) as sink:
+        messages = [EmailOutbox(id=number, kind="verify", recipient=f"user{number}@example.com",
+                                username=f"user{number}", host="http://localhost:8000/", payload=None)
+                    for number in range(count)]
+        direct = await connection_per_message(sink, messages)
+        direct_connections = sink.connections
+        pooled, pooled_connections = await outbox_worker(sink, count, pool_size, batch_size)
+
+    print(f"{'sender':>24} {'msg/s':>8} {'connections':>12}")
+    print(f"{'connection per message':>24} {count / direct:>8.0f} {direct_connections:>12}")
+    print(f"{'outbox worker':>24} {count / pooled:>8.0f} {pooled_connections:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds every SMTP reply is delayed")
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.latency, args.pool_size, args.batch_size))
@@ -0,0 +1,55 @@
+"""
+Peak Python memory of a full export, materialized list vs streamed from a server-side cursor.
+
+    python -m benchmarks.bench_export --contacts 100000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from sqlalchemy import select
+
+from benchmarks.common import create_schema, seed, session_maker, sqlite_url
+from src.entity.models import Contact
+from src.schemas.contacts import ContactResponse
+from src.services import contact_export
+
+
+async def materialized(db, user):
+    contacts = (await db.execute(select(Contact).filter_by(user_id=user.id))).scalars().all()
+    return sum(len(ContactResponse.model_validate(contact, from_attributes=True).model_dump_json()) for contact in contacts)
+
+
+async def streamed(db, user):
+    return sum([len(chunk) async for chunk in contact_export.export_contacts("ndjson", db, user)])
+
+
+async def measure(fn, Session, user):
+    async with Session() as db:
+        tracemalloc.start()
+        started = time.perf_counter()
+        size = await fn(db, user)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return size, elapsed, peak
+
+
+async def main(contacts: int):
+    engine = await create_schema(sqlite_url())
+    user = await seed(engine, contacts)
+    Session = session_maker(engine)
+
+    print(f"{'mode':>14} {'bytes':>12} {'seconds':>9} {'peak MiB':>10}")
+    for name, fn in (("materialized", materialized), ("streamed", streamed)):
+        size, elapsed, peak = await measure(fn, Session, user)
+        print(f"{name:>14} {size:>12} {elapsed:>9.2f} {peak / 2**20:>10.1f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contacts", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.contacts))
@@ -0,0 +1,89 @@
+"""
+Cost per request of the log calls on the request path: ``print`` vs a synchronous
+``StreamHandler`` vs the queue based JSON logging, all writing to a file.
+
+    python -m benchmarks.bench_logging --requests 50000
+"""
+import argparse
+import logging
+import tempfile
+import time
+
+from src.config.config import config
+from src.config.log import JsonFormatter, setup_logging, stop_logging
+
+# records written per request, like the user lookup and the role check used to print
+PER_REQUEST = 2
+
+
+class SlowStream:
+    """
+    File whose writes block for a while, like stdout piped to a busy log collector.
+    """
+
+    def __init__(self, output, delay: float):
+        self.output = output
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        time.sleep(self.delay)
+        return self.output.write(text)
+
+    def flush(self):
+        self.output.flush()
+
+
+def per_request_us(fn, requests: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        fn(i)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main(requests: int, delay: float):
+    output = SlowStream(tempfile.TemporaryFile("w"), delay) if delay else tempfile.TemporaryFile("w")
+    logger = logging.getLogger("bench.request")
+
+    def printed(i):
+        for _ in range(PER_REQUEST):
+            print(f"User from cache {i}", file=output)
+
+    def logged(i):
+        for _ in range(PER_REQUEST):
+            logger.info("User loaded", extra={"source": "cache", "request": i})
+
+    def filtered(i):
+        for _ in range(PER_REQUEST):
+            logger.debug("User loaded", extra={"source": "cache", "request": i})
+
+    results = {"print": per_request_us(printed, requests)}
+
+    handler = logging.StreamHandler(output)
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    results["sync JSON handler"] = per_request_us(logged, requests)
+    logger.removeHandler(handler)
+    logger.propagate = True
+
+    config.LOG_LEVEL = "INFO"
+    listener = setup_logging(output)
+    results["queue JSON handler"] = per_request_us(logged, requests)
+    results["queue, level filtered"] = per_request_us(filtered, requests)
+    started = time.perf_counter()
+    stop_logging()
+    drain = time.perf_counter() - started
+
+    print(f"{'logging':>24} {'us/request':>11}")
+    for name, us in results.items():
+        print(f"{name:>24} {us:>11.2f}")
+    print(f"listener drained the backlog in {drain * 1000:.0f} ms off the request path")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--write-delay", type=float, default=0.0, help="seconds every write blocks")
+    args = parser.parse_args()
+    main(args.requests, args.write_delay)
@@ -0,0 +1,41 @@
+"""
+Per-page latency of offset vs keyset pagination at increasing page depth.
+
+    python -m benchmarks.bench_pagination --contacts 100000
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import select
+
+from benchmarks.common import create_schema, seed, session_maker, sqlite_url, timed
+from src.entity.models import Contact
+from src.repository import contacts as repository_contacts
+
+
+async def main(contacts: int, limit: int, repeat: int):
+    engine = await create_schema(sqlite_url())
+    user = await seed(engine, contacts)
+    Session = session_maker(engine)
+
+    print(f"{'depth':>10} {'offset ms':>12} {'cursor ms':>12}")
+    async with Session() as db:
+        for depth in (0, contacts // 10, contacts // 2, contacts - limit):
+            # the cursor of a page at `depth` is the key of the row just before it
+            anchor = await db.execute(select(Contact).filter_by(user_id=user.id)
+                                      .order_by(*repository_contacts.CURSOR_ORDER).offset(max(depth - 1, 0)).limit(1))
+            cursor = repository_contacts.encode_cursor(anchor.scalar_one()) if depth else ""
+
+            offset_stats = await timed(lambda: repository_contacts.get_contacts(limit, depth, db, user), repeat)
+            cursor_stats = await timed(lambda: repository_contacts.get_contacts(limit, 0, db, user, cursor), repeat)
+            print(f"{depth:>10} {offset_stats['mean_ms']:>12} {cursor_stats['mean_ms']:>12}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contacts", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.contacts, args.limit, args.repeat))
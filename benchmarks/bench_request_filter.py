@@ -0,0 +1,95 @@
+"""
+Requests per second through the previous ``BaseHTTPMiddleware`` user agent filter
+vs the ASGI ``RequestFilterMiddleware``, calling the ASGI app directly.
+
+    python -m benchmarks.bench_request_filter --requests 20000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import re
+import time
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+
+from src.middleware.request_filter import RequestFilterMiddleware
+
+USER_AGENTS = [r"Googlebot", r"Python-urllib", r"curl", r"wget", r"scrapy", r"HeadlessChrome"]
+BANNED = ["192.168.1.1", "192.168.1.2", "10.0.0.0/8", "172.16.0.0/12", "2001:db8::/32"]
+
+
+def endpoint_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    async def root():
+        return {"message": "Hello World"}
+
+    return app
+
+
+def base_http_app() -> FastAPI:
+    # the middleware as it was in main.py
+    app = endpoint_app()
+
+    @app.middleware("http")
+    async def user_agent_ban_middleware(request: Request, call_next):
+        print(request.headers.get("Authorization"))
+        user_agent = request.headers.get("user-agent")
+        print(user_agent)
+        for ban_pattern in USER_AGENTS:
+            if re.search(ban_pattern, user_agent):
+                return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
+        return await call_next(request)
+
+    return app
+
+
+def asgi_app():
+    return RequestFilterMiddleware(endpoint_app(), user_agents=USER_AGENTS, banned_networks=BANNED)
+
+
+async def run(app, requests: int) -> float:
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": "/", "raw_path": b"/", "root_path": "", "query_string": b"", "server": ("testserver", 80),
+             "client": ("203.0.113.7", 50000),
+             "headers": [(b"host", b"testserver"), (b"user-agent", b"Mozilla/5.0 (X11; Linux x86_64)"),
+                         (b"authorization", b"Bearer token")]}
+
+    def receiver():
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # the client stays connected until the response is sent
+            await asyncio.Event().wait()
+
+        return receive
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receiver(), send)
+    return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int):
+    print(f"{'middleware':>16} {'req/s':>10}")
+    for name, factory in (("none", endpoint_app), ("BaseHTTP", base_http_app), ("ASGI filter", asgi_app)):
+        app = factory()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await run(app, 200)
+            rate = await run(app, requests)
+        print(f"{name:>16} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,62 @@
+"""
+Latency of the contact search endpoint query (FTS5 on SQLite).
+
+``--contacts`` are spread evenly over ``--users`` owners and one of them searches, as
+on a shared server. The FTS tokens carry the owner, so the latency follows the size
+of one address book: ``--users 1`` measures a single owner of every contact.
+
+    python -m benchmarks.bench_search --contacts 1000000 --users 1000
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import insert, select
+
+from benchmarks.common import contact_rows, create_schema, session_maker, sqlite_url, timed
+from src.entity.models import Contact, User
+from src.repository import contacts as repository_contacts
+
+QUERIES = ["olena", "shev", "kovalenko12", "iva bon", "example.com", "+38050"]
+
+
+async def seed_owners(engine, contacts: int, users: int, batch: int = 10_000) -> list[User]:
+    async with session_maker(engine)() as session:
+        await session.execute(insert(User), [
+            {"username": f"bench{number}", "email": f"bench{number}@example.com", "password": "x", "confirmed": True}
+            for number in range(users)
+        ])
+        owners = (await session.execute(select(User).order_by(User.id))).scalars().all()
+        rows = []
+        for number, owner in enumerate(owners):
+            for row in contact_rows(owner.id, contacts // users, seed=number):
+                rows.append(row)
+                if len(rows) == batch:
+                    await session.execute(insert(Contact), rows)
+                    rows = []
+        if rows:
+            await session.execute(insert(Contact), rows)
+        await session.commit()
+        return owners
+
+
+async def main(contacts: int, users: int, repeat: int):
+    engine = await create_schema(sqlite_url())
+    owners = await seed_owners(engine, contacts, users)
+    user = owners[len(owners) // 2]
+
+    print(f"{contacts} contacts, {users} owners, {contacts // users} contacts searched")
+    print(f"{'query':>14} {'p50 ms':>10} {'p99 ms':>10}")
+    async with session_maker(engine)() as db:
+        for query in QUERIES:
+            stats = await timed(lambda: repository_contacts.search_contacts(query, 10, 0, db, user), repeat)
+            print(f"{query:>14} {stats['p50_ms']:>10} {stats['p99_ms']:>10}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contacts", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.contacts, args.users, args.repeat))
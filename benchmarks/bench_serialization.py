@@ -0,0 +1,67 @@
+"""
+Serialization time of a 500 contact page: FastAPI's ``response_model`` path
+(validation, ``jsonable_encoder`` and stdlib ``json``), the prebuilt ``TypeAdapter``
+and the orjson fast path of :mod:`src.services.fast_json`.
+
+    python -m benchmarks.bench_serialization --contacts 500
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from benchmarks.common import contact_rows
+from src.entity.models import Contact
+from src.schemas.contacts import ContactResponse
+from src.services import fast_json
+
+
+def per_call_ms(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(count: int, repeat: int):
+    contacts = [Contact(id=i, **row) for i, row in enumerate(contact_rows(1, count), start=1)]
+    field = create_response_field(name="response", type_=List[ContactResponse], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def response_model():
+        content = loop.run_until_complete(serialize_response(field=field, response_content=contacts, is_coroutine=True))
+        return JSONResponse(content).body
+
+    def type_adapter():
+        adapter = fast_json.contact_list_adapter
+        return adapter.dump_json(adapter.validate_python(contacts, from_attributes=True))
+
+    def orjson_path():
+        return fast_json.dump_contacts(contacts)
+
+    fast_json.config.JSON_FAST_PATH = True
+
+    bodies = {fn: fn() for fn in (response_model, type_adapter, orjson_path)}
+    assert len({json.dumps(json.loads(body)) for body in bodies.values()}) == 1, "serializers disagree"
+
+    baseline = None
+    print(f"{'serializer':>16} {'ms/page':>8} {'speedup':>8}")
+    for name, fn in (("response_model", response_model), ("TypeAdapter", type_adapter), ("orjson", orjson_path)):
+        ms = per_call_ms(fn, repeat)
+        baseline = baseline or ms
+        print(f"{name:>16} {ms:>8.3f} {baseline / ms:>7.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contacts", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    main(args.contacts, args.repeat)
@@ -0,0 +1,42 @@
+"""
+Size and decode time of a cached user: pickled ORM instance vs packed UserSnapshot.
+
+    python -m benchmarks.bench_user_snapshot
+"""
+import asyncio
+import pickle
+import timeit
+
+from sqlalchemy import select
+
+from benchmarks.common import create_schema, seed, session_maker, sqlite_url
+from src.entity.models import User
+from src.entity.snapshot import UserSnapshot
+
+
+async def load_user() -> User:
+    engine = await create_schema(sqlite_url())
+    await seed(engine, 0)
+    async with session_maker(engine)() as db:
+        user = (await db.execute(select(User))).scalar_one()
+    await engine.dispose()
+    return user
+
+
+def main(number: int = 100_000):
+    user = asyncio.run(load_user())
+    pickled = pickle.dumps(user)
+    packed = UserSnapshot.from_user(user).pack()
+
+    print(f"{'format':>10} {'bytes':>8} {'decode us':>10} {'encode us':>10}")
+    for name, data, loads, dumps in (
+        ("pickle", pickled, pickle.loads, lambda: pickle.dumps(user)),
+        ("snapshot", packed, UserSnapshot.unpack, lambda: UserSnapshot.from_user(user).pack()),
+    ):
+        decode = timeit.timeit(lambda: loads(data), number=number) / number * 1e6
+        encode = timeit.timeit(dumps, number=number) / number * 1e6
+        print(f"{name:>10} {len(data):>8} {decode:>10.2f} {encode:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
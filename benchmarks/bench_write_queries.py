@@ -0,0 +1,60 @@
+"""
+Statements and latency per write of the contacts and users repositories.
+
+Every write is a single INSERT/UPDATE/DELETE ... RETURNING scoped by the owner.
+
+    python -m benchmarks.bench_write_queries
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from benchmarks.common import count_statements, create_schema, seed, session_maker, sqlite_url
+from src.repository import contacts as repository_contacts
+from src.repository import users as repository_users
+from src.schemas.contacts import ContactModel
+from src.schemas.user import UserSchemaChangePasword, UserSchemaResetPasword
+
+
+async def main(repeat: int):
+    engine = await create_schema(sqlite_url())
+    user = await seed(engine, 1000)
+    Session = session_maker(engine)
+    body = ContactModel(firstname="Olena", lastname="Shevchenko", email="olena@write.example",
+                        mobilenamber="+380501112233", databirthday=date(1990, 5, 17), note="bench")
+    change = UserSchemaChangePasword(username=user.username, email=user.email, password="qwerty", new_password="ytrewq")
+    reset = UserSchemaResetPasword(username=user.username, email=user.email)
+
+    async def contact_cycle(db):
+        contact = await repository_contacts.create_contact(body, db, user)
+        await repository_contacts.update_contact(contact.id, body, db, user)
+        await repository_contacts.remove_contact(contact.id, db, user)
+
+    writes = {
+        "create_contact": lambda db: repository_contacts.create_contact(body, db, user),
+        "contact cycle (3 writes)": contact_cycle,
+        "update_token": lambda db: repository_users.update_token(user, "token", db),
+        "confirmed_email": lambda db: repository_users.confirmed_email(user.email, db),
+        "update_avatar_url": lambda db: repository_users.update_avatar_url(user.email, "https://avatar", db),
+        "pass_change": lambda db: repository_users.pass_change(change, db),
+        "pass_reset": lambda db: repository_users.pass_reset(reset, "z", db),
+    }
+    print(f"{'write':>26} {'statements':>11} {'mean ms':>9}")
+    for name, write in writes.items():
+        elapsed = 0.0
+        for _ in range(repeat):
+            async with Session() as db:
+                with count_statements(engine) as statements:
+                    start = time.perf_counter()
+                    await write(db)
+                    elapsed += time.perf_counter() - start
+        print(f"{name:>26} {len(statements):>11} {elapsed / repeat * 1000:>9.3f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat))
@@ -0,0 +1,178 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The benchmarks run against a throwaway SQLite database so they can be started
+without the docker services: ``python -m benchmarks.bench_pagination``.
+"""
+import contextlib
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import event, insert, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from src.entity.models import Base, Contact, User, birthday_key
+
+FIRSTNAMES = ["Olena", "Ivan", "Maria", "Petro", "Anna", "Taras", "Iryna", "Oleh", "Sofia", "Andrii"]
+LASTNAMES = ["Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Melnyk", "Boyko", "Lysenko"]
+
+
+def sqlite_url(name: str = "bench.db") -> str:
+    """
+    Returns the url of a fresh SQLite database file in a temporary directory.
+
+    :param name: File name.
+    :type name: str
+    :return: Database url.
+    :rtype: str
+    """
+    return f"sqlite+aiosqlite:///{Path(tempfile.mkdtemp()) / name}"
+
+
+def check_scratch(database_url: str, force: bool, redis_url: str | None = None) -> None:
+    """
+    Refuses to wipe a database or Redis server that may hold real data.
+
+    :param database_url: Database url, its tables are dropped.
+    :type database_url: str
+    :param force: The caller confirmed both are scratch instances.
+    :type force: bool
+    :param redis_url: fakeredis or a Redis url, the server is flushed. None when no Redis is used.
+    :type redis_url: str | None
+    """
+    if force:
+        return
+    if make_url(database_url).get_backend_name() != "sqlite":
+        raise SystemExit(f"refusing to drop the tables of {make_url(database_url)!r}, "
+                         "pass --force if it is a scratch database")
+    if redis_url not in (None, "fakeredis"):
+        raise SystemExit(f"refusing to flush {redis_url}, pass --force if it is a scratch Redis")
+
+
+async def create_schema(url: str) -> AsyncEngine:
+    """
+    Creates an engine and all tables of the application.
+
+    :param url: Database url.
+    :type url: str
+    :return: Engine.
+    :rtype: AsyncEngine
+    """
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+def session_maker(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+def contact_rows(user_id: int, count: int, seed: int = 14):
+    """
+    Generates deterministic synthetic contact rows.
+
+    :param user_id: Owner of the contacts.
+    :type user_id: int
+    :param count: Number of rows.
+    :type count: int
+    :param seed: Random seed.
+    :type seed: int
+    :return: Column dictionaries ready for an executemany insert.
+    :rtype: Iterator[dict]
+    """
+    rnd = random.Random(seed)
+    start = datetime(1960, 1, 1)
+    for i in range(count):
+        firstname = rnd.choice(FIRSTNAMES)
+        lastname = f"{rnd.choice(LASTNAMES)}{rnd.randrange(10_000)}"
+        birthday = start + timedelta(days=rnd.randrange(365 * 50))
+        yield {
+            "firstname": firstname,
+            "lastname": lastname,
+            "email": f"{firstname.lower()}.{lastname.lower()}.{i}@example.com",
+            "mobilenamber": f"+380{rnd.randrange(10**9):09d}",
+            "databirthday": birthday,
+            "birthday_mmdd": birthday_key(birthday),
+            "note": f"note {i}",
+            "user_id": user_id,
+        }
+
+
+async def seed(engine: AsyncEngine, contacts: int, batch: int = 10_000) -> User:
+    """
+    Inserts one user owning ``contacts`` synthetic contacts.
+
+    :param engine: Engine.
+    :type engine: AsyncEngine
+    :param contacts: Number of contacts.
+    :type contacts: int
+    :param batch: Rows per executemany batch.
+    :type batch: int
+    :return: The owner.
+    :rtype: User
+    """
+    async with session_maker(engine)() as session:
+        user = User(username="bench", email="bench@example.com", password="x", confirmed=True)
+        session.add(user)
+        await session.commit()
+        rows = []
+        for row in contact_rows(user.id, contacts):
+            rows.append(row)
+            if len(rows) == batch:
+                await session.execute(insert(Contact), rows)
+                rows = []
+        if rows:
+            await session.execute(insert(Contact), rows)
+        await session.commit()
+        return user
+
+
+async def timed(fn, repeat: int = 20) -> dict:
+    """
+    Awaits ``fn()`` ``repeat`` times and returns latency percentiles in milliseconds.
+
+    :param fn: Coroutine function without arguments.
+    :type fn: Callable
+    :param repeat: Number of runs.
+    :type repeat: int
+    :return: Latency stats.
+    :rtype: dict
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3),
+    }
+
+
+@contextlib.contextmanager
+def count_statements(engine: AsyncEngine):
+    """
+    Records the SQL statements sent to the database while the block runs.
+
+    :param engine: Engine.
+    :type engine: AsyncEngine
+    :return: List filled with the statements, transaction control is not included.
+    :rtype: List[str]
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
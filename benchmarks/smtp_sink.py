@@ -0,0 +1,110 @@
+"""
+Local SMTP stand-in that accepts and keeps every message, for tests and benchmarks.
+
+    python -m benchmarks.smtp_sink --port 1025
+
+Point the worker at it with ``MAIL_SERVER=127.0.0.1 MAIL_PORT=1025 MAIL_SSL_TLS=false
+MAIL_USE_CREDENTIALS=false``.
+"""
+import argparse
+import asyncio
+
+
+class SMTPSink:
+    """
+    Minimal ESMTP server, recipients listed in ``reject`` are refused with 550.
+
+    ``latency`` delays every reply, like the round trip to a remote mail server.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, reject: set[str] = frozenset(),
+                 latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.reject = set(reject)
+        self.latency = latency
+        self.messages: list[tuple[str, list[str], bytes]] = []
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> "SMTPSink":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> "SMTPSink":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        sender, recipients = "", []
+
+        async def reply(*lines: str) -> None:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            writer.write("".join(f"{line}\r\n" for line in lines).encode())
+            await writer.drain()
+
+        await reply("220 sink ESMTP")
+        try:
+            while line := await reader.readline():
+                command = line.decode("utf-8", "replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    await reply("250-sink", "250-8BITMIME", "250-SMTPUTF8", "250 AUTH PLAIN LOGIN")
+                elif verb == "HELO":
+                    await reply("250 sink")
+                elif verb == "AUTH":
+                    await reply("235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    sender, recipients = command[10:].strip().strip("<>").split(">")[0], []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    recipient = command[8:].strip().strip("<>").split(">")[0]
+                    if recipient in self.reject:
+                        await reply("550 5.1.1 Mailbox unavailable")
+                    else:
+                        recipients.append(recipient)
+                        await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = bytearray()
+                    while (chunk := await reader.readline()) not in (b".\r\n", b""):
+                        data += chunk
+                    self.messages.append((sender, recipients, bytes(data)))
+                    await reply("250 OK queued")
+                elif verb in ("RSET", "NOOP"):
+                    sender, recipients = "", []
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def main(host: str, port: int):
+    async with SMTPSink(host, port) as sink:
+        print(f"SMTP sink listening on {host}:{sink.port}")
+        while True:
+            await asyncio.sleep(10)
+            print(f"{len(sink.messages)} messages over {sink.connections} connections")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port))
@@ -1,9 +1,8 @@
-import re
+import logging
 from ipaddress import ip_address
 from typing import Callable
 from pathlib import Path
 
-import redis.asyncio as redis
 from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.responses import JSONResponse, HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -13,10 +12,17 @@ from fastapi_limiter import FastAPILimiter
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.db import get_db
+from src.database.db import get_db, sessionmanager
+from src.database.cache import get_redis, redis_pool
 
-from src.routes import contacts, auth, users
+from src.middleware.request_filter import RequestFilterMiddleware
+from src.routes import contacts, auth, users, internal
 from src.config.config import config
+from src.config.log import setup_logging, stop_logging
+from src.services.avatars import ImmutableStaticFiles
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 app = FastAPI()
@@ -24,7 +30,6 @@ app = FastAPI()
 banned_ips = [
     ip_address("192.168.1.1"),
     ip_address("192.168.1.2"),
-    ip_address("127.0.0.1"),
 ]
 
 # ALLOWED_IPS = [
@@ -42,6 +47,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # @app.middleware("http")
@@ -63,29 +69,26 @@ app.add_middleware(
 
 user_agent_ban_list = [r"Googlebot", r"Python-urllib"]
 
-
-@app.middleware("http")
-async def user_agent_ban_middleware(request: Request, call_next: Callable):
-    print(request.headers.get("Authorization"))
-    user_agent = request.headers.get("user-agent")
-    print(user_agent)
-    for ban_pattern in user_agent_ban_list:
-        if re.search(ban_pattern, user_agent):
-            return JSONResponse(
-                status_code=status.HTTP_403_FORBIDDEN,
-                content={"detail": "You are banned"},
-            )
-    response = await call_next(request)
-    return response
+# added last so it runs first, banned clients never reach CORS or the routes
+app.add_middleware(
+    RequestFilterMiddleware,
+    user_agents=user_agent_ban_list,
+    banned_networks=banned_ips,
+    redis_client=get_redis(),
+)
 
 BASE_DIR = Path(__file__).parent
 
 directory = BASE_DIR.joinpath("src").joinpath("static")
 app.mount("/static", StaticFiles(directory=directory), name="static")
+if config.AVATAR_STORAGE != "cloudinary":
+    app.mount(config.AVATAR_BASE_URL.rstrip("/"), ImmutableStaticFiles(directory=config.AVATAR_DIRECTORY),
+              name="avatars")
 
 app.include_router(auth.router, prefix='/api')
 app.include_router(users.router, prefix="/api")
 app.include_router(contacts.router, prefix='/api')
+app.include_router(internal.router, prefix='/api')
 # app.include_router(tags.router, prefix='/api')
 # app.include_router(notes.router, prefix='/api')
 
@@ -96,14 +99,16 @@ def read_root():
 
 @app.on_event("startup")
 async def startup():
+    await FastAPILimiter.init(get_redis())
+    await sessionmanager.warmup()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await redis_pool.disconnect()
+    await sessionmanager.close()
+    stop_logging()
 
-    r = await redis.Redis(
-        host=config.REDIS_DOMAIN,
-        port=config.REDIS_PORT,
-        db=0,
-        password=config.REDIS_PASSWORD,
-    )
-    await FastAPILimiter.init(r)
 
 @app.get("/api/healthchecker")
 async def healthchecker(db: AsyncSession = Depends(get_db)):
@@ -122,6 +127,7 @@ async def healthchecker(db: AsyncSession = Depends(get_db)):
         if result is None:
             raise HTTPException(status_code=500, detail="Database is not configured correctly")
         return {"message": "Welcome to FastAPI!"}
-    except Exception as e:
-        print(e)
-        raise HTTPException(status_code=500, detail="Error connecting to the database")
\ No newline at end of file
+    except Exception:
+        logger.exception("Database health check failed")
+        raise HTTPException(status_code=500, detail="Error connecting to the database")
+
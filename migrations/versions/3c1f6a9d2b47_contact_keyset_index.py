@@ -0,0 +1,27 @@
+"""Contact keyset pagination index
+
+Revision ID: 3c1f6a9d2b47
+Revises: e8ebadf0b850
+Create Date: 2026-10-16 10:12:31.418520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f6a9d2b47'
+down_revision: Union[str, None] = 'e8ebadf0b850'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contact_user_id_lastname_firstname_id', 'contact',
+                    ['user_id', 'lastname', 'firstname', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contact_user_id_lastname_firstname_id', table_name='contact')
@@ -0,0 +1,39 @@
+"""Contact access path indexes
+
+Revision ID: 7a4e2d915c03
+Revises: 3c1f6a9d2b47
+Create Date: 2026-10-16 11:02:47.905163
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a4e2d915c03'
+down_revision: Union[str, None] = '3c1f6a9d2b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (user_id, lastname) is served by ix_contact_user_id_lastname_firstname_id
+INDEXES = {
+    'ix_contact_user_id_id': ['user_id', 'id'],
+    'ix_contact_user_id_firstname': ['user_id', 'firstname'],
+    'ix_contact_user_id_email': ['user_id', 'email'],
+}
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can not run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(name, 'contact', columns, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name='contact', postgresql_concurrently=True, if_exists=True)
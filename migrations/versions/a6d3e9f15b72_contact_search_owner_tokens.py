@@ -0,0 +1,47 @@
+"""Contact search owner tokens
+
+Revision ID: a6d3e9f15b72
+Revises: f3a7c1e9b284
+Create Date: 2026-10-17 09:12:44.301527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d3e9f15b72'
+down_revision: Union[str, None] = 'f3a7c1e9b284'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ('firstname', 'lastname', 'email', 'mobilenamber', 'note')
+TRIGGERS = ('contact_fts_insert', 'contact_fts_update', 'contact_fts_delete')
+
+
+def rebuild(values: str) -> None:
+    # values: SQL of the indexed column values of a contact row aliased ``new``
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS contact_fts")
+    op.execute(f"CREATE VIRTUAL TABLE contact_fts USING fts5({', '.join(COLUMNS)}, tokenize='unicode61')")
+    op.execute(f"""CREATE TRIGGER contact_fts_insert AFTER INSERT ON contact BEGIN
+        INSERT INTO contact_fts (rowid, {', '.join(COLUMNS)}) VALUES (new.id, {values}); END""")
+    op.execute(f"""CREATE TRIGGER contact_fts_update AFTER UPDATE ON contact BEGIN
+        UPDATE contact_fts SET ({', '.join(COLUMNS)}) = ({values}) WHERE rowid = old.id; END""")
+    op.execute("""CREATE TRIGGER contact_fts_delete AFTER DELETE ON contact BEGIN
+        DELETE FROM contact_fts WHERE rowid = old.id; END""")
+    op.execute(f"INSERT INTO contact_fts (rowid, {', '.join(COLUMNS)}) SELECT new.id, {values} FROM contact AS new")
+
+
+def upgrade() -> None:
+    # owned_tokens() is registered on SQLite connections by src.entity.models
+    if op.get_bind().dialect.name == 'sqlite':
+        rebuild(", ".join(f"owned_tokens(new.user_id, new.{column})" for column in COLUMNS))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        rebuild(", ".join(f"new.{column}" for column in COLUMNS))
@@ -0,0 +1,55 @@
+"""Contact search indexes
+
+Revision ID: c52d8e3f6a10
+Revises: 7a4e2d915c03
+Create Date: 2026-10-16 12:20:05.634291
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52d8e3f6a10'
+down_revision: Union[str, None] = '7a4e2d915c03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ('firstname', 'lastname', 'email', 'mobilenamber', 'note')
+DOCUMENT = " || ' ' || ".join(f"coalesce({column}, '')" for column in COLUMNS)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(f"CREATE VIRTUAL TABLE contact_fts USING fts5({', '.join(COLUMNS)}, tokenize='unicode61')")
+        op.execute(f"""CREATE TRIGGER contact_fts_insert AFTER INSERT ON contact BEGIN
+            INSERT INTO contact_fts (rowid, {', '.join(COLUMNS)})
+            VALUES (new.id, {', '.join('new.' + column for column in COLUMNS)}); END""")
+        op.execute(f"""CREATE TRIGGER contact_fts_update AFTER UPDATE ON contact BEGIN
+            UPDATE contact_fts SET {', '.join(f'{column} = new.{column}' for column in COLUMNS)}
+            WHERE rowid = old.id; END""")
+        op.execute("""CREATE TRIGGER contact_fts_delete AFTER DELETE ON contact BEGIN
+            DELETE FROM contact_fts WHERE rowid = old.id; END""")
+        op.execute(f"INSERT INTO contact_fts (rowid, {', '.join(COLUMNS)}) SELECT id, {', '.join(COLUMNS)} FROM contact")
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contact_search_trgm ON contact "
+                   f"USING gin (({DOCUMENT}) gin_trgm_ops)")
+        op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contact_search_tsv ON contact "
+                   f"USING gin (to_tsvector('simple', {DOCUMENT}))")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('contact_fts_insert', 'contact_fts_update', 'contact_fts_delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS contact_fts")
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_contact_search_tsv', table_name='contact', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_contact_search_trgm', table_name='contact', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,38 @@
+"""Contact birthday key
+
+Revision ID: d9b0f4c17e25
+Revises: c52d8e3f6a10
+Create Date: 2026-10-16 13:41:56.127804
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b0f4c17e25'
+down_revision: Union[str, None] = 'c52d8e3f6a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contact', sa.Column('birthday_mmdd', sa.Integer(), nullable=True))
+    contact = sa.table('contact', sa.column('databirthday', sa.DateTime()), sa.column('birthday_mmdd', sa.Integer()))
+    op.execute(
+        contact.update().values(
+            birthday_mmdd=sa.extract('month', contact.c.databirthday) * 100 + sa.extract('day', contact.c.databirthday)
+        )
+    )
+    with op.get_context().autocommit_block():
+        op.create_index('ix_contact_user_id_birthday_mmdd', 'contact', ['user_id', 'birthday_mmdd'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_contact_user_id_birthday_mmdd', table_name='contact', postgresql_concurrently=True,
+                      if_exists=True)
+    op.drop_column('contact', 'birthday_mmdd')
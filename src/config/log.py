@@ -0,0 +1,102 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+
+from src.config.config import config
+
+# attributes every LogRecord has, anything else was passed through ``extra``
+RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line, ``extra`` fields become top level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler for a listener in the same process.
+
+    The record is enqueued as is, formatting and writing happen on the listener thread.
+    Only the message arguments are merged so that mutable arguments are captured now.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # tracebacks hold frames that change after the call returns
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(stream=None) -> logging.handlers.QueueListener:
+    """
+    Routes all logging through a queue to a background thread writing JSON lines.
+
+    Callers only pay for building the record and a queue put, the stream is written by
+    the listener. The root level is ``LOG_LEVEL`` and ``LOG_LEVELS`` overrides the level
+    of single loggers, e.g. ``{"src.services.auth": "DEBUG"}``. Calling it again
+    replaces the previous setup.
+
+    :param stream: Output stream, defaults to stdout.
+    :type stream: IO
+    :return: The started listener.
+    :rtype: QueueListener
+    """
+    global _listener
+    stop_logging()
+    records = queue.SimpleQueue()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.addHandler(LocalQueueHandler(records))
+    root.setLevel(config.LOG_LEVEL)
+    for name, level in config.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """
+    Flushes the queued records, stops the listener thread and detaches the queue handler.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, LocalQueueHandler):
+            root.removeHandler(handler)
+
+
+atexit.register(stop_logging)
@@ -1 +1,3 @@
-ACCOUNT_EXIST = "Account already exists!"
\ No newline at end of file
+ACCOUNT_EXIST = "Account already exists!"
+AVATAR_NOT_IMAGE = "Avatar must be an image"
+AVATAR_TOO_LARGE = "Avatar is too large"
@@ -0,0 +1,40 @@
+import redis.asyncio as redis
+
+from src.config.config import config
+
+
+def create_redis_pool(**kwargs) -> redis.BlockingConnectionPool:
+    """
+    Creates the Redis connection pool from the settings.
+
+    At ``REDIS_MAX_CONNECTIONS`` a checkout waits up to ``REDIS_POOL_TIMEOUT`` seconds for
+    a connection to be released, instead of failing with "Too many connections".
+
+    :param kwargs: Overrides of the pool arguments.
+    :return: Connection pool.
+    :rtype: redis.BlockingConnectionPool
+    """
+    options = dict(
+        host=config.REDIS_DOMAIN,
+        port=config.REDIS_PORT,
+        db=0,
+        password=config.REDIS_PASSWORD,
+        max_connections=config.REDIS_MAX_CONNECTIONS,
+        timeout=config.REDIS_POOL_TIMEOUT,
+    )
+    return redis.BlockingConnectionPool(**(options | kwargs))
+
+
+# One pool per process, shared by the user cache, FastAPILimiter, the response cache
+# and the request filter
+redis_pool = create_redis_pool()
+
+
+def get_redis() -> redis.Redis:
+    """
+    Returns an async Redis client backed by the shared connection pool.
+
+    :return: Redis client.
+    :rtype: redis.Redis
+    """
+    return redis.Redis(connection_pool=redis_pool)
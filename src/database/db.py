@@ -1,32 +1,331 @@
+import asyncio
 import contextlib
+import logging
+import time
 
+from fastapi import HTTPException, Request
+from jose import JWTError, jwt
+from redis.exceptions import RedisError
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from src.config.config import config
+from src.database.cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long checkouts wait for a connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_total += elapsed
+            self.wait_max = max(self.wait_max, elapsed)
+
+    def stats(self) -> dict:
+        """
+        Returns the pool occupancy and checkout wait statistics.
+
+        :return: Pool statistics, wait times in milliseconds.
+        :rtype: dict
+        """
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_mean_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+def engine_options(url: str) -> tuple[str, dict]:
+    """
+    Applies the pool and driver settings from the config to a database url.
+
+    In-memory SQLite keeps the default single connection pool.
+
+    :param url: Database url.
+    :type url: str
+    :return: The url and the keyword arguments for ``create_async_engine``.
+    :rtype: tuple[str, dict]
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return url, {}
+    if url.get_driver_name() == "asyncpg":
+        url = url.update_query_dict({"prepared_statement_cache_size": str(config.DB_STATEMENT_CACHE_SIZE)})
+    return url, {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
+
+def create_engine(url: str) -> AsyncEngine:
+    url, options = engine_options(url)
+    return create_async_engine(url, **options)
+
+
+class TrackedSession(AsyncSession):
+    """
+    Session that awaits the callbacks in ``info["after_commit"]`` once a commit succeeded.
+
+    The callbacks run before ``commit()`` returns, so before the response is sent.
+    """
+
+    async def commit(self) -> None:
+        await super().commit()
+        for callback in self.info.get("after_commit", ()):
+            await callback()
+
+
+def create_session_maker(engine: AsyncEngine) -> async_sessionmaker:
+    # writes return their rows with RETURNING, keep them loaded after commit
+    return async_sessionmaker(autoflush=False, autocommit=False, expire_on_commit=False, bind=engine,
+                              class_=TrackedSession)
+
+
+def pool_stats(engine: AsyncEngine) -> dict:
+    pool = engine.pool
+    if isinstance(pool, InstrumentedAsyncQueuePool):
+        return pool.stats()
+    return {"status": pool.status()}
+
+
+async def warmup_engine(engine: AsyncEngine, connections: int) -> int:
+    pool = engine.pool
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        connections = min(connections, pool.size())
+    conns = [engine.connect() for _ in range(max(connections, 0))]
+    results = await asyncio.gather(*(conn.start() for conn in conns), return_exceptions=True)
+    opened = [conn for conn, result in zip(conns, results) if not isinstance(result, BaseException)]
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.warning("Database warm-up failed", extra={"url": repr(engine.url), "error": str(result)})
+            break
+    await asyncio.gather(*(conn.close() for conn in opened), return_exceptions=True)
+    return len(opened)
+
 
 class DatabaseSessionManager:
-    def __init__(self, url: str):
-        self._engine: AsyncEngine | None = create_async_engine(url)
-        self._session_maker: async_sessionmaker = async_sessionmaker(autoflush=False, autocommit=False,
-                                                                     bind=self._engine)
+    def __init__(self, url: str, replica_urls: list[str] = (), redis_client=None):
+        self._engine: AsyncEngine | None = create_engine(url)
+        self._session_maker: async_sessionmaker = create_session_maker(self._engine)
+        self._replicas: list[AsyncEngine] = [create_engine(replica) for replica in replica_urls]
+        self._replica_session_makers = [create_session_maker(engine) for engine in self._replicas]
+        self._replica_down_until = [0.0] * len(self._replicas)
+        self._next_replica = 0
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    @staticmethod
+    def write_key(user_id: int) -> str:
+        return f"db:recent_write:{user_id}"
 
     @contextlib.asynccontextmanager
-    async def session(self):
+    async def session(self, sticky_user: int | None = None):
         if self._session_maker is None:
             raise Exception("Session is not initialized")
         session = self._session_maker()
+        if sticky_user is not None and self._replicas:
+            # reads of this user go to the primary until the replicas have caught up
+            session.info["after_commit"] = [lambda: self.mark_write(sticky_user)]
+        try:
+            yield session
+        except HTTPException:
+            # a client error raised by the endpoint, not a database failure
+            await session.rollback()
+            raise
+        except Exception:
+            logger.exception("Database session rolled back")
+            await session.rollback()
+        finally:
+            await session.close()
+
+    @contextlib.asynccontextmanager
+    async def read_session(self, sticky_user: int | None = None):
+        """
+        Opens a session for read-only work on a healthy replica.
+
+        Falls back to the primary when no replicas are configured or reachable, and for
+        ``DB_REPLICA_STICKY_SECONDS`` after ``sticky_user`` committed on any worker.
+
+        :param sticky_user: Id of the user for read-your-writes stickiness.
+        :type sticky_user: int | None
+        :return: Database session.
+        :rtype: AsyncSession
+        """
+        session = None
+        if self._replicas and not await self.recently_wrote(sticky_user):
+            session = await self._replica_session()
+        if session is None:
+            async with self.session(sticky_user) as session:
+                yield session
+            return
         try:
             yield session
-        except Exception as err:
-            print(err)
+        except HTTPException:
+            # a client error raised by the endpoint, not a database failure
+            await session.rollback()
+            raise
+        except Exception:
+            logger.exception("Database session rolled back")
             await session.rollback()
         finally:
             await session.close()
 
-sessionmanager = DatabaseSessionManager(config.SQLALCHEMY_DATABASE_URL)
+    async def _replica_session(self) -> AsyncSession | None:
+        # round robin over the replicas, skipping the ones that recently failed to connect
+        for _ in range(len(self._replicas)):
+            index = self._next_replica
+            self._next_replica = (index + 1) % len(self._replicas)
+            if self._replica_down_until[index] > time.monotonic():
+                continue
+            session = self._replica_session_makers[index]()
+            try:
+                await session.connection()
+            except (exc.SQLAlchemyError, OSError) as err:
+                await session.close()
+                self._replica_down_until[index] = time.monotonic() + config.DB_REPLICA_RETRY_SECONDS
+                logger.warning("Replica is unavailable", extra={"replica": index, "error": str(err)})
+                continue
+            return session
+        return None
+
+    async def mark_write(self, user_id: int) -> None:
+        """
+        Pins the reads of a user to the primary for the stickiness window.
+
+        The marker is kept in Redis, so it holds for every worker and any token of the user.
+
+        :param user_id: Id of the user.
+        :type user_id: int
+        """
+        try:
+            await self.redis.set(self.write_key(user_id), 1, px=int(config.DB_REPLICA_STICKY_SECONDS * 1000))
+        except (RedisError, OSError) as err:
+            logger.warning("Recent write not recorded", extra={"error": str(err)})
+
+    async def recently_wrote(self, user_id: int | None) -> bool:
+        """
+        Tells whether a user committed within the stickiness window.
+
+        :param user_id: Id of the user, None for anonymous reads.
+        :type user_id: int | None
+        :return: True when the reads must go to the primary, also when Redis is unreachable.
+        :rtype: bool
+        """
+        if user_id is None:
+            return False
+        try:
+            return bool(await self.redis.exists(self.write_key(user_id)))
+        except (RedisError, OSError) as err:
+            logger.warning("Recent writes unknown, reading from the primary", extra={"error": str(err)})
+            return True
+
+    async def warmup(self, connections: int = config.DB_POOL_WARMUP) -> int:
+        """
+        Opens pool connections of the primary and the replicas ahead of the first requests.
+
+        Connections are opened concurrently and returned to the pool idle. Failures are
+        reported and do not stop the application from starting.
+
+        :param connections: Number of connections per engine, capped at the pool size.
+        :type connections: int
+        :return: Number of connections opened.
+        :rtype: int
+        """
+        engines = [self._engine, *self._replicas]
+        return sum(await asyncio.gather(*(warmup_engine(engine, connections) for engine in engines)))
+
+    def stats(self) -> dict:
+        """
+        Returns the connection pool statistics.
+
+        :return: Checked out, idle and overflow connections and checkout wait times,
+            per replica as well.
+        :rtype: dict
+        """
+        stats = pool_stats(self._engine)
+        if self._replicas:
+            now = time.monotonic()
+            stats["replicas"] = [
+                pool_stats(engine) | {"healthy": down_until <= now}
+                for engine, down_until in zip(self._replicas, self._replica_down_until)
+            ]
+        return stats
+
+    async def close(self):
+        """
+        Closes all pooled connections.
+        """
+        await asyncio.gather(self._engine.dispose(), *(engine.dispose() for engine in self._replicas))
+
+
+sessionmanager = DatabaseSessionManager(config.SQLALCHEMY_DATABASE_URL, config.SQLALCHEMY_REPLICA_URLS)
+
+
+def sticky_user(request: Request) -> int | None:
+    """
+    Identifies the user of a request for read-your-writes stickiness.
+
+    The ``uid`` claim of the bearer token is read without verifying the token: it only
+    picks the database the reads go to, authentication verifies the token itself.
+
+    :param request: The incoming request.
+    :type request: Request
+    :return: User id or None for anonymous requests and tokens without the claim.
+    :rtype: int | None
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        user_id = jwt.get_unverified_claims(token).get("uid")
+    except JWTError:
+        return None
+    return user_id if isinstance(user_id, int) else None
 
 
 # Dependency
-async def get_db():
-    async with sessionmanager.session() as session:
-        yield session
\ No newline at end of file
+async def get_db(request: Request):
+    async with sessionmanager.session(sticky_user(request)) as session:
+        yield session
+
+
+# Dependency for read-only routes
+async def get_read_db(request: Request):
+    async with sessionmanager.read_session(sticky_user(request)) as session:
+        yield session
@@ -1,14 +1,45 @@
 import enum
-from datetime import date
+import re
+from datetime import date, datetime
 
-from sqlalchemy import Column, Integer, String, Boolean, func, Table,Enum
-from sqlalchemy.orm import relationship ,Mapped, mapped_column
+from sqlalchemy import Column, Integer, String, Boolean, func, Table,Enum, Index, DDL, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import relationship ,Mapped, mapped_column, validates
 from sqlalchemy.sql.schema import ForeignKey
 from sqlalchemy.sql.sqltypes import DateTime
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+# Text indexed for the contact search, the same expression must be used by the
+# queries for Postgres to pick the GIN indexes (see src.repository.contacts.search_contacts).
+SEARCH_COLUMNS = ("firstname", "lastname", "email", "mobilenamber", "note")
+
+
+def search_document(table: str = "") -> str:
+    """
+    Returns the SQL expression of the searchable text of a contact.
+
+    :param table: Optional table name to qualify the columns with.
+    :type table: str
+    :return: SQL expression.
+    :rtype: str
+    """
+    prefix = f"{table}." if table else ""
+    return " || ' ' || ".join(f"coalesce({prefix}{column}, '')" for column in SEARCH_COLUMNS)
+
+
+def birthday_key(value: date) -> int:
+    """
+    Returns the month and day of a date as a sortable MMDD integer.
+
+    :param value: Date of birth.
+    :type value: date
+    :return: For example 1231 for the 31st of December.
+    :rtype: int
+    """
+    return value.month * 100 + value.day
+
 # note_m2m_tag = Table(
 #     "note_m2m_tag",
 #     Base.metadata,
@@ -26,6 +57,8 @@ class Contact(Base):
     mobilenamber = Column(String(50), nullable=False)
     databirthday = Column('databirthday', DateTime, nullable=False)
     note = Column(String(150), nullable=True)
+    # month and day of databirthday, maintained by set_birthday_key
+    birthday_mmdd = Column(Integer, nullable=True)
     createdat = Column('createdat', DateTime, default=func.now())
     
     updated_at: Mapped[date] = mapped_column('updated_at', DateTime, default=func.now(), onupdate=func.now(),
@@ -33,6 +66,76 @@ class Contact(Base):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=True)
     user: Mapped["User"] = relationship("User", backref="todos", lazy="joined")
 
+    __table_args__ = (
+        # keyset pagination key, see src.repository.contacts.CURSOR_ORDER,
+        # also serves the (user_id, lastname) lookups
+        Index("ix_contact_user_id_lastname_firstname_id", "user_id", "lastname", "firstname", "id"),
+        Index("ix_contact_user_id_id", "user_id", "id"),
+        Index("ix_contact_user_id_firstname", "user_id", "firstname"),
+        Index("ix_contact_user_id_email", "user_id", "email"),
+        Index("ix_contact_user_id_birthday_mmdd", "user_id", "birthday_mmdd"),
+        Index("ix_contact_search_trgm", text(f"({search_document()}) gin_trgm_ops"),
+              postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_contact_search_tsv", text(f"to_tsvector('simple', {search_document()})"),
+              postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+    @validates("databirthday")
+    def set_birthday_key(self, key, value):
+        self.birthday_mmdd = birthday_key(value) if value is not None else None
+        return value
+
+
+# words as the FTS5 unicode61 tokenizer splits them
+FTS_TOKEN = re.compile(r"[^\W_]+")
+
+
+def owned_tokens(user_id: int | None, value: str | None) -> str | None:
+    """
+    Prefixes every word of a searchable value with its owner for the SQLite FTS5 index.
+
+    ``Olena Shevchenko`` of user 42 is indexed as ``42xolena 42xshevchenko``, so a
+    prefix query ``"42xshev"*`` only reads the index entries of user 42 and its cost
+    follows the size of the caller's address book, not of the whole table.
+
+    :param user_id: Owner of the contact, contacts without one are indexed under 0.
+    :type user_id: int | None
+    :param value: Column value.
+    :type value: str | None
+    :return: Space separated owned tokens.
+    :rtype: str | None
+    """
+    if value is None:
+        return None
+    return " ".join(f"{user_id or 0}x{token}" for token in FTS_TOKEN.findall(value.lower()))
+
+
+@event.listens_for(Engine, "connect")
+def register_owned_tokens(dbapi_connection, connection_record):
+    # the FTS triggers call it on every SQLite write, other drivers have no create_function
+    if hasattr(dbapi_connection, "create_function"):
+        dbapi_connection.create_function("owned_tokens", 2, owned_tokens, deterministic=True)
+
+
+# Postgres serves the search from the expression indexes above, SQLite from an
+# FTS5 shadow table kept in sync with contact by triggers, so every write path
+# (ORM or Core) updates it in the same transaction. The triggers index owned_tokens()
+# of the columns, connections writing contacts must have the function registered.
+FTS_VALUES = ", ".join(f"owned_tokens(new.user_id, new.{column})" for column in SEARCH_COLUMNS)
+event.listen(Contact.__table__, "before_create",
+             DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+for statement in (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS contact_fts USING fts5({', '.join(SEARCH_COLUMNS)}, tokenize='unicode61')",
+    f"""CREATE TRIGGER IF NOT EXISTS contact_fts_insert AFTER INSERT ON contact BEGIN
+        INSERT INTO contact_fts (rowid, {', '.join(SEARCH_COLUMNS)}) VALUES (new.id, {FTS_VALUES}); END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contact_fts_update AFTER UPDATE ON contact BEGIN
+        UPDATE contact_fts SET ({', '.join(SEARCH_COLUMNS)}) = ({FTS_VALUES}) WHERE rowid = old.id; END""",
+    """CREATE TRIGGER IF NOT EXISTS contact_fts_delete AFTER DELETE ON contact BEGIN
+        DELETE FROM contact_fts WHERE rowid = old.id; END""",
+):
+    event.listen(Contact.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Contact.__table__, "after_drop", DDL("DROP TABLE IF EXISTS contact_fts").execute_if(dialect="sqlite"))
+
 class Role(enum.Enum):
     admin: str = "admin"
     moderator: str = "moderator"
@@ -51,6 +154,31 @@ class User(Base):
     role: Mapped[Enum] = mapped_column('role', Enum(Role), default=Role.user, nullable=True)
     confirmed: Mapped[bool] = mapped_column(Boolean, default=False, nullable=True)
 
+class EmailOutbox(Base):
+    """
+    Emails waiting to be sent by the email worker (``python -m src.services.email_worker``).
+    """
+    __tablename__ = 'email_outbox'
+    id: Mapped[int] = mapped_column(primary_key=True)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    recipient: Mapped[str] = mapped_column(String(150), nullable=False)
+    username: Mapped[str] = mapped_column(String(50), nullable=True)
+    host: Mapped[str] = mapped_column(String(255), nullable=True)
+    # secret part of the message (the reset password), cleared once the message is sent
+    payload: Mapped[str] = mapped_column(String(255), nullable=True)
+    # set while the message is pending, a second request for the same message is dropped
+    dedupe_key: Mapped[str] = mapped_column(String(200), nullable=True, unique=True)
+    status: Mapped[str] = mapped_column(String(10), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    last_error: Mapped[str] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    sent_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
 # class Note(Base):
 #     __tablename__ = "notes"
 #     id = Column(Integer, primary_key=True)
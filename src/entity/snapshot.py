@@ -0,0 +1,108 @@
+import struct
+from datetime import datetime
+
+from src.entity.models import Role, User
+
+SNAPSHOT_VERSION = 1
+# version, id, confirmed, updated_at (NaN when unknown)
+_HEADER = struct.Struct(">Bq?d")
+_LENGTH = struct.Struct(">H")
+_NONE = 0xFFFF
+
+
+class UserSnapshot:
+    """
+    Immutable subset of a :class:`User` needed by authentication and :class:`RoleAccess`.
+
+    It is what the user cache stores instead of pickled ORM instances, the binary form
+    is produced by :meth:`pack` and starts with a format version byte.
+    """
+    __slots__ = ("id", "username", "email", "avatar", "role", "confirmed", "updated_at")
+
+    def __init__(self, id: int, username: str, email: str, avatar: str | None, role: Role,
+                 confirmed: bool, updated_at: datetime | None):
+        for name, value in zip(self.__slots__, (id, username, email, avatar, role, confirmed, updated_at)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, UserSnapshot):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self):
+        return hash((self.id, self.email, self.updated_at))
+
+    def __repr__(self):
+        return f"UserSnapshot(id={self.id!r}, email={self.email!r}, role={self.role!r})"
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        """
+        Copy the cached fields of a user.
+
+        :param user: ORM user.
+        :type user: User
+        :return: Snapshot.
+        :rtype: UserSnapshot
+        """
+        return cls(user.id, user.username, user.email, user.avatar, user.role or Role.user,
+                   bool(user.confirmed), user.updated_at)
+
+    def pack(self) -> bytes:
+        """
+        Serialize the snapshot.
+
+        :return: Versioned binary form.
+        :rtype: bytes
+        """
+        updated_at = self.updated_at.timestamp() if self.updated_at is not None else float("nan")
+        parts = [_HEADER.pack(SNAPSHOT_VERSION, self.id, self.confirmed, updated_at)]
+        for value in (self.username, self.email, self.avatar, self.role.value):
+            if value is None:
+                parts.append(_LENGTH.pack(_NONE))
+            else:
+                encoded = value.encode()
+                parts.append(_LENGTH.pack(len(encoded)))
+                parts.append(encoded)
+        return b"".join(parts)
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "UserSnapshot | None":
+        """
+        Deserialize a snapshot.
+
+        :param data: Output of :meth:`pack`.
+        :type data: bytes
+        :return: Snapshot or None when the data has another format version or is corrupt.
+        :rtype: UserSnapshot | None
+        """
+        if not data or data[0] != SNAPSHOT_VERSION:
+            return None
+        try:
+            _, user_id, confirmed, updated_at = _HEADER.unpack_from(data)
+            offset = _HEADER.size
+            strings = []
+            for _ in range(4):
+                (length,) = _LENGTH.unpack_from(data, offset)
+                offset += _LENGTH.size
+                if length == _NONE:
+                    strings.append(None)
+                else:
+                    if offset + length > len(data):
+                        return None
+                    strings.append(data[offset:offset + length].decode())
+                    offset += length
+            if offset != len(data):
+                return None
+            username, email, avatar, role = strings
+            return cls(user_id, username, email, avatar, Role(role), confirmed,
+                       None if updated_at != updated_at else datetime.fromtimestamp(updated_at))
+        # truncated, garbled or unknown role: the caller treats it as a cache miss
+        except (struct.error, UnicodeDecodeError, ValueError, OverflowError, OSError):
+            return None
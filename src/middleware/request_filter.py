@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import re
+from ipaddress import ip_address, ip_network
+from typing import Iterable
+
+import redis.asyncio as redis
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config.config import config
+
+logger = logging.getLogger(__name__)
+
+USER_AGENTS_KEY = "request_filter:user_agents"
+BANNED_IPS_KEY = "request_filter:banned_ips"
+
+_END = "end"
+
+
+class CIDRTrie:
+    """
+    Binary prefix tree of IPv4 and IPv6 networks.
+
+    A lookup walks at most one node per address bit, however many networks are banned.
+    """
+
+    def __init__(self, networks: Iterable = ()):
+        self._roots = {4: {}, 6: {}}
+        self._networks = []
+        for network in networks:
+            self.add(network)
+
+    def add(self, network) -> None:
+        """
+        Adds a network, a single address is added as a /32 or /128 network.
+
+        :param network: Network or address, as a string or an ``ipaddress`` object.
+        :type network: str | IPv4Network | IPv6Network | IPv4Address | IPv6Address
+        """
+        network = ip_network(network, strict=False)
+        self._networks.append(network)
+        node = self._roots[network.version]
+        bits, width = int(network.network_address), network.max_prefixlen
+        for i in range(network.prefixlen):
+            if _END in node:
+                # already covered by a shorter prefix
+                return
+            node = node.setdefault((bits >> (width - 1 - i)) & 1, {})
+        node.clear()
+        node[_END] = True
+
+    def __contains__(self, address) -> bool:
+        try:
+            address = ip_address(address)
+        except ValueError:
+            return False
+        node = self._roots[address.version]
+        bits, width = int(address), address.max_prefixlen
+        for i in range(width):
+            if _END in node:
+                return True
+            node = node.get((bits >> (width - 1 - i)) & 1)
+            if node is None:
+                return False
+        return _END in node
+
+    def __len__(self) -> int:
+        return len(self._networks)
+
+
+def compile_user_agents(patterns: Iterable[str]) -> re.Pattern | None:
+    """
+    Joins user agent patterns into one alternation, so a request is matched in a single search.
+
+    Patterns are checked one at a time first, an invalid one is logged and left out instead
+    of discarding the whole list.
+
+    :param patterns: Regular expressions.
+    :type patterns: Iterable[str]
+    :return: Compiled pattern or None when there are no valid patterns.
+    :rtype: re.Pattern | None
+    """
+    valid, group_names = [], set()
+    for pattern in patterns:
+        # checked in its group, a global flag like (?i) is only valid at the start of the alternation
+        grouped = f"(?:{pattern})"
+        try:
+            names = set(re.compile(grouped).groupindex)
+        except re.error as err:
+            logger.warning("Ignoring invalid banned user agent %r: %s", pattern, err)
+            continue
+        if names & group_names:
+            logger.warning("Ignoring banned user agent %r: group name already used", pattern)
+            continue
+        group_names |= names
+        valid.append(grouped)
+    return re.compile("|".join(valid)) if valid else None
+
+
+class RequestFilterMiddleware:
+    """
+    ASGI middleware rejecting requests from banned networks or user agents with 403.
+
+    The static ban lists are extended by the Redis sets ``request_filter:user_agents``
+    and ``request_filter:banned_ips``, which are reloaded in the background every
+    ``REQUEST_FILTER_RELOAD_SECONDS`` while the application runs.
+    """
+
+    def __init__(self, app: ASGIApp, user_agents: Iterable[str] = (), banned_networks: Iterable = (),
+                 redis_client: redis.Redis | None = None, reload_interval: float = config.REQUEST_FILTER_RELOAD_SECONDS):
+        self.app = app
+        self.static_user_agents = list(user_agents)
+        self.static_networks = list(banned_networks)
+        self.redis = redis_client
+        self.reload_interval = reload_interval
+        self.user_agents = compile_user_agents(self.static_user_agents)
+        self.networks = CIDRTrie(self.static_networks)
+        self._reloader: asyncio.Task | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.app(scope, self._lifespan_receive(receive), send)
+            return
+        if scope["type"] in ("http", "websocket") and self.is_banned(scope):
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1008})
+                return
+            response = JSONResponse(status_code=403, content={"detail": "You are banned"})
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    def is_banned(self, scope: Scope) -> bool:
+        """
+        Checks the client address and user agent of a request against the ban lists.
+
+        :param scope: ASGI connection scope.
+        :type scope: Scope
+        :return: True when the request must be rejected.
+        :rtype: bool
+        """
+        client = scope.get("client")
+        if client and len(self.networks) and client[0] in self.networks:
+            return True
+        if self.user_agents is None:
+            return False
+        for name, value in scope["headers"]:
+            if name == b"user-agent":
+                return self.user_agents.search(value.decode("latin-1")) is not None
+        return False
+
+    async def reload(self) -> None:
+        """
+        Rebuilds the ban lists from the static lists and the Redis sets.
+        """
+        user_agents, networks = await asyncio.gather(self.redis.smembers(USER_AGENTS_KEY),
+                                                     self.redis.smembers(BANNED_IPS_KEY))
+        user_agents = self.static_user_agents + sorted(value.decode() for value in user_agents)
+        trie = CIDRTrie(self.static_networks)
+        for network in networks:
+            try:
+                trie.add(network.decode())
+            except ValueError:
+                logger.warning("Ignoring invalid banned network %r", network)
+        # swap both at once, requests never see a half built rule set
+        self.user_agents, self.networks = compile_user_agents(user_agents), trie
+
+    async def _reload_loop(self) -> None:
+        while True:
+            try:
+                await self.reload()
+            except (redis.RedisError, OSError) as err:
+                logger.warning("Request filter reload failed: %s", err)
+            except Exception:
+                # keep the last rule set and the reloader alive
+                logger.exception("Request filter reload failed")
+            await asyncio.sleep(self.reload_interval)
+
+    def _lifespan_receive(self, receive: Receive) -> Receive:
+        async def wrapped() -> Message:
+            message = await receive()
+            if message["type"] == "lifespan.startup" and self.redis is not None:
+                self._reloader = asyncio.create_task(self._reload_loop())
+            elif message["type"] == "lifespan.shutdown" and self._reloader is not None:
+                self._reloader.cancel()
+            return message
+        return wrapped
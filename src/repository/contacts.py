@@ -1,17 +1,130 @@
-from sqlalchemy import select, func, or_, extract
+import base64
+import json
+import re
+
+from sqlalchemy import Row, select, func, or_, tuple_, literal_column, table, column, bindparam, insert, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.entity.models import Contact, User
-from typing import List
+from src.entity.models import Contact, User, search_document, birthday_key, owned_tokens
+from typing import AsyncIterator, List
 
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 
 #from sqlalchemy.orm import Session
-from src.schemas.contacts import ContactModel
+from src.schemas.contacts import ContactModel, ContactResponse, BatchOperation, BatchItemResult
+
+
+CURSOR_ORDER = (Contact.lastname, Contact.firstname, Contact.id)
+
+SEARCH_MAX_TERMS = 8
+# columns written by the Core write paths, in COPY order
+WRITE_COLUMNS = ("firstname", "lastname", "email", "mobilenamber", "databirthday", "note", "birthday_mmdd",
+                 "user_id", "createdat", "updated_at")
+# columns never changed by an update
+IMMUTABLE_COLUMNS = ("user_id", "createdat")
+# columns of an export row, in output order
+EXPORT_COLUMNS = ("id", "firstname", "lastname", "email", "mobilenamber", "databirthday", "note")
+EXPORT_BATCH_SIZE = 1000
+# columns of the read-only row variants, in ContactResponse field order
+ROW_COLUMNS = tuple(Contact.__table__.c[name] for name in EXPORT_COLUMNS)
+contact_fts = table("contact_fts", column("rowid"), column("rank"))
+
+
+def encode_cursor(contact: Contact) -> str:
+    """
+    Builds an opaque pagination cursor from the sort key of a contact.
+
+    :param contact: The last contact of the current page.
+    :type contact: Contact
+    :return: Url-safe cursor token.
+    :rtype: str
+    """
+    key = json.dumps([contact.lastname, contact.firstname, contact.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple | None:
+    """
+    Decodes a pagination cursor back into a sort key.
+
+    :param cursor: Cursor token, an empty string starts from the first page.
+    :type cursor: str
+    :return: The (lastname, firstname, id) sort key or None for the first page.
+    :rtype: tuple | None
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        lastname, firstname, contact_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(lastname), str(firstname), int(contact_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
 
 
+def next_cursor(contacts: List[Contact], limit: int) -> str | None:
+    """
+    Returns the cursor of the next page or None if this page is the last one.
 
-async def get_contacts(limit: int, offset: int, db: AsyncSession, user: User) -> List[Contact]:
+    :param contacts: Contacts of the current page.
+    :type contacts: List[Contact]
+    :param limit: The page size.
+    :type limit: int
+    :return: Cursor token.
+    :rtype: str | None
+    """
+    if len(contacts) < limit:
+        return None
+    return encode_cursor(contacts[-1])
+
+
+def paginate(stmt, limit: int, offset: int, cursor: str | None):
+    """
+    Applies offset or keyset pagination to a contacts query.
+
+    When ``cursor`` is None the legacy OFFSET/LIMIT mode is used, otherwise rows are
+    ordered by (lastname, firstname, id) and read after the key stored in the cursor.
+
+    :param stmt: Select statement.
+    :type stmt: Select
+    :param limit: The maximum number of contacts to return.
+    :type limit: int
+    :param offset: The number of contacts to skip, ignored in cursor mode.
+    :type offset: int
+    :param cursor: Cursor token.
+    :type cursor: str | None
+    :return: Paginated statement.
+    :rtype: Select
+    """
+    if cursor is None:
+        return stmt.offset(offset).limit(limit)
+    key = decode_cursor(cursor)
+    stmt = stmt.order_by(*CURSOR_ORDER)
+    if key is not None:
+        stmt = stmt.where(tuple_(*CURSOR_ORDER) > key)
+    return stmt.limit(limit)
+
+
+def select_contacts(user: User, rows: bool = False):
+    """
+    Starts a query of the contacts of a user.
+
+    ORM contacts also load their user (``Contact.user`` is a joined relationship) and go
+    through the identity map. Rows select only :data:`ROW_COLUMNS` from the contact
+    table, they are plain named tuples with the attributes of a response.
+
+    :param user: The owner of the contacts.
+    :type user: User
+    :param rows: Select response rows instead of ORM contacts.
+    :type rows: bool
+    :return: Select statement.
+    :rtype: Select
+    """
+    stmt = select(*ROW_COLUMNS) if rows else select(Contact)
+    return stmt.where(Contact.user_id == user.id)
+
+
+async def get_contacts(limit: int, offset: int, db: AsyncSession, user: User, cursor: str | None = None) -> List[Contact]:
     """
     Retrieves a list of contacts for a specific user with specified pagination parameters.
 
@@ -19,6 +132,8 @@ async def get_contacts(limit: int, offset: int, db: AsyncSession, user: User) ->
     :type offset: int
     :param limit: The maximum number of cntacts to return.
     :type limit: int
+    :param cursor: Keyset pagination cursor, None keeps offset mode.
+    :type cursor: str | None
     :param user: The user to retrieve contacts for.
     :type user: User
     :param db: The database session.
@@ -26,10 +141,30 @@ async def get_contacts(limit: int, offset: int, db: AsyncSession, user: User) ->
     :return: A list of notes.
     :rtype: List[Note]
     """
-    stmt = select(Contact).filter_by(user=user).offset(offset).limit(limit)
+    stmt = paginate(select_contacts(user), limit, offset, cursor)
     contacts =  await db.execute(stmt)
     return contacts.scalars().all()
-   
+
+
+async def get_contact_rows(limit: int, offset: int, db: AsyncSession, user: User, cursor: str | None = None) -> List[Row]:
+    """
+    Read-only variant of :func:`get_contacts` returning response rows.
+
+    :param offset: The number of contacts to skip.
+    :type offset: int
+    :param limit: The maximum number of contacts to return.
+    :type limit: int
+    :param cursor: Keyset pagination cursor, None keeps offset mode.
+    :type cursor: str | None
+    :param user: The user to retrieve contacts for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Rows in :data:`ROW_COLUMNS` order.
+    :rtype: List[Row]
+    """
+    result = await db.execute(paginate(select_contacts(user, rows=True), limit, offset, cursor))
+    return result.all()
 
 
 async def get_contact(contact_id: int, db: AsyncSession, user: User) -> Contact:
@@ -50,7 +185,23 @@ async def get_contact(contact_id: int, db: AsyncSession, user: User) -> Contact:
     return contact.scalar_one_or_none()
 
 
-async def get_contact_firstname(limit: int, offset: int, firstname: str ,lastname: str,email: str  ,  db: AsyncSession, user: User):
+def name_filter(firstname: str, lastname: str, email: str):
+    """
+    Matches contacts with any of the given firstname, lastname or email.
+
+    :param firstname: Firstname param.
+    :type firstname: str
+    :param lastname: Lastname param.
+    :type lastname: str
+    :param email: Email param.
+    :type email: str
+    :return: Where clause.
+    :rtype: ColumnElement[bool]
+    """
+    return or_(Contact.firstname == firstname, Contact.lastname == lastname, Contact.email == email)
+
+
+async def get_contact_firstname(limit: int, offset: int, firstname: str ,lastname: str,email: str  ,  db: AsyncSession, user: User, cursor: str | None = None):
     """
     Retrieves a list of contacts for a specific user with specified pagination parameters.
 
@@ -58,6 +209,8 @@ async def get_contact_firstname(limit: int, offset: int, firstname: str ,lastnam
     :type offset: int
     :param limit: The maximum number of cntacts to return.
     :type limit: int
+    :param cursor: Keyset pagination cursor, None keeps offset mode.
+    :type cursor: str | None
     :param firstname: Firstname param.
     :type firstname: str
     :param lastname: Lastname param.
@@ -71,18 +224,165 @@ async def get_contact_firstname(limit: int, offset: int, firstname: str ,lastnam
     :return: A list of notes.
     :rtype: List[Note]
     """
-    stmt = select(Contact).filter_by(user=user).where(or_(Contact.firstname == firstname,Contact.lastname == lastname,Contact.email == email)).offset(offset).limit(limit)
+    stmt = select_contacts(user).where(name_filter(firstname, lastname, email))
+    stmt = paginate(stmt, limit, offset, cursor)
     contacts =  await db.execute(stmt)
-    return contacts.scalars().all()  
+    return contacts.scalars().all()
+
+
+async def get_contact_firstname_rows(limit: int, offset: int, firstname: str, lastname: str, email: str,
+                                     db: AsyncSession, user: User, cursor: str | None = None) -> List[Row]:
+    """
+    Read-only variant of :func:`get_contact_firstname` returning response rows.
+
+    :param offset: The number of contacts to skip.
+    :type offset: int
+    :param limit: The maximum number of contacts to return.
+    :type limit: int
+    :param cursor: Keyset pagination cursor, None keeps offset mode.
+    :type cursor: str | None
+    :param firstname: Firstname param.
+    :type firstname: str
+    :param lastname: Lastname param.
+    :type lastname: str
+    :param email: Email param.
+    :type email: str
+    :param user: The user to retrieve contacts for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Rows in :data:`ROW_COLUMNS` order.
+    :rtype: List[Row]
+    """
+    stmt = select_contacts(user, rows=True).where(name_filter(firstname, lastname, email))
+    result = await db.execute(paginate(stmt, limit, offset, cursor))
+    return result.all()
+
+
+def search_terms(query: str) -> List[str]:
+    """
+    Splits a free text query into lowercase search terms.
+
+    :param query: Query typed by the user.
+    :type query: str
+    :return: Search terms.
+    :rtype: List[str]
+    """
+    return re.findall(r"\w+", query.lower())[:SEARCH_MAX_TERMS]
+
+
+async def search_contacts(query: str, limit: int, offset: int, db: AsyncSession, user: User) -> List[Contact]:
+    """
+    Searches contacts of a user by prefix and fuzzy matching, ranked by relevance.
+
+    Firstname, lastname, email, phone and note are searched. On Postgres the query is
+    served by the ``tsvector`` (prefix) and ``pg_trgm`` (misspellings) GIN indexes, on
+    SQLite by the ``contact_fts`` FTS5 table (prefix matching only), whose tokens carry
+    the owner so the match only reads the caller's entries.
+
+    :param query: Query typed by the user.
+    :type query: str
+    :param limit: The maximum number of cntacts to return.
+    :type limit: int
+    :param offset: The number of contacts to skip.
+    :type offset: int
+    :param user: The user to retrieve contacts for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: A list of contacts, best matches first.
+    :rtype: List[Contact]
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    stmt = select(Contact).filter_by(user_id=user.id)
+    if db.get_bind().dialect.name == "sqlite":
+        tokens = owned_tokens(user.id, " ".join(terms)).split()
+        if not tokens:
+            return []
+        match = " OR ".join(f'"{token}"*' for token in tokens)
+        stmt = stmt.join(contact_fts, contact_fts.c.rowid == Contact.id)\
+            .where(literal_column("contact_fts").op("MATCH")(match))\
+            .order_by(contact_fts.c.rank, Contact.id)
+    else:
+        document = literal_column(f"({search_document('contact')})")
+        tsquery = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+        tsvector = func.to_tsvector(literal_column("'simple'"), document)
+        text_query = bindparam("search_query", " ".join(terms))
+        stmt = stmt.where(or_(tsvector.op("@@")(tsquery), text_query.op("<%")(document)))\
+            .order_by((func.ts_rank(tsvector, tsquery) + func.word_similarity(text_query, document)).desc(), Contact.id)
+    contacts = await db.execute(stmt.offset(offset).limit(limit))
+    return contacts.scalars().all()
+
+
+def birthday_window(days: int, today: date | None = None):
+    """
+    Returns the MMDD range of birthdays in the next ``days`` days.
+
+    :param days: Window length in days, today included.
+    :type days: int
+    :param today: First day of the window, defaults to the current date.
+    :type today: date | None
+    :return: (start, end) keys, the window wraps into January when end < start,
+        None when the window covers the whole year.
+    :rtype: tuple[int, int] | None
+    """
+    today = today or date.today()
+    if days >= 365:
+        return None
+    return birthday_key(today), birthday_key(today + timedelta(days=days))
+
+
+def birthday_query(stmt, skip: int, limit: int, cursor: str | None, days: int):
+    """
+    Restricts a contacts query to upcoming birthdays and paginates it.
+
+    :param stmt: Select statement.
+    :type stmt: Select
+    :param skip: The number of contacts to skip.
+    :type skip: int
+    :param limit: The maximum number of contacts to return.
+    :type limit: int
+    :param cursor: Keyset pagination cursor, None keeps offset mode.
+    :type cursor: str | None
+    :param days: Number of days to look ahead.
+    :type days: int
+    :return: Paginated statement.
+    :rtype: Select
+    """
+    today = date.today()
+    window = birthday_window(days, today)
+    if window is not None:
+        start, end = window
+        if start <= end:
+            stmt = stmt.where(Contact.birthday_mmdd.between(start, end))
+        else:
+            # December -> January
+            stmt = stmt.where(or_(Contact.birthday_mmdd >= start, Contact.birthday_mmdd <= end))
+    if cursor is None:
+        # days until the birthday in MMDD steps, birthdays before today come after the 31st of December
+        stmt = stmt.order_by((Contact.birthday_mmdd - birthday_key(today) + 1300) % 1300, Contact.id)
+    return paginate(stmt, limit, skip, cursor)
+
 
-async def get_contact_birthday(skip: int, limit: int,  db: AsyncSession, user: User):
+async def get_contact_birthday(skip: int, limit: int,  db: AsyncSession, user: User, cursor: str | None = None,
+                               days: int = 7):
     """
     Retrieves a list of contacts for a specific user with specified pagination parameters.
 
+    Contacts are matched on the indexed ``birthday_mmdd`` key, so the lookup is a range
+    scan of ``ix_contact_user_id_birthday_mmdd``. In offset mode the nearest birthdays
+    come first.
+
     :param skip: The number of contacts to skip.
     :type skip: int
     :param limit: The maximum number of cntacts to return.
     :type limit: int
+    :param cursor: Keyset pagination cursor, None keeps offset mode.
+    :type cursor: str | None
+    :param days: Number of days to look ahead.
+    :type days: int
     :param user: The user to retrieve contacts for.
     :type user: User
     :param db: The database session.
@@ -90,18 +390,60 @@ async def get_contact_birthday(skip: int, limit: int,  db: AsyncSession, user: U
     :return: A list of notes.
     :rtype: List[Note]
     """
-    date_now = date.today()
-    year_now = date_now.year
-    diff = date_now + timedelta(days = 7)
-    date_to = date(year=year_now, month=diff.month, day=diff.day)
-    stmt = select(Contact).filter_by(user=user).\
-        filter((extract('month', Contact.databirthday) >= date_now.month)).\
-        filter((extract('month', Contact.databirthday) <= date_to.month)).\
-        filter(extract('day', Contact.databirthday) >= date_now.day).\
-        filter(extract('day', Contact.databirthday) <= date_to.day).\
-        offset(skip).limit(limit)
-    result =  await db.execute(stmt)
-    return result.scalars().all()  
+    result =  await db.execute(birthday_query(select_contacts(user), skip, limit, cursor, days))
+    return result.scalars().all()
+
+
+async def get_contact_birthday_rows(skip: int, limit: int, db: AsyncSession, user: User, cursor: str | None = None,
+                                    days: int = 7) -> List[Row]:
+    """
+    Read-only variant of :func:`get_contact_birthday` returning response rows.
+
+    :param skip: The number of contacts to skip.
+    :type skip: int
+    :param limit: The maximum number of contacts to return.
+    :type limit: int
+    :param cursor: Keyset pagination cursor, None keeps offset mode.
+    :type cursor: str | None
+    :param days: Number of days to look ahead.
+    :type days: int
+    :param user: The user to retrieve contacts for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Rows in :data:`ROW_COLUMNS` order.
+    :rtype: List[Row]
+    """
+    result = await db.execute(birthday_query(select_contacts(user, rows=True), skip, limit, cursor, days))
+    return result.all()
+
+
+async def stream_contacts(db: AsyncSession, user: User, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[list]:
+    """
+    Streams all contacts of a user from a server-side cursor in batches of plain rows.
+
+    Rows are Core tuples in :data:`EXPORT_COLUMNS` order, no ORM objects are built and
+    only one batch is held in memory at a time.
+
+    :param db: The database session.
+    :type db: Session
+    :param user: The owner of the contacts.
+    :type user: User
+    :param batch_size: Rows fetched from the cursor at once.
+    :type batch_size: int
+    :return: Batches of rows ordered by id.
+    :rtype: AsyncIterator[list]
+    """
+    columns = [Contact.__table__.c[name] for name in EXPORT_COLUMNS]
+    stmt = (select(*columns).where(Contact.user_id == user.id).order_by(Contact.id)
+            .execution_options(yield_per=batch_size))
+    result = await db.stream(stmt)
+    try:
+        async for rows in result.partitions():
+            yield rows
+    finally:
+        await result.close()
+
 
 async def create_contact(body: ContactModel, db: AsyncSession, user: User):
     """
@@ -116,10 +458,9 @@ async def create_contact(body: ContactModel, db: AsyncSession, user: User):
     :return: A list of notes.
     :rtype: [Note]
     """
-    contact = Contact(**body.model_dump(exclude_unset=True), user=user )
-    db.add(contact)
+    stmt = insert(Contact).values(contact_values(body, user)).returning(Contact)
+    contact = await db.scalar(stmt)
     await db.commit()
-    await db.refresh(contact)
     return contact
 
 
@@ -138,18 +479,11 @@ async def update_contact(contact_id: int, body: ContactModel, db: AsyncSession,
     :return: A list of notes.
     :rtype: [Note]
     """
-    stmt = select(Contact).filter_by(user_id=user.id).filter_by(id=contact_id)
-    result = await db.execute(stmt)
-    contact = result.scalar_one_or_none()
+    values = {name: value for name, value in contact_values(body, user).items() if name not in IMMUTABLE_COLUMNS}
+    stmt = update(Contact).filter_by(user_id=user.id, id=contact_id).values(values).returning(Contact)
+    contact = await db.scalar(stmt)
     if contact:
-        contact.firstname = body.firstname
-        contact.lastname = body.lastname
-        contact.email = body.email
-        contact.mobilenamber = body.mobilenamber
-        contact.databirthday = body.databirthday
-        contact.note = body.note
         await db.commit()
-        await db.refresh(contact)
     return contact
 
 
@@ -166,11 +500,193 @@ async def remove_contact(contact_id: int, db: AsyncSession, user: User)  -> Cont
     :return: A list of notes.
     :rtype: [Note]
     """
-    stmt = select(Contact).filter_by(user=user).filter_by(id=contact_id)
-    contact = await db.execute(stmt)
-    contact = contact.scalar_one_or_none()
+    stmt = delete(Contact).filter_by(user_id=user.id, id=contact_id).returning(Contact)
+    contact = await db.scalar(stmt)
     if contact:
-        await db.delete(contact)
         await db.commit()
     return contact
 
+
+def contact_values(body: ContactModel, user: User, now: datetime | None = None) -> dict:
+    """
+    Builds the column values of a contact for the Core write paths.
+
+    Core statements bypass the ORM validators, so the derived ``birthday_mmdd`` key
+    and the timestamps are filled in here.
+
+    :param body: Body class ContactModel.
+    :type body: ContactModel
+    :param user: The owner of the contact.
+    :type user: User
+    :param now: Timestamp of the write, defaults to the current time.
+    :type now: datetime | None
+    :return: Column values.
+    :rtype: dict
+    """
+    now = now or datetime.now()
+    values = body.model_dump()
+    values["databirthday"] = datetime.combine(body.databirthday, time())
+    values["birthday_mmdd"] = birthday_key(body.databirthday)
+    values["user_id"] = user.id
+    values["createdat"] = now
+    values["updated_at"] = now
+    return values
+
+
+async def _insert_rows(rows: List[dict], db: AsyncSession) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        # COPY is the fastest bulk path on Postgres, it runs on the session connection
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Contact.__tablename__, columns=WRITE_COLUMNS,
+            records=[tuple(row[name] for name in WRITE_COLUMNS) for row in rows],
+        )
+    else:
+        await db.execute(insert(Contact), rows)
+
+
+async def _update_rows(rows: List[dict], ids: List[int], db: AsyncSession, user: User) -> None:
+    # executemany, the keys other than contact_id form the SET clause; the owner is part
+    # of the WHERE clause so the write itself never touches contacts of other users
+    params = [
+        {name: value for name, value in row.items() if name not in IMMUTABLE_COLUMNS} | {"contact_id": contact_id}
+        for row, contact_id in zip(rows, ids)
+    ]
+    stmt = update(Contact.__table__).where(Contact.id == bindparam("contact_id"), Contact.user_id == user.id)
+    await db.execute(stmt, params)
+
+
+async def import_contacts(bodies: List[ContactModel], db: AsyncSession, user: User,
+                          upsert: bool = False) -> tuple[int, int, int]:
+    """
+    Inserts a batch of contacts in one transaction.
+
+    Rows are written with a single executemany (``COPY`` on Postgres). With ``upsert``
+    contacts whose email already exists for the user are updated instead, and rows whose
+    email repeats later in the batch are skipped.
+
+    :param bodies: Validated contacts.
+    :type bodies: List[ContactModel]
+    :param user: The owner of the contacts.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :param upsert: Update existing contacts matched on (user_id, email).
+    :type upsert: bool
+    :return: Number of inserted, updated and skipped contacts.
+    :rtype: tuple[int, int, int]
+    """
+    now = datetime.now()
+    rows = [contact_values(body, user, now) for body in bodies]
+    updates = []
+    skipped = 0
+    if upsert and rows:
+        # the last row wins when the batch repeats an email
+        unique = list({row["email"]: row for row in rows}.values())
+        skipped, rows = len(rows) - len(unique), unique
+        stmt = select(Contact.email, Contact.id).where(Contact.user_id == user.id,
+                                                       Contact.email.in_([row["email"] for row in rows]))
+        existing = dict((await db.execute(stmt)).all())
+        updates = [row for row in rows if row["email"] in existing]
+        rows = [row for row in rows if row["email"] not in existing]
+    if rows:
+        await _insert_rows(rows, db)
+    if updates:
+        await _update_rows(updates, [existing[row["email"]] for row in updates], db, user)
+    await db.commit()
+    return len(rows), len(updates), skipped
+
+
+async def batch_contacts(operations: List[BatchOperation], db: AsyncSession, user: User) -> List[BatchItemResult]:
+    """
+    Applies mixed create, update and delete operations in one transaction.
+
+    All creates go out as one ``INSERT ... RETURNING`` per 1000 rows, updates as one executemany
+    ``UPDATE`` and deletes as one ``DELETE ... WHERE id IN``, after a single ownership check.
+    Operations on unknown contacts, or repeating a contact of an earlier operation, are
+    reported and skipped.
+
+    :param operations: Operations in request order.
+    :type operations: List[BatchOperation]
+    :param db: The database session.
+    :type db: Session
+    :param user: The owner of the contacts.
+    :type user: User
+    :return: One result per operation, in request order.
+    :rtype: List[BatchItemResult]
+    """
+    now = datetime.now()
+    results: List[BatchItemResult | None] = [None] * len(operations)
+    targets = {}
+    for index, operation in enumerate(operations):
+        if operation.op == "create":
+            continue
+        if operation.id in targets:
+            results[index] = BatchItemResult(index=index, op=operation.op, status=409, id=operation.id,
+                                             error="Contact appears more than once in the batch")
+        else:
+            targets[operation.id] = index
+    owned = set()
+    if targets:
+        stmt = select(Contact.id).where(Contact.user_id == user.id, Contact.id.in_(targets))
+        owned = set((await db.execute(stmt)).scalars())
+
+    creates, updates, deletes = [], [], []
+    for index, operation in enumerate(operations):
+        if results[index] is not None:
+            continue
+        if operation.op == "create":
+            creates.append(index)
+        elif operation.id not in owned:
+            results[index] = BatchItemResult(index=index, op=operation.op, status=404, id=operation.id,
+                                             error="Contact not found")
+        elif operation.op == "update":
+            updates.append(index)
+        else:
+            deletes.append(index)
+
+    if creates:
+        rows = [contact_values(operations[index].contact, user, now) for index in creates]
+        if db.get_bind().dialect.name == "sqlite":
+            # SQLite cannot keep parameter order in one statement and would insert row by row;
+            # as the only writer it numbers a VALUES list in order, so the ids are sorted instead
+            stmt = insert(Contact).values(rows).returning(Contact.id)
+            ids = sorted((await db.execute(stmt)).scalars().all())
+        else:
+            # one INSERT per 1000 rows, ids come back in the order of the rows
+            stmt = insert(Contact.__table__).returning(Contact.id, sort_by_parameter_order=True)
+            ids = (await db.execute(stmt, rows)).scalars().all()
+        for index, contact_id in zip(creates, ids):
+            results[index] = batch_result(index, operations[index], 201, contact_id)
+    if updates:
+        rows = [contact_values(operations[index].contact, user, now) for index in updates]
+        await _update_rows(rows, [operations[index].id for index in updates], db, user)
+        for index in updates:
+            results[index] = batch_result(index, operations[index], 200, operations[index].id)
+    if deletes:
+        ids = [operations[index].id for index in deletes]
+        await db.execute(delete(Contact.__table__).where(Contact.user_id == user.id, Contact.id.in_(ids)))
+        for index in deletes:
+            results[index] = BatchItemResult(index=index, op="delete", status=204, id=operations[index].id)
+    await db.commit()
+    return results
+
+
+def batch_result(index: int, operation: BatchOperation, status: int, contact_id: int) -> BatchItemResult:
+    """
+    Builds the result of a successful create or update from the request body.
+
+    :param index: Position of the operation in the batch.
+    :type index: int
+    :param operation: The operation.
+    :type operation: BatchOperation
+    :param status: HTTP status of the operation.
+    :type status: int
+    :param contact_id: Id of the written contact.
+    :type contact_id: int
+    :return: The result.
+    :rtype: BatchItemResult
+    """
+    contact = ContactResponse(id=contact_id, **operation.contact.model_dump())
+    return BatchItemResult(index=index, op=operation.op, status=status, id=contact_id, contact=contact)
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.entity.models import EmailOutbox
+
+
+async def enqueue_email(kind: str, recipient: str, username: str, host: str, db: AsyncSession,
+                        payload: str | None = None, replace: bool = False) -> bool:
+    """
+    Adds an email to the outbox in a single statement.
+
+    Only one message of a kind is pending per recipient. A repeated request is dropped,
+    or with ``replace`` it overwrites the pending message (a newer reset password wins).
+
+    :param kind: Message kind, ``verify`` or ``reset``.
+    :type kind: str
+    :param recipient: Email address.
+    :type recipient: str
+    :param username: Name of the recipient.
+    :type username: str
+    :param host: Base url of the links in the message.
+    :type host: str
+    :param db: The database session.
+    :type db: Session
+    :param payload: Secret part of the message, encrypted by the caller.
+    :type payload: str | None
+    :param replace: Overwrite a pending message instead of dropping the new one.
+    :type replace: bool
+    :return: True when the message was queued or replaced, False when it was a duplicate.
+    :rtype: bool
+    """
+    now = datetime.now()
+    values = dict(kind=kind, recipient=recipient, username=username, host=host, payload=payload,
+                  dedupe_key=f"{kind}:{recipient}", status="pending", attempts=0, next_attempt_at=now, created_at=now)
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(EmailOutbox).values(values)
+    if replace:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EmailOutbox.dedupe_key],
+            set_=dict(username=username, host=host, payload=payload, attempts=0, next_attempt_at=now),
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[EmailOutbox.dedupe_key])
+    result = await db.execute(stmt.returning(EmailOutbox.id))
+    queued = result.scalar_one_or_none() is not None
+    await db.commit()
+    return queued
+
+
+async def claim_emails(limit: int, lease: float, db: AsyncSession) -> List[EmailOutbox]:
+    """
+    Takes a batch of due messages for sending.
+
+    Claimed messages are leased by moving their next attempt ``lease`` seconds ahead, so
+    other workers skip them and a crashed worker's messages are retried afterwards. The
+    returned ``next_attempt_at`` is the lease, it has to be passed back to ``mark_sent``
+    and ``mark_failed``.
+
+    :param limit: Batch size.
+    :type limit: int
+    :param lease: Seconds the batch is reserved for.
+    :type lease: float
+    :param db: The database session.
+    :type db: Session
+    :return: Due messages, oldest first.
+    :rtype: List[EmailOutbox]
+    """
+    now = datetime.now()
+    stmt = (select(EmailOutbox).where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(limit))
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = stmt.with_for_update(skip_locked=True)
+    messages = (await db.execute(stmt)).scalars().all()
+    if messages:
+        # also moves next_attempt_at of the loaded messages
+        await db.execute(update(EmailOutbox).where(EmailOutbox.id.in_([message.id for message in messages]))
+                         .values(next_attempt_at=now + timedelta(seconds=lease)))
+    await db.commit()
+    return messages
+
+
+def _leased():
+    # a message replaced (enqueue_email with replace) or claimed again since has a new next_attempt_at
+    return (EmailOutbox.id == bindparam("message_id")) & (EmailOutbox.next_attempt_at == bindparam("leased_until"))
+
+
+async def mark_sent(leases: List[dict], db: AsyncSession) -> None:
+    """
+    Marks messages as sent and drops their secrets.
+
+    A message changed since it was claimed is left pending, so its new content is sent.
+
+    :param leases: Dicts with ``message_id`` and ``leased_until``, the ``next_attempt_at`` read at claim time.
+    :type leases: List[dict]
+    :param db: The database session.
+    :type db: Session
+    """
+    await db.execute(update(EmailOutbox.__table__).where(_leased())
+                     .values(status="sent", sent_at=datetime.now(), dedupe_key=None, payload=None), leases)
+    await db.commit()
+
+
+async def mark_failed(failures: List[dict], db: AsyncSession) -> None:
+    """
+    Records failed attempts, a message without ``next_attempt_at`` is given up.
+
+    A message changed since it was claimed is left as it is.
+
+    :param failures: Dicts with ``message_id``, ``leased_until``, ``attempts``, ``last_error`` and
+        ``next_attempt_at``.
+    :type failures: List[dict]
+    :param db: The database session.
+    :type db: Session
+    """
+    params = [
+        failure | ({"status": "pending"} if failure["next_attempt_at"] else
+                   {"status": "failed", "next_attempt_at": datetime.now(), "dedupe_key": None, "payload": None})
+        for failure in failures
+    ]
+    retries = [param for param in params if param["status"] == "pending"]
+    given_up = [param for param in params if param["status"] == "failed"]
+    # executemany needs the same keys in every row
+    for rows in (retries, given_up):
+        if rows:
+            await db.execute(update(EmailOutbox.__table__).where(_leased()), rows)
+    await db.commit()
@@ -1,5 +1,7 @@
+import logging
+
 from fastapi import Depends
-from sqlalchemy import select
+from sqlalchemy import select, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from libgravatar import Gravatar
 
@@ -7,6 +9,8 @@ from src.database.db import get_db
 from src.entity.models import User
 from src.schemas.user import UserSchema
 
+logger = logging.getLogger(__name__)
+
 
 async def get_user_by_email(email: str, db: AsyncSession = Depends(get_db)):
     """
@@ -41,12 +45,11 @@ async def create_user(body: UserSchema, db: AsyncSession = Depends(get_db)):
         g = Gravatar(body.email)
         avatar = g.get_image()
     except Exception as err:
-        print(err)
+        logger.warning("Gravatar lookup failed: %s", err)
 
-    new_user = User(**body.model_dump(), avatar=avatar)
-    db.add(new_user)
+    stmt = insert(User).values(**body.model_dump(), avatar=avatar).returning(User)
+    new_user = await db.scalar(stmt)
     await db.commit()
-    await db.refresh(new_user)
     return new_user
 
 async def pass_change(body: UserSchema, db: AsyncSession = Depends(get_db)):
@@ -60,12 +63,9 @@ async def pass_change(body: UserSchema, db: AsyncSession = Depends(get_db)):
     :return: New password.
     :rtype: [Note]
     """
-    stmt = select(User).filter_by(email=body.email)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
-    user.password = body.new_password
+    stmt = update(User).filter_by(email=body.email).values(password=body.new_password).returning(User)
+    user = await db.scalar(stmt)
     await db.commit()
-    await db.refresh(user)
     return user
 
 async def pass_reset(body: UserSchema,new_password, db: AsyncSession = Depends(get_db)):
@@ -79,12 +79,9 @@ async def pass_reset(body: UserSchema,new_password, db: AsyncSession = Depends(g
     :return: New password.
     :rtype: [Note]
     """
-    stmt = select(User).filter_by(email=body.email)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
-    user.password = new_password
+    stmt = update(User).filter_by(email=body.email).values(password=new_password).returning(User)
+    user = await db.scalar(stmt)
     await db.commit()
-    await db.refresh(user)
     return user
 
 async def update_token(user: User, token: str | None, db: AsyncSession):
@@ -100,7 +97,7 @@ async def update_token(user: User, token: str | None, db: AsyncSession):
     :return: New token.
     :rtype: [Note]
     """   
-    user.refresh_token = token
+    await db.execute(update(User).filter_by(id=user.id).values(refresh_token=token))
     await db.commit()
 
 async def confirmed_email(email: str, db: AsyncSession) -> None:
@@ -114,8 +111,7 @@ async def confirmed_email(email: str, db: AsyncSession) -> None:
     :return: Confirmed_email.
     :rtype: [Note]
     """
-    user = await get_user_by_email(email, db)
-    user.confirmed = True
+    await db.execute(update(User).filter_by(email=email).values(confirmed=True))
     await db.commit()
 
 async def update_avatar_url(email: str, url: str | None, db: AsyncSession) -> User:
@@ -131,8 +127,7 @@ async def update_avatar_url(email: str, url: str | None, db: AsyncSession) -> Us
     :return: New avatar url .
     :rtype: [Note]
     """
-    user = await get_user_by_email(email, db)
-    user.avatar = url
+    stmt = update(User).filter_by(email=email).values(avatar=url).returning(User)
+    user = await db.scalar(stmt)
     await db.commit()
-    await db.refresh(user)
     return user
\ No newline at end of file
@@ -1,13 +1,14 @@
 
 import random
 
-from fastapi import APIRouter, HTTPException, Depends, status, BackgroundTasks, Request, Response
+from fastapi import APIRouter, HTTPException, Depends, status, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.responses import FileResponse
 from fastapi_limiter.depends import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
+from src.entity.models import User
 from src.repository import users as repositories_users
 from src.schemas.user import UserSchema, TokenSchema, UserResponse,RequestEmail,UserSchemaChangePasword,UserSchemaResetPasword
 from src.services.auth import auth_service
@@ -19,14 +20,12 @@ get_refresh_token = HTTPBearer()
 
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED,)
-async def signup(body: UserSchema,bt: BackgroundTasks,request: Request, db: AsyncSession = Depends(get_db)):
+async def signup(body: UserSchema,request: Request, db: AsyncSession = Depends(get_db)):
     """
     Retrieves a email ,name and password of users.
 
     :param body: Email ,name and password .
     :type body: UserSchema
-    :param bt: Background tasks
-    :type bt: BackgroundTasks
     :param request: Request param.
     :type request: Request
     :param db: The database session.
@@ -37,9 +36,9 @@ async def signup(body: UserSchema,bt: BackgroundTasks,request: Request, db: Asyn
     exist_user = await repositories_users.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=messages.ACCOUNT_EXIST)
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.get_password_hash_async(body.password)
     new_user = await repositories_users.create_user(body, db)
-    bt.add_task(send_email, new_user.email, new_user.username, str(request.base_url))
+    await send_email(new_user.email, new_user.username, str(request.base_url), db)
     return new_user
 
 
@@ -50,8 +49,6 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession =
 
     :param body: Email and password .
     :type body: UserSchema
-    :param bt: Background tasks
-    :type bt: BackgroundTasks
     :param request: Request param.
     :type request: Request
     :param db: The database session.
@@ -64,24 +61,22 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession =
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
-    if not auth_service.verify_password(body.password, user.password):
+    if not await auth_service.verify_password_async(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
     # Generate JWT
-    access_token = await auth_service.create_access_token(data={"sub": user.email})
+    access_token = await auth_service.create_access_token(data={"sub": user.email, "uid": user.id})
     refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
     await repositories_users.update_token(user, refresh_token, db)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
 @router.post("/change_password", response_model=UserResponse, status_code=status.HTTP_201_CREATED,dependencies=[Depends(RateLimiter(times=1, seconds=20))],)
-async def change_password(body: UserSchemaChangePasword,bt: BackgroundTasks,request: Request, db: AsyncSession = Depends(get_db)):
+async def change_password(body: UserSchemaChangePasword,request: Request, db: AsyncSession = Depends(get_db)):
     """
     Change password.
 
     :param body: Email and password .
     :type body: UserSchema
-    :param bt: Background tasks
-    :type bt: BackgroundTasks
     :param request: Request param.
     :type request: Request
     :param db: The database session.
@@ -94,21 +89,20 @@ async def change_password(body: UserSchemaChangePasword,bt: BackgroundTasks,requ
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
-    if not auth_service.verify_password(body.password, user.password):
+    if not await auth_service.verify_password_async(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
-    body.new_password = auth_service.get_password_hash(body.new_password)
+    body.new_password = await auth_service.get_password_hash_async(body.new_password)
     new_user_pass = await repositories_users.pass_change(body, db)
+    await auth_service.invalidate_user(body.email)
     return new_user_pass
 
 @router.post("/reset_password", response_model=UserResponse, status_code=status.HTTP_201_CREATED,dependencies=[Depends(RateLimiter(times=1, seconds=20))],)
-async def reset_password(body: UserSchemaResetPasword,bt: BackgroundTasks,request: Request, db: AsyncSession = Depends(get_db)):
+async def reset_password(body: UserSchemaResetPasword,request: Request, db: AsyncSession = Depends(get_db)):
     """
     Reset password .
 
     :param body: Email and password .
     :type body: UserSchema
-    :param bt: Background tasks
-    :type bt: BackgroundTasks
     :param request: Request param.
     :type request: Request
     :param db: The database session.
@@ -127,14 +121,30 @@ async def reset_password(body: UserSchemaResetPasword,bt: BackgroundTasks,reques
     random_password =''
     for i in range(length):
         random_password += random.choice(chars)
-    print(random_password)
 
-    new_password = auth_service.get_password_hash(random_password)
+    new_password = await auth_service.get_password_hash_async(random_password)
     new_user_pass = await repositories_users.pass_reset(body, new_password, db)
-    bt.add_task(send_email_reset_pass,random_password,new_user_pass.email, new_user_pass.username, str(request.base_url))
+    await auth_service.invalidate_user(body.email)
+    await send_email_reset_pass(random_password, new_user_pass.email, new_user_pass.username, str(request.base_url), db)
     return new_user_pass
 
 
+@router.post('/logout', status_code=status.HTTP_204_NO_CONTENT)
+async def logout(user: User = Depends(auth_service.get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Logout, revokes the refresh token and drops the cached user and tokens.
+
+    :param user: The current user.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: None.
+    :rtype: None
+    """
+    await repositories_users.update_token(user, None, db)
+    await auth_service.invalidate_user(user.email)
+
+
 @router.get('/refresh_token',  response_model=TokenSchema,dependencies=[Depends(RateLimiter(times=1, seconds=20))],)
 async def refresh_token(credentials: HTTPAuthorizationCredentials = Depends(get_refresh_token),
                         db: AsyncSession = Depends(get_db)):
@@ -153,7 +163,7 @@ async def refresh_token(credentials: HTTPAuthorizationCredentials = Depends(get_
         await repositories_users.update_token(user, None, db)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
-    access_token = await auth_service.create_access_token(data={"sub": email})
+    access_token = await auth_service.create_access_token(data={"sub": email, "uid": user.id})
     refresh_token = await auth_service.create_refresh_token(data={"sub": email})
     await repositories_users.update_token(user, refresh_token, db)
     return {"access_token": access_token, "refresh_token": refresh_token,"token_type": "bearer"}
@@ -181,8 +191,7 @@ async def confirmed_email(token: str, db: AsyncSession = Depends(get_db)):
 
 
 @router.post('/request_email',dependencies=[Depends(RateLimiter(times=1, seconds=20))],)
-async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request,
-                        db: AsyncSession = Depends(get_db)):
+async def request_email(body: RequestEmail, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Retrieves a list of contacts for a specific user with specified pagination parameters.
 
@@ -199,10 +208,10 @@ async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, r
     """
     user = await repositories_users.get_user_by_email(body.email, db)
 
-    if user.confirmed:
+    if user and user.confirmed:
         return {"message": "Your email is already confirmed"}
     if user:
-        background_tasks.add_task(send_email, user.email, user.username, str(request.base_url))
+        await send_email(user.email, user.username, str(request.base_url), db)
     return {"message": "Check your email for confirmation."}
 
 
@@ -1,15 +1,21 @@
-from typing import List
+from datetime import date
+from typing import List, Literal
 
 from fastapi_limiter.depends import RateLimiter
-from fastapi import APIRouter, HTTPException, Depends, status, Query,Path
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Path, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from src.database.db import get_db
+from src.database.db import get_db, get_read_db
 from src.entity.models import User, Role
-from src.schemas.contacts import ContactModel, ContactResponse   #, ContactStatusUpdate
+from src.schemas.contacts import ContactModel, ContactResponse, ImportReport, BatchRequest, BatchResponse   #, ContactStatusUpdate
 from src.repository import contacts as repository_contacts
 from src.services.auth import auth_service
+from src.services import contact_import, contact_export
+from src.services.fast_json import dump_contact, dump_contacts
+from src.services.etags import etag_matches, not_modified
+from src.services.response_cache import NEXT_CURSOR_HEADER, ResponseCache, get_response_cache
 from src.services.roles import RoleAccess
 #from src.schemas import contacts as repository_contacts
 
@@ -19,31 +25,111 @@ router = APIRouter(prefix='/contacts', tags=["contacts"])
 access_to_route_all = RoleAccess([Role.admin, Role.moderator])
 
 
+def cursor_query(cursor: str | None = Query(None, description="Keyset pagination cursor, empty for the first page")):
+    """
+    Validates the keyset pagination cursor of a request.
+
+    :param cursor: Cursor token.
+    :type cursor: str | None
+    :return: The cursor.
+    :rtype: str | None
+    """
+    try:
+        repository_contacts.decode_cursor(cursor)
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+    return cursor
+
+
+def next_page_cursor(contacts, limit: int, cursor: str | None) -> str | None:
+    """
+    Cursor of the next page, exposed in the ``X-Next-Cursor`` header.
+
+    There is only a cursor in cursor mode and not on the last page.
+
+    :param contacts: Contacts of the current page.
+    :type contacts: List[Contact]
+    :param limit: The page size.
+    :type limit: int
+    :param cursor: Cursor token or None in offset mode.
+    :type cursor: str | None
+    :return: Next page cursor.
+    :rtype: str | None
+    """
+    if cursor is None:
+        return None
+    return repository_contacts.next_cursor(contacts, limit)
+
+
 @router.get("/", response_model=List[ContactResponse],dependencies=[Depends(RateLimiter(times=1, seconds=20))],)
-async def read_contacts(limit: int = Query(10, ge=10, le=500), offset: int = Query(0, ge=0),\
-                         db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+async def read_contacts(request: Request, limit: int = Query(10, ge=10, le=500), offset: int = Query(0, ge=0),\
+                         cursor: str | None = Depends(cursor_query), db: AsyncSession = Depends(get_read_db),\
+                         user: User = Depends(auth_service.get_current_user),\
+                         cache: ResponseCache = Depends(get_response_cache)):
     """
     Retrieves a list of contacts for a specific user with specified pagination parameters.
 
+    Passing ``cursor`` (empty for the first page) switches to keyset pagination,
+    the next page token is returned in the ``X-Next-Cursor`` header.
+
+    The response carries an ``ETag`` derived from the contact version of the user,
+    a matching ``If-None-Match`` is answered with ``304`` before any row is read.
+
+    :param request: The incoming request.
+    :type request: Request
     :param offset: The number of contacts to skip.
     :type offset: int
     :param limit: The maximum number of cntacts to return.
     :type limit: int
+    :param cursor: Keyset pagination cursor.
+    :type cursor: str | None
     :param user: The user to retrieve contacts for.
     :type user: User
     :param db: The database session.
     :type db: Session
+    :param cache: The response cache.
+    :type cache: ResponseCache
     :return: A list of contacts.
     :rtype: List[Contact]
     """
-    contacts = await repository_contacts.get_contacts(limit, offset, db, user)
-    return contacts
+    lookup = await cache.lookup(user.id, "contacts", {"limit": limit, "offset": offset, "cursor": cursor})
+    if etag_matches(request, lookup.etag):
+        return not_modified(lookup.etag)
+    if lookup.hit:
+        return lookup.response()
+    contacts = await repository_contacts.get_contact_rows(limit, offset, db, user, cursor)
+    return await lookup.store(dump_contacts(contacts), next_page_cursor(contacts, limit, cursor))
+
+
+@router.get("/export/", response_class=StreamingResponse,dependencies=[Depends(RateLimiter(times=1, seconds=20))],)
+async def export_contacts(file_format: Literal["csv", "ndjson"] = Query("ndjson", alias="format"),\
+                          db: AsyncSession = Depends(get_read_db), user: User = Depends(auth_service.get_current_user)):
+    """
+    Exports all contacts of the user as CSV or NDJSON.
+
+    Rows are streamed from a server-side cursor, memory use does not depend on the number of contacts.
+
+    :param file_format: Export format.
+    :type file_format: str
+    :param user: The user to export contacts for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Streaming export.
+    :rtype: StreamingResponse
+    """
+    return StreamingResponse(
+        contact_export.export_contacts(file_format, db, user),
+        media_type=contact_export.MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{file_format}"'},
+    )
 
 
 @router.get("/{contact_id}", response_model=ContactResponse)
 async def read_contact(contact_id: int = Path(ge=1),\
-                        db: AsyncSession = Depends(get_db),\
-                              user: User = Depends(auth_service.get_current_user)):
+                        db: AsyncSession = Depends(get_read_db),\
+                              user: User = Depends(auth_service.get_current_user),\
+                        cache: ResponseCache = Depends(get_response_cache)):
     """
     Retrieves a contact for a specific user with specified pagination parameters.
 
@@ -53,19 +139,26 @@ async def read_contact(contact_id: int = Path(ge=1),\
     :type user: User
     :param db: The database session.
     :type db: Session
+    :param cache: The response cache.
+    :type cache: ResponseCache
     :return: A contact.
     :rtype: Contact
     """
+    lookup = await cache.lookup(user.id, "contact", {"id": contact_id})
+    if lookup.hit:
+        return lookup.response()
     contact = await repository_contacts.get_contact(contact_id, db, user)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
-    return contact
+    return await lookup.store(dump_contact(contact))
 
 
 @router.get("/contacts/", response_model=List[ContactResponse],dependencies=[Depends(RateLimiter(times=1, seconds=20))],)
 async def read_contacts_name_or_surname_or_email(limit: int = Query(10, ge=10, le=50), offset: int = Query(0, ge=0),\
                                                 firstname: str | None = None,lastname: str | None = None, email: str | None = None,\
-                                                db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+                                                cursor: str | None = Depends(cursor_query),\
+                                                db: AsyncSession = Depends(get_read_db), user: User = Depends(auth_service.get_current_user),\
+                                                cache: ResponseCache = Depends(get_response_cache)):
     """
     Retrieves a list of contacts for a specific user with specified pagination parameters.
 
@@ -73,6 +166,8 @@ async def read_contacts_name_or_surname_or_email(limit: int = Query(10, ge=10, l
     :type offset: int
     :param limit: The maximum number of cntacts to return.
     :type limit: int
+    :param cursor: Keyset pagination cursor.
+    :type cursor: str | None
     :param firstname: Firstname param.
     :type firstname: str
     :param lastname: Lastname param.
@@ -83,40 +178,84 @@ async def read_contacts_name_or_surname_or_email(limit: int = Query(10, ge=10, l
     :type user: User
     :param db: The database session.
     :type db: Session
+    :param cache: The response cache.
+    :type cache: ResponseCache
     :return: A list of contscts.
     :rtype: List[Contact]
     """
-    contact = await repository_contacts.get_contact_firstname(limit,offset,firstname, lastname, email, db, user)
+    lookup = await cache.lookup(user.id, "by_name", {"limit": limit, "offset": offset, "cursor": cursor,
+                                                     "firstname": firstname, "lastname": lastname, "email": email})
+    if lookup.hit:
+        return lookup.response()
+    contact = await repository_contacts.get_contact_firstname_rows(limit, offset, firstname, lastname, email, db, user, cursor)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
-    return contact
+    return await lookup.store(dump_contacts(contact), next_page_cursor(contact, limit, cursor))
+
+@router.get("/search/", response_model=List[ContactResponse],dependencies=[Depends(RateLimiter(times=20, seconds=10))],)
+async def search_contacts(q: str = Query(min_length=1, max_length=100), limit: int = Query(10, ge=1, le=50),\
+                          offset: int = Query(0, ge=0),\
+                          db: AsyncSession = Depends(get_read_db), user: User = Depends(auth_service.get_current_user)):
+    """
+    Searches contacts by partial or misspelled name, email, phone or note.
+
+    :param q: Search query.
+    :type q: str
+    :param limit: The maximum number of cntacts to return.
+    :type limit: int
+    :param offset: The number of contacts to skip.
+    :type offset: int
+    :param user: The user to retrieve contacts for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: A list of contacts, best matches first.
+    :rtype: List[Contact]
+    """
+    contacts = await repository_contacts.search_contacts(q, limit, offset, db, user)
+    return Response(content=dump_contacts(contacts), media_type="application/json")
 
 @router.get("/birthday/", response_model=List[ContactResponse],dependencies=[Depends(RateLimiter(times=1, seconds=20))],tags=["contacts"])
-async def read_contacts_birthday(skip: int = 0, limit: int = 10,\
-                                  db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+async def read_contacts_birthday(skip: int = 0, limit: int = 10, cursor: str | None = Depends(cursor_query),\
+                                  days: int = Query(7, ge=0, le=366),\
+                                  db: AsyncSession = Depends(get_read_db), user: User = Depends(auth_service.get_current_user),\
+                                  cache: ResponseCache = Depends(get_response_cache)):
     """
-    Retrieves a list of contacts for a specific user with specified pagination parameters.
+    Retrieves a list of contacts whose birthday is in the next ``days`` days.
+
+    The window moves with the date, so cached responses are keyed by the day too.
 
     :param skip: The number of contacts to skip.
     :type skip: int
     :param limit: The maximum number of cntacts to return.
     :type limit: int
+    :param cursor: Keyset pagination cursor.
+    :type cursor: str | None
+    :param days: Number of days to look ahead.
+    :type days: int
     :param user: The user to retrieve contacts for.
     :type user: User
     :param db: The database session.
     :type db: Session
+    :param cache: The response cache.
+    :type cache: ResponseCache
     :return: A list of Contact.
     :rtype: List[Contact]
     """
-    contact = await repository_contacts.get_contact_birthday(skip, limit, db, user)
+    lookup = await cache.lookup(user.id, "birthday", {"skip": skip, "limit": limit, "cursor": cursor, "days": days,
+                                                      "today": date.today().isoformat()})
+    if lookup.hit:
+        return lookup.response()
+    contact = await repository_contacts.get_contact_birthday_rows(skip, limit, db, user, cursor, days)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
-    return contact
+    return await lookup.store(dump_contacts(contact), next_page_cursor(contact, limit, cursor))
 
 
 
 @router.post("/", response_model=ContactResponse,dependencies=[Depends(RateLimiter(times=1, seconds=20))],)
-async def create_contact(body: ContactModel, db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+async def create_contact(body: ContactModel, db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user),\
+                         cache: ResponseCache = Depends(get_response_cache)):
     """
     Create contact
 
@@ -126,15 +265,77 @@ async def create_contact(body: ContactModel, db: AsyncSession = Depends(get_db),
     :type user: User
     :param db: The database session.
     :type db: Session
+    :param cache: The response cache.
+    :type cache: ResponseCache
     :return: A list of notes.
     :rtype: Contact
     """
-    return await repository_contacts.create_contact(body, db, user)
+    contact = await repository_contacts.create_contact(body, db, user)
+    await cache.invalidate(user.id)
+    return contact
+
+
+@router.post("/import/", response_model=ImportReport,dependencies=[Depends(RateLimiter(times=1, seconds=20))],)
+async def import_contacts(file: UploadFile = File(), file_format: Literal["csv", "ndjson"] | None = Query(None, alias="format"),\
+                          upsert: bool = False,\
+                          db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user),\
+                          cache: ResponseCache = Depends(get_response_cache)):
+    """
+    Bulk import of contacts from a CSV (with header) or NDJSON file.
+
+    :param file: Uploaded file.
+    :type file: UploadFile
+    :param file_format: File format, guessed from the file name when omitted.
+    :type file_format: str
+    :param upsert: Update contacts with an existing email instead of adding duplicates.
+    :type upsert: bool
+    :param user: The user to import contacts for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :param cache: The response cache.
+    :type cache: ResponseCache
+    :return: Numbers of inserted, updated and rejected rows with the row errors.
+    :rtype: ImportReport
+    """
+    if file_format is None:
+        file_format = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+    report = await contact_import.import_contacts(file, file_format, upsert, db, user)
+    if report.inserted or report.updated:
+        await cache.invalidate(user.id)
+    return report
+
+
+@router.post("/batch/", response_model=BatchResponse,dependencies=[Depends(RateLimiter(times=1, seconds=20))],)
+async def batch_contacts(body: BatchRequest, db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user),\
+                         cache: ResponseCache = Depends(get_response_cache)):
+    """
+    Applies a list of create, update and delete operations in one transaction.
+
+    Each operation gets its own result: 201 created, 200 updated, 204 deleted,
+    404 unknown contact or 409 contact repeated within the batch.
+
+    :param body: Body class BatchRequest.
+    :type body: BatchRequest
+    :param user: The user to change contacts for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :param cache: The response cache.
+    :type cache: ResponseCache
+    :return: Per operation results in request order.
+    :rtype: BatchResponse
+    """
+    results = await repository_contacts.batch_contacts(body.operations, db, user)
+    if any(result.status < 300 for result in results):
+        await cache.invalidate(user.id)
+    return BatchResponse(results=results)
 
 
 @router.put("/{contact_id}", response_model=ContactResponse,dependencies=[Depends(RateLimiter(times=1, seconds=20))],)
 async def update_contact(body: ContactModel, contact_id: int, db:\
-                          AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+                          AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user),\
+                          cache: ResponseCache = Depends(get_response_cache)):
     """
     Update contact
 
@@ -146,12 +347,15 @@ async def update_contact(body: ContactModel, contact_id: int, db:\
     :type user: User
     :param db: The database session.
     :type db: Session
+    :param cache: The response cache.
+    :type cache: ResponseCache
     :return: A Contact.
     :rtype: Contact
     """
     contact = await repository_contacts.update_contact(contact_id, body, db, user)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+    await cache.invalidate(user.id)
     return contact
 
 # @router.patch("/{contact_id}", response_model=ContactResponse)
@@ -163,7 +367,8 @@ async def update_contact(body: ContactModel, contact_id: int, db:\
 
 
 @router.delete("/{contact_id}",  status_code=status.HTTP_204_NO_CONTENT)
-async def remove_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+async def remove_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user),\
+                         cache: ResponseCache = Depends(get_response_cache)):
     """
     Remove contact
 
@@ -173,10 +378,13 @@ async def remove_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depend
     :type user: User
     :param db: The database session.
     :type db: Session
+    :param cache: The response cache.
+    :type cache: ResponseCache
     :return: A Contact.
     :rtype: Contact
     """
     contact = await repository_contacts.remove_contact(contact_id, db, user)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+    await cache.invalidate(user.id)
     return contact
\ No newline at end of file
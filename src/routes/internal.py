@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends
+
+from src.database.db import sessionmanager
+from src.entity.models import Role
+from src.services.auth import auth_service
+from src.services.response_cache import response_cache
+from src.services.roles import RoleAccess
+
+admin_access = RoleAccess([Role.admin])
+
+# pool and cache internals, for operators only
+router = APIRouter(prefix='/healthchecker', tags=['internal'], dependencies=[Depends(admin_access)])
+
+
+@router.get("/db")
+async def db_stats():
+    """
+    Database connection pool statistics.
+
+    :return: Checked out, idle and overflow connections and checkout wait times.
+    :rtype: dict
+    """
+    return sessionmanager.stats()
+
+
+@router.get("/cache")
+async def cache_stats():
+    """
+    User cache statistics.
+
+    :return: Hit and miss counters of the user cache.
+    :rtype: dict
+    """
+    return auth_service.cache.stats()
+
+
+@router.get("/responses")
+async def response_cache_stats():
+    """
+    Contact response cache statistics.
+
+    :return: Hit and miss counters per endpoint.
+    :rtype: dict
+    """
+    return response_cache.stats()
+
+
+@router.get("/hashing")
+async def hashing_stats():
+    """
+    Password hashing pool statistics.
+
+    :return: Queue depth and hash latency of the hashing pool.
+    :rtype: dict
+    """
+    return auth_service.hasher.stats()
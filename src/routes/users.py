@@ -1,7 +1,5 @@
-import pickle
+import logging
 
-import cloudinary
-import cloudinary.uploader
 from fastapi import (
     APIRouter,
     HTTPException,
@@ -9,6 +7,8 @@ from fastapi import (
     status,
     Path,
     Query,
+    Request,
+    Response,
     UploadFile,
     File,
 )
@@ -17,18 +17,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
 from src.entity.models import User
+from src.entity.snapshot import UserSnapshot
 from src.schemas.user import UserResponse
 from src.services.auth import auth_service
+from src.config import messages
 from src.config.config import config
 from src.repository import users as repositories_users
+from src.services.avatars import AvatarStorage, get_avatar_storage
+from src.services.etags import etag_matches, make_etag, not_modified
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/users", tags=["users"])
-cloudinary.config(
-    cloud_name=config.CLD_NAME,
-    api_key=config.CLD_API_KEY,
-    api_secret=config.CLD_API_SECRET,
-    secure=True,
-)
 
 
 @router.get(
@@ -36,15 +36,27 @@ cloudinary.config(
     response_model=UserResponse,
     dependencies=[Depends(RateLimiter(times=1, seconds=20))],
 )
-async def get_current_user(user: User = Depends(auth_service.get_current_user)):
+async def get_current_user(request: Request, response: Response,
+                           user: User = Depends(auth_service.get_current_user)):
     """
     Get current user.
 
+    The ``ETag`` is derived from the cached user, a matching ``If-None-Match`` is
+    answered with ``304`` without serializing the user.
+
+    :param request: The incoming request.
+    :type request: Request
+    :param response: The outgoing response.
+    :type response: Response
     :param user: The user to retrieve contacts for.
     :type user: User
     :return: A user info.
     :rtype: User
     """
+    etag = make_etag(user.id, user.updated_at, user.username, user.email, user.avatar, user.role.value)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return user
 
 
@@ -57,9 +69,13 @@ async def get_current_user(
     file: UploadFile = File(),
     user: User = Depends(auth_service.get_current_user),
     db: AsyncSession = Depends(get_db),
+    storage: AvatarStorage = Depends(get_avatar_storage),
 ):
     """
-    Get current user.
+    Upload the avatar of the current user.
+
+    The image is stored without blocking the event loop, then the new url is written to
+    the database and the user cache.
 
     :param file: Upload file.
     :type file: UploadFile
@@ -67,16 +83,20 @@ async def get_current_user(
     :type user: User
     :param db: The database session.
     :type db: Session
-    :return: A list of contacts.
+    :param storage: The avatar storage.
+    :type storage: AvatarStorage
+    :return: The updated user.
     :rtype: User
     """
-    public_id = f"test/{user.email}"
-    res = cloudinary.uploader.upload(file.file, public_id=public_id, owerite=True)
-    print(res)
-    res_url = cloudinary.CloudinaryImage(public_id).build_url(
-        width=250, height=250, crop="fill", version=res.get("version")
-    )
-    user = await repositories_users.update_avatar_url(user.email, res_url, db)
-    auth_service.cache.set(user.email, pickle.dumps(user))
-    auth_service.cache.expire(user.email, 300)
+    if not (file.content_type or "").startswith("image/"):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=messages.AVATAR_NOT_IMAGE)
+    data = await file.read(config.AVATAR_MAX_BYTES + 1)
+    if len(data) > config.AVATAR_MAX_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=messages.AVATAR_TOO_LARGE)
+    url = await storage.save(user.email, data, file.content_type)
+    logger.debug("Avatar uploaded", extra={"url": url})
+    user = await repositories_users.update_avatar_url(user.email, url, db)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    await auth_service.cache.set(user.email, UserSnapshot.from_user(user))
     return user
\ No newline at end of file
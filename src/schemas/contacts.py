@@ -1,6 +1,6 @@
 from datetime import datetime,date
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
 class ContactModel(BaseModel):
@@ -14,6 +14,8 @@ class ContactModel(BaseModel):
 
 
 class ContactResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     firstname: str 
     lastname: str 
@@ -22,8 +24,49 @@ class ContactResponse(BaseModel):
     databirthday: date
     note: str 
 
-    class Config:
-        orm_mode = True
+
+class ImportRowError(BaseModel):
+    line: int
+    errors: List[str]
+
+
+class ImportReport(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+
+
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = Field(None, ge=1)
+    contact: Optional[ContactModel] = None
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.op != "create" and self.id is None:
+            raise ValueError(f"{self.op} requires id")
+        if self.op != "delete" and self.contact is None:
+            raise ValueError(f"{self.op} requires contact")
+        return self
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(min_length=1, max_length=1000)
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    op: str
+    status: int
+    id: Optional[int] = None
+    contact: Optional[ContactResponse] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
 
 
 
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 from src.entity.models import Role
 
@@ -21,15 +21,14 @@ class UserSchemaResetPasword(BaseModel):
     email: EmailStr
 
 class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int = 1
     username: str
     email: EmailStr
     avatar: str | None
     role: Role
 
-    class Config:
-        from_attributes = True
-
 
 class TokenSchema(BaseModel):
     access_token: str
@@ -1,29 +1,42 @@
-import pickle
+import hashlib
+import logging
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 
-import redis
 from fastapi import Depends, HTTPException, status
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 
-from src.database.db import get_db
+from src.database.db import get_read_db
+from src.database.cache import get_redis
 from src.repository import users as repository_users
+from src.services.cache import UserCache, TTLCache
+from src.services.hashing import PasswordHasher
+from src.entity.snapshot import UserSnapshot
 from src.config.config import config
 
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN_TTL = 15 * 60
+
 
 class Auth:
     pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    hasher = PasswordHasher(pwd_context, max_workers=config.HASH_POOL_SIZE, queue_limit=config.HASH_QUEUE_LIMIT)
     SECRET_KEY = config.SECRET_KEY_JWT
     ALGORITHM = config.ALGORITHM
-    cache = redis.Redis(
-        host=config.REDIS_DOMAIN,
-        port=config.REDIS_PORT,
-        db=0,
-        password=config.REDIS_PASSWORD,
+    cache = UserCache(
+        get_redis(),
+        ttl=config.USER_CACHE_TTL,
+        local_size=config.USER_CACHE_L1_SIZE,
+        local_ttl=config.USER_CACHE_L1_TTL,
+        epoch_ttl=ACCESS_TOKEN_TTL,
     )
+    # sha256(access token) -> (email, epoch), entries never outlive the token exp
+    token_cache = TTLCache(config.TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_TTL)
 
     def verify_password(self, plain_password, hashed_password):
         """
@@ -49,6 +62,30 @@ class Auth:
         """
         return self.pwd_context.hash(password)
 
+    async def verify_password_async(self, plain_password, hashed_password):
+        """
+        Verify password on the hashing pool without blocking the event loop.
+    
+        :param plain_password: Password.
+        :type plain_password: str
+        :param hashed_password: hashed_password
+        :type hashed_password: str
+        :return: True when the password matches.
+        :rtype: bool
+        """
+        return await self.hasher.verify(plain_password, hashed_password)
+
+    async def get_password_hash_async(self, password: str):
+        """
+        Get password hash on the hashing pool without blocking the event loop.
+    
+        :param password: Password.
+        :type password: str
+        :return: Password hash.
+        :rtype: str
+        """
+        return await self.hasher.hash(password)
+
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
     # define a function to generate a new access token
@@ -67,7 +104,7 @@ class Auth:
         if expires_delta:
             expire = datetime.utcnow() + timedelta(seconds=expires_delta)
         else:
-            expire = datetime.utcnow() + timedelta(minutes=15)
+            expire = datetime.utcnow() + timedelta(seconds=ACCESS_TOKEN_TTL)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "access_token"})
         encoded_access_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
         return encoded_access_token
@@ -111,7 +148,7 @@ class Auth:
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)):
         """
         Get current user.
     
@@ -119,8 +156,8 @@ class Auth:
         :type token: str
         :param db: The database session.
         :type db: Session
-        :return: A list of notes.
-        :rtype:  User
+        :return: The authenticated user.
+        :rtype:  UserSnapshot
         """        
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -128,34 +165,69 @@ class Auth:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-        try:
-            # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'access_token':
-                email = payload["sub"]
-                if email is None:
-                    raise credentials_exception
-            else:
-                raise credentials_exception
-        except JWTError as e:
+        email = await self.verify_access_token(token)
+        if email is None:
             raise credentials_exception
         
         user_hash = str(email)
 
-        user = self.cache.get(user_hash)
+        user = await self.cache.get(user_hash)
 
         if user is None:
-            print("User from database")
             user = await repository_users.get_user_by_email(email, db)
             if user is None:
                 raise credentials_exception
-            self.cache.set(user_hash, pickle.dumps(user))
-            self.cache.expire(user_hash, 300)
+            user = UserSnapshot.from_user(user)
+            await self.cache.set(user_hash, user)
+            logger.debug("User loaded", extra={"source": "database"})
         else:
-            print("User from cache")
-            user = pickle.loads(user)
+            logger.debug("User loaded", extra={"source": "cache"})
         return user
     
+    async def verify_access_token(self, token: str) -> str | None:
+        """
+        Verify an access token, reusing the result of earlier verifications.
+
+        Verified tokens are cached by digest until their ``exp``, so a token reused by a
+        client is decoded once. :meth:`invalidate_user` makes the cached entries of a user
+        stale by bumping the user's token epoch, kept by the user cache.
+
+        :param token: Access token.
+        :type token: str
+        :return: Email of the token subject or None when the token is invalid.
+        :rtype: str | None
+        """
+        digest = hashlib.sha256(token.encode()).digest()
+        cached = self.token_cache.get(digest)
+        if cached is not None:
+            email, epoch = cached
+            if epoch == await self.cache.epoch(email):
+                return email
+            self.token_cache.pop(digest)
+
+        try:
+            # Decode JWT
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+        except JWTError:
+            return None
+        email = payload.get("sub")
+        if payload.get("scope") != "access_token" or email is None:
+            return None
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            self.token_cache.set(digest, (email, await self.cache.epoch(email)), ttl=ttl)
+        return email
+
+    async def invalidate_user(self, email: str):
+        """
+        Drop cached tokens and the cached user, called on logout and password change.
+
+        :param email: Email of the user.
+        :type email: str
+        """
+        await self.cache.bump_epoch(email)
+        await self.cache.delete(email)
+
     def create_email_token(self, data: dict):
         """
         Create email token.
@@ -185,7 +257,7 @@ class Auth:
             email = payload["sub"]
             return email
         except JWTError as e:
-            print(e)
+            logger.info("Invalid email verification token: %s", e)
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                                 detail="Invalid token for email verification")
 
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import io
+import mimetypes
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cloudinary
+import cloudinary.uploader
+from fastapi import HTTPException, status
+from fastapi.staticfiles import StaticFiles
+
+from src.config import messages
+from src.config.config import config
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is only needed by the thumbnail backend
+    Image = ImageOps = None
+
+AVATAR_SIZE = (250, 250)
+
+
+class AvatarStorage(ABC):
+    """
+    Stores avatar images and returns the url they are served from.
+
+    Blocking work runs on ``executor``, so an upload never stalls the event loop.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        self.executor = executor
+
+    async def _run(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+
+    @abstractmethod
+    async def save(self, key: str, data: bytes, content_type: str) -> str:
+        """
+        Store an avatar.
+
+        :param key: Owner of the avatar, the user email.
+        :type key: str
+        :param data: Image bytes.
+        :type data: bytes
+        :param content_type: Media type of the image.
+        :type content_type: str
+        :return: Avatar url.
+        :rtype: str
+        """
+
+
+class CloudinaryStorage(AvatarStorage):
+    """
+    Uploads to Cloudinary, which crops the delivered image to 250x250.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, cloud_name: str, api_key: int, api_secret: str,
+                 folder: str = "test"):
+        super().__init__(executor)
+        self.folder = folder
+        cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret, secure=True)
+
+    async def save(self, key: str, data: bytes, content_type: str) -> str:
+        public_id = f"{self.folder}/{key}"
+        res = await self._run(cloudinary.uploader.upload, io.BytesIO(data), public_id=public_id, overwrite=True)
+        return cloudinary.CloudinaryImage(public_id).build_url(
+            width=AVATAR_SIZE[0], height=AVATAR_SIZE[1], crop="fill", version=res.get("version")
+        )
+
+
+class LocalStorage(AvatarStorage):
+    """
+    Writes avatars to a directory, stand-in for an object store.
+
+    Files are named by the hash of their content, so a url never changes meaning and is
+    served as immutable, equal uploads share one file.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, directory: Path, base_url: str):
+        super().__init__(executor)
+        self.directory = Path(directory)
+        self.base_url = base_url
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _write(self, name: str, data: bytes) -> None:
+        path = self.directory / name
+        if path.exists():
+            return
+        temporary = path.with_name(f".{name}.{os.getpid()}.tmp")
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+
+    async def save(self, key: str, data: bytes, content_type: str) -> str:
+        extension = mimetypes.guess_extension(content_type) or ""
+        name = hashlib.sha256(data).hexdigest()[:32] + extension
+        await self._run(self._write, name, data)
+        return self.base_url + name
+
+
+def resize_image(data: bytes, size: tuple[int, int] = AVATAR_SIZE) -> bytes:
+    """
+    Crops and scales an image to ``size``.
+
+    :param data: Image bytes.
+    :type data: bytes
+    :param size: Width and height.
+    :type size: tuple[int, int]
+    :return: JPEG bytes.
+    :rtype: bytes
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        thumbnail = ImageOps.fit(ImageOps.exif_transpose(image).convert("RGB"), size, Image.LANCZOS)
+    output = io.BytesIO()
+    thumbnail.save(output, "JPEG", quality=85, optimize=True)
+    return output.getvalue()
+
+
+class ThumbnailStorage(AvatarStorage):
+    """
+    Resizes an avatar once at upload time and stores only the thumbnail.
+
+    An upload Pillow cannot decode, corrupt or not an image at all, is rejected with 415.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, storage: AvatarStorage, resize=resize_image):
+        super().__init__(executor)
+        if resize is resize_image and Image is None:
+            raise RuntimeError("The thumbnail avatar storage needs Pillow, pip install pillow")
+        self.storage = storage
+        self.resize = resize
+
+    async def save(self, key: str, data: bytes, content_type: str) -> str:
+        try:
+            thumbnail = await self._run(self.resize, data)
+        except OSError:  # PIL.UnidentifiedImageError and truncated images
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=messages.AVATAR_NOT_IMAGE)
+        return await self.storage.save(key, thumbnail, "image/jpeg")
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    Static files whose urls change with their content, cached by clients for a year.
+    """
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+def create_avatar_storage() -> AvatarStorage:
+    """
+    Creates the storage selected by ``AVATAR_STORAGE``.
+
+    :return: Avatar storage.
+    :rtype: AvatarStorage
+    """
+    executor = ThreadPoolExecutor(max_workers=config.AVATAR_UPLOAD_WORKERS, thread_name_prefix="avatar")
+    if config.AVATAR_STORAGE == "cloudinary":
+        return CloudinaryStorage(executor, config.CLD_NAME, config.CLD_API_KEY, config.CLD_API_SECRET)
+    storage = LocalStorage(executor, Path(config.AVATAR_DIRECTORY), config.AVATAR_BASE_URL)
+    if config.AVATAR_STORAGE == "thumbnail":
+        return ThumbnailStorage(executor, storage)
+    return storage
+
+
+avatar_storage = create_avatar_storage()
+
+
+def get_avatar_storage() -> AvatarStorage:
+    return avatar_storage
@@ -0,0 +1,186 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+import redis.asyncio as redis
+
+from src.entity.snapshot import UserSnapshot
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache whose entries expire after a time to live.
+
+    Not thread safe, it is meant to be used from the event loop only.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a live entry and mark it as recently used.
+
+        :param key: Cache key.
+        :type key: Hashable
+        :param default: Value returned for missing or expired keys.
+        :type default: Any
+        :return: Cached value.
+        :rtype: Any
+        """
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """
+        Store an entry, evicting the least recently used one when full.
+
+        :param key: Cache key.
+        :type key: Hashable
+        :param value: Value.
+        :type value: Any
+        :param ttl: Time to live in seconds, defaults to the cache ttl.
+        :type ttl: float | None
+        """
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class UserCache:
+    """
+    Two tier cache of authenticated users.
+
+    Hot users are served from a small in-process :class:`TTLCache` without a network
+    hop, the rest from Redis. The local tier ttl is short because other workers can
+    not invalidate it, it bounds how long a changed user may be served stale.
+
+    Redis holds packed :class:`UserSnapshot` bytes, the local tier the decoded snapshots.
+    Token epochs live next to the users, in Redis with the same short local tier, so
+    an invalidation reaches every worker within ``local_ttl``.
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int, local_size: int, local_ttl: float, epoch_ttl: int = 15 * 60):
+        self.client = client
+        self.ttl = ttl
+        self.epoch_ttl = epoch_ttl
+        self.local = TTLCache(local_size, local_ttl)
+        self.epochs = TTLCache(local_size, local_ttl)
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> UserSnapshot | None:
+        """
+        Get a cached user.
+
+        :param key: User key.
+        :type key: str
+        :return: User snapshot or None.
+        :rtype: UserSnapshot | None
+        """
+        user = self.local.get(key)
+        if user is not None:
+            self.local_hits += 1
+            return user
+        data = await self.client.get(key)
+        # entries written in another format version count as misses
+        user = UserSnapshot.unpack(data) if data is not None else None
+        if user is None:
+            self.misses += 1
+            return None
+        self.redis_hits += 1
+        self.local.set(key, user)
+        return user
+
+    async def set(self, key: str, user: UserSnapshot) -> None:
+        """
+        Store a user in both tiers.
+
+        :param key: User key.
+        :type key: str
+        :param user: User snapshot.
+        :type user: UserSnapshot
+        """
+        self.local.set(key, user)
+        await self.client.set(key, user.pack(), ex=self.ttl)
+
+    async def delete(self, key: str) -> None:
+        """
+        Drop a user from both tiers.
+
+        :param key: User key.
+        :type key: str
+        """
+        self.local.pop(key)
+        await self.client.delete(key)
+
+    async def epoch(self, key: str) -> int:
+        """
+        Get the token epoch of a user, 0 until it is first bumped.
+
+        :param key: User key.
+        :type key: str
+        :return: Epoch.
+        :rtype: int
+        """
+        epoch = self.epochs.get(key)
+        if epoch is None:
+            epoch = int(await self.client.get(f"token_epoch:{key}") or 0)
+            self.epochs.set(key, epoch)
+        return epoch
+
+    async def bump_epoch(self, key: str) -> int:
+        """
+        Advance the token epoch of a user.
+
+        The Redis entry expires ``epoch_ttl`` after the last bump, by then every token
+        verified under an older epoch has expired too.
+
+        :param key: User key.
+        :type key: str
+        :return: New epoch.
+        :rtype: int
+        """
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(f"token_epoch:{key}")
+            pipe.expire(f"token_epoch:{key}", self.epoch_ttl)
+            epoch, _ = await pipe.execute()
+        self.epochs.set(key, epoch)
+        return epoch
+
+    def stats(self) -> dict:
+        """
+        Hit and miss counters of the cache.
+
+        :return: Counters and the local hit ratio.
+        :rtype: dict
+        """
+        total = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "local_size": len(self.local),
+            "hit_ratio": round((self.local_hits + self.redis_hits) / total, 4) if total else 0.0,
+        }
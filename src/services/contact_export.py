@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.entity.models import User
+from src.repository import contacts as repository_contacts
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def export_value(value):
+    """
+    Converts a column value to its exported form, birthdays are exported as dates.
+
+    :param value: Column value.
+    :type value: Any
+    :return: JSON serializable value.
+    :rtype: Any
+    """
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def ndjson_chunk(rows) -> str:
+    """
+    Serializes a batch of rows as NDJSON.
+
+    :param rows: Rows in ``EXPORT_COLUMNS`` order.
+    :type rows: list
+    :return: One JSON object per line.
+    :rtype: str
+    """
+    names = repository_contacts.EXPORT_COLUMNS
+    return "".join(
+        json.dumps(dict(zip(names, map(export_value, row))), ensure_ascii=False) + "\n" for row in rows
+    )
+
+
+def csv_chunk(rows, header: bool = False) -> str:
+    """
+    Serializes a batch of rows as CSV.
+
+    :param rows: Rows in ``EXPORT_COLUMNS`` order.
+    :type rows: list
+    :param header: Prepend the header line.
+    :type header: bool
+    :return: CSV lines.
+    :rtype: str
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(repository_contacts.EXPORT_COLUMNS)
+    writer.writerows([map(export_value, row) for row in rows])
+    return buffer.getvalue()
+
+
+async def export_contacts(file_format: str, db: AsyncSession, user: User) -> AsyncIterator[bytes]:
+    """
+    Streams the contacts of a user as CSV or NDJSON, one chunk per cursor batch.
+
+    :param file_format: ``csv`` or ``ndjson``.
+    :type file_format: str
+    :param db: The database session.
+    :type db: Session
+    :param user: The owner of the contacts.
+    :type user: User
+    :return: Encoded chunks of the export.
+    :rtype: AsyncIterator[bytes]
+    """
+    if file_format == "csv":
+        # the header is sent even when the user has no contacts
+        yield csv_chunk([], header=True).encode()
+    async for rows in repository_contacts.stream_contacts(db, user):
+        chunk = csv_chunk(rows) if file_format == "csv" else ndjson_chunk(rows)
+        yield chunk.encode()
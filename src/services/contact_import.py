@@ -0,0 +1,202 @@
+import codecs
+import csv
+import json
+from collections import deque
+from typing import AsyncIterator
+
+from fastapi import UploadFile
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.entity.models import User
+from src.repository import contacts as repository_contacts
+from src.schemas.contacts import ContactModel, ImportReport, ImportRowError
+
+CHUNK_SIZE = 64 * 1024
+MAX_LINE_LENGTH = 64 * 1024
+# a valid contact record is well below 1 KiB, quoted newlines included
+MAX_RECORD_LENGTH = 16 * 1024
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+EOF = object()
+
+
+async def iter_lines(file: UploadFile, chunk_size: int = CHUNK_SIZE,
+                     max_line_length: int = MAX_LINE_LENGTH) -> AsyncIterator[str | None]:
+    """
+    Reads an upload chunk by chunk and yields its lines, so memory does not grow with the file.
+
+    A line longer than ``max_line_length`` is not buffered, its characters are dropped up
+    to the next line break and None is yielded in its place.
+
+    :param file: Uploaded file.
+    :type file: UploadFile
+    :param chunk_size: Bytes read at once.
+    :type chunk_size: int
+    :param max_line_length: Longest accepted line in characters.
+    :type max_line_length: int
+    :return: Lines without the line break, None for a line that is too long.
+    :rtype: AsyncIterator[str | None]
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    overlong = False
+    while chunk := await file.read(chunk_size):
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if overlong or len(line) > max_line_length:
+                overlong = False
+                yield None
+            else:
+                yield line.rstrip("\r")
+        if len(buffer) > max_line_length:
+            overlong, buffer = True, ""
+    buffer += decoder.decode(b"", final=True)
+    if overlong or len(buffer) > max_line_length:
+        yield None
+    elif buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_csv(lines: AsyncIterator[str | None],
+                   max_record_length: int = MAX_RECORD_LENGTH) -> AsyncIterator[tuple[int, dict | None]]:
+    """
+    Parses CSV rows keyed by the header, quoted fields may span lines.
+
+    A record whose quote is still open after ``max_record_length`` characters is
+    reported as malformed at its first line, parsing resumes on the line after it.
+    At most one record is buffered and quotes are counted once per line, so an
+    unbalanced quote costs linear time and bounded memory.
+
+    :param lines: Lines of the file, None for a line that is too long.
+    :type lines: AsyncIterator[str | None]
+    :param max_record_length: Longest accepted record in characters.
+    :type max_record_length: int
+    :return: (line number, row) pairs, row is None when the record is malformed.
+    :rtype: AsyncIterator[tuple[int, dict | None]]
+    """
+    header = None
+    # (line number, line) pairs of the open record, and lines to parse again after a rejected one
+    record: list[tuple[int, str]] = []
+    pending: deque[tuple[int, str | None]] = deque()
+    length = quotes = 0
+    source = aiter(lines)
+    line_no = 0
+
+    while True:
+        if pending:
+            number, line = pending.popleft()
+        else:
+            line = await anext(source, EOF)
+            if line is EOF:
+                break
+            line_no += 1
+            number = line_no
+        if line is None:
+            if record:
+                # an overlong line ends the open record as well
+                yield record[0][0], None
+                record, length, quotes = [], 0, 0
+            yield number, None
+            continue
+        record.append((number, line))
+        length += len(line) + 1
+        quotes += line.count('"')
+        # an odd number of quotes means a quoted field continues on the next line
+        if quotes % 2:
+            if length > max_record_length:
+                yield record[0][0], None
+                pending.extendleft(reversed(record[1:]))
+                record, length, quotes = [], 0, 0
+            continue
+        text = "\n".join(part for _, part in record)
+        start = record[0][0]
+        record, length, quotes = [], 0, 0
+        values = next(csv.reader([text]), []) if text else []
+        if not values:
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield start, dict(zip(header, values))
+    if record:
+        yield record[0][0], None
+
+
+async def iter_ndjson(lines: AsyncIterator[str | None]) -> AsyncIterator[tuple[int, dict | None]]:
+    """
+    Parses one JSON object per line.
+
+    :param lines: Lines of the file, None for a line that is too long.
+    :type lines: AsyncIterator[str | None]
+    :return: (line number, row) pairs, row is None when the line is not a JSON object.
+    :rtype: AsyncIterator[tuple[int, dict | None]]
+    """
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if line is None:
+            yield line_no, None
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_no, row if isinstance(row, dict) else None
+
+
+async def import_contacts(file: UploadFile, file_format: str, upsert: bool, db: AsyncSession, user: User,
+                          batch_size: int = BATCH_SIZE) -> ImportReport:
+    """
+    Streams an uploaded CSV or NDJSON file into the contacts of a user.
+
+    Rows are validated one by one against :class:`ContactModel` and written in batches
+    of ``batch_size``, invalid rows are reported and skipped. With ``upsert`` rows whose
+    email repeats later in the same batch are counted as skipped, the last one is written.
+
+    :param file: Uploaded file.
+    :type file: UploadFile
+    :param file_format: ``csv`` or ``ndjson``.
+    :type file_format: str
+    :param upsert: Update existing contacts matched on email.
+    :type upsert: bool
+    :param db: The database session.
+    :type db: Session
+    :param user: The owner of the contacts.
+    :type user: User
+    :param batch_size: Rows per insert batch.
+    :type batch_size: int
+    :return: Import report.
+    :rtype: ImportReport
+    """
+    parse = iter_csv if file_format == "csv" else iter_ndjson
+    report = ImportReport()
+    batch = []
+
+    async def flush():
+        inserted, updated, skipped = await repository_contacts.import_contacts(batch, db, user, upsert)
+        report.inserted += inserted
+        report.updated += updated
+        report.skipped += skipped
+        batch.clear()
+
+    async for line_no, row in parse(iter_lines(file)):
+        try:
+            if row is None:
+                raise ValueError(f"Malformed {file_format} record")
+            batch.append(ContactModel.model_validate(row))
+        except (ValidationError, ValueError) as err:
+            report.failed += 1
+            if len(report.errors) < MAX_REPORTED_ERRORS:
+                messages = [f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in err.errors()] \
+                    if isinstance(err, ValidationError) else [str(err)]
+                report.errors.append(ImportRowError(line=line_no, errors=messages))
+            continue
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return report
@@ -1,77 +1,113 @@
-from pathlib import Path
+import asyncio
+import base64
+import hashlib
+import logging
+from email.mime.text import MIMEText
+from email.utils import formataddr
+from typing import List
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
+from cryptography.fernet import Fernet
 from pydantic import EmailStr
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.entity.models import EmailOutbox
+from src.repository import outbox as repository_outbox
 from src.services.auth import auth_service
+from src.services.email_templates import email_templates
 from src.config.config import config
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=config.MAIL_USERNAME,
-    MAIL_PASSWORD=config.MAIL_PASSWORD,
-    MAIL_FROM=config.MAIL_USERNAME,
-    MAIL_PORT=config.MAIL_PORT,
-    MAIL_SERVER=config.MAIL_SERVER,
-    MAIL_FROM_NAME="TODO Systems",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
-)
-
-
-async def send_email(email: EmailStr, username: str, host: str):
+logger = logging.getLogger(__name__)
+
+MAIL_FROM_NAME = "TODO Systems"
+MAIL_FROM = formataddr((MAIL_FROM_NAME, config.MAIL_USERNAME))
+
+# subject and template of every outbox message kind
+EMAIL_KINDS = {
+    "verify": ("Confirm your email ", "verify_email.html"),
+    "reset": ("Reset password ", "email_reset_pass.html"),
+}
+
+# secrets are stored encrypted in the outbox, its rows never hold a plaintext password
+payload_key = hashlib.sha256(b"email-outbox:" + config.SECRET_KEY_JWT.encode()).digest()
+payload_cipher = Fernet(base64.urlsafe_b64encode(payload_key))
+
+
+async def send_email(email: EmailStr, username: str, host: str, db: AsyncSession) -> bool:
     """
-    Send email.
+    Queues the email confirmation message, a pending one for the same address is not repeated.
 
-    :param email: Send email .
+    :param email: Recipient.
     :type email: EmailStr
-    :param username: The maximum number of cntacts to return.
+    :param username: Name of the recipient.
     :type username: str
     :param host: Host.
     :type host: str
-    :return: FastMail.
-    :rtype: FastMail
-    """    
-    try:
-        token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email ",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification},
-            subtype=MessageType.html
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="verify_email.html")
-    except ConnectionErrors as err:
-        print(err)
-
-async def send_email_reset_pass(password, email: EmailStr, username: str, host: str):
+    :param db: The database session.
+    :type db: Session
+    :return: False when a confirmation message for this address is already pending.
+    :rtype: bool
     """
-    Send email reset pass.
+    queued = await repository_outbox.enqueue_email("verify", email, username, host, db)
+    if not queued:
+        logger.info("Confirmation email already pending", extra={"kind": "verify"})
+    return queued
+
 
-    :param email: Send email reset pass .
+async def send_email_reset_pass(password, email: EmailStr, username: str, host: str, db: AsyncSession) -> bool:
+    """
+    Queues the password reset message, it replaces a pending one with an older password.
+
+    The password is encrypted into the outbox payload and decrypted only to render
+    the message.
+
+    :param password: The new password.
+    :type password: str
+    :param email: Recipient.
     :type email: EmailStr
     :param username: Username.
     :type username: str
-    :param password: Host.
-    :type password: str
-    :return: FastMail.
-    :rtype: FastMail
-    """   
-    try:
-        token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Reset password ",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification,"password": password},
-            subtype=MessageType.html
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email_reset_pass.html")
-    except ConnectionErrors as err:
-        print(err)
\ No newline at end of file
+    :param host: Host.
+    :type host: str
+    :param db: The database session.
+    :type db: Session
+    :return: True.
+    :rtype: bool
+    """
+    payload = payload_cipher.encrypt(password.encode()).decode()
+    return await repository_outbox.enqueue_email("reset", email, username, host, db, payload=payload, replace=True)
+
+
+def build_message(message: EmailOutbox) -> MIMEText:
+    """
+    Renders an outbox message into a MIME message.
+
+    The verification token is created at send time, so it is valid for its full lifetime.
+    ``MIMEText`` keeps the fixed headers as plain strings, the header objects of
+    ``EmailMessage`` cost more than rendering the template.
+
+    :param message: Outbox message.
+    :type message: EmailOutbox
+    :return: The email.
+    :rtype: MIMEText
+    """
+    subject, template_name = EMAIL_KINDS[message.kind]
+    context = {"username": message.username, "token": auth_service.create_email_token({"sub": message.recipient})}
+    if message.payload is not None:
+        context["password"] = payload_cipher.decrypt(message.payload.encode()).decode()
+    email = MIMEText(email_templates.render(template_name, message.host, **context), "html", "utf-8")
+    email["Subject"] = subject
+    email["From"] = MAIL_FROM
+    email["To"] = message.recipient
+    return email
+
+
+async def build_messages(messages: List[EmailOutbox]) -> List[MIMEText]:
+    """
+    Renders a batch of outbox messages in a worker thread, keeping the event loop free.
+
+    :param messages: Outbox messages.
+    :type messages: List[EmailOutbox]
+    :return: The emails, in the same order.
+    :rtype: List[MIMEText]
+    """
+    return await asyncio.to_thread(lambda: [build_message(message) for message in messages])
@@ -0,0 +1,71 @@
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import escape
+
+TEMPLATE_FOLDER = Path(__file__).parent / 'templates'
+
+# values that differ per message, everything else in a template only depends on the host
+MESSAGE_FIELDS = ("username", "token", "password")
+
+_MARKER = re.compile("\x1e(" + "|".join(MESSAGE_FIELDS) + ")\x1e")
+
+
+class EmailTemplates:
+    """
+    Email templates compiled once, rendered by joining precomputed static parts.
+
+    Each template is rendered once per host with markers in place of the message fields,
+    the text between the markers is cached, so links built from the host are ready made
+    and a message is rendered by escaping its fields and joining them with the parts.
+    Templates that do more with a field than print it fall back to Jinja.
+    """
+
+    def __init__(self, folder: Path = TEMPLATE_FOLDER, hosts: int = 64):
+        self.environment = Environment(loader=FileSystemLoader(folder), autoescape=select_autoescape(["html"]),
+                                       auto_reload=False, cache_size=-1)
+        self.templates = {name: self.environment.get_template(name)
+                          for name in self.environment.list_templates(extensions=["html"])}
+        self.parts = lru_cache(maxsize=hosts)(self._split)
+
+    def _split(self, name: str, host: str) -> tuple[tuple[str, ...], tuple[str, ...]] | None:
+        template = self.templates[name]
+        pieces = _MARKER.split(template.render(host=host, **{field: f"\x1e{field}\x1e" for field in MESSAGE_FIELDS}))
+        parts = (tuple(pieces[0::2]), tuple(pieces[1::2]))
+        probe = {field: f"<{field} & '\">" for field in MESSAGE_FIELDS}
+        if self._join(parts, probe) != template.render(host=host, **probe):
+            return None
+        return parts
+
+    @staticmethod
+    def _join(parts: tuple[tuple[str, ...], tuple[str, ...]], context: dict) -> str:
+        static, fields = parts
+        values = {field: escape(context.get(field, "")) for field in MESSAGE_FIELDS}
+        output = [static[0]]
+        for field, text in zip(fields, static[1:]):
+            output.append(values[field])
+            output.append(text)
+        return "".join(output)
+
+    def render(self, name: str, host: str, **context) -> str:
+        """
+        Renders a template.
+
+        :param name: Template file name.
+        :type name: str
+        :param host: Base url of the links in the message.
+        :type host: str
+        :param context: Message fields, ``username``, ``token`` and ``password``.
+        :type context: dict
+        :return: The rendered template.
+        :rtype: str
+        """
+        parts = self.parts(name, host) if context.keys() <= set(MESSAGE_FIELDS) else None
+        if parts is None:
+            return self.templates[name].render(host=host, **context)
+        return self._join(parts, context)
+
+
+email_templates = EmailTemplates()
@@ -0,0 +1,204 @@
+"""
+Email worker, sends the messages of the email outbox.
+
+    python -m src.services.email_worker
+"""
+import asyncio
+import contextlib
+import logging
+import random
+from datetime import datetime, timedelta
+
+import aiosmtplib
+
+from src.config.config import config
+from src.config.log import setup_logging
+from src.database.db import sessionmanager
+from src.repository import outbox as repository_outbox
+from src.services.email import build_messages
+
+logger = logging.getLogger(__name__)
+
+# the server refused one message, the client reset the transaction and the connection is still usable
+MESSAGE_ERRORS = (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPRecipientRefused, aiosmtplib.SMTPSenderRefused,
+                  aiosmtplib.SMTPDataError)
+
+
+class SMTPPool:
+    """
+    Pool of persistent, logged in SMTP connections.
+
+    Connections are opened on demand up to ``size`` and reused across batches. A
+    connection goes back to the pool after a refused message, on any other failure
+    or a cancellation it is closed and replaced on the next checkout.
+    """
+
+    def __init__(self, hostname: str, port: int, size: int = 2, username: str | None = None,
+                 password: str | None = None, use_tls: bool = False, start_tls: bool = False, timeout: float = 30):
+        self.hostname = hostname
+        self.port = port
+        self.size = size
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self._idle: asyncio.LifoQueue[aiosmtplib.SMTP] = asyncio.LifoQueue()
+        self._slots = asyncio.Semaphore(size)
+        self.opened = 0
+
+    async def _open(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(hostname=self.hostname, port=self.port, use_tls=self.use_tls,
+                                 start_tls=self.start_tls, timeout=self.timeout)
+        try:
+            await client.connect()
+            if self.username:
+                await client.login(self.username, self.password)
+        except BaseException:
+            client.close()
+            raise
+        self.opened += 1
+        return client
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        """
+        Checks out a connection, opening one when none is idle.
+
+        :return: Connected SMTP client.
+        :rtype: aiosmtplib.SMTP
+        """
+        async with self._slots:
+            client = None
+            while not self._idle.empty():
+                candidate = self._idle.get_nowait()
+                if candidate.is_connected:
+                    client = candidate
+                    break
+            if client is None:
+                client = await self._open()
+            try:
+                yield client
+            except MESSAGE_ERRORS:
+                self._idle.put_nowait(client)
+                raise
+            except BaseException:
+                client.close()
+                raise
+            self._idle.put_nowait(client)
+
+    async def close(self) -> None:
+        """
+        Closes the idle connections.
+        """
+        while not self._idle.empty():
+            client = self._idle.get_nowait()
+            with contextlib.suppress(aiosmtplib.SMTPException, OSError):
+                await client.quit()
+
+
+def backoff(attempts: int, base: float, maximum: float) -> float:
+    """
+    Delay before the next attempt, exponential with jitter.
+
+    :param attempts: Attempts made so far.
+    :type attempts: int
+    :param base: Delay after the first failure in seconds.
+    :type base: float
+    :param maximum: Upper bound in seconds.
+    :type maximum: float
+    :return: Delay in seconds.
+    :rtype: float
+    """
+    return min(base * 2 ** (attempts - 1), maximum) * random.uniform(0.5, 1.0)
+
+
+class EmailWorker:
+    """
+    Sends due outbox messages in batches over a :class:`SMTPPool`.
+    """
+
+    def __init__(self, pool: SMTPPool, batch_size: int = config.EMAIL_BATCH_SIZE,
+                 max_attempts: int = config.EMAIL_MAX_ATTEMPTS, backoff_base: float = config.EMAIL_BACKOFF_BASE,
+                 backoff_max: float = config.EMAIL_BACKOFF_MAX, poll_interval: float = config.EMAIL_POLL_INTERVAL,
+                 lease: float = config.EMAIL_LEASE_SECONDS, session=sessionmanager.session):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.session = session
+
+    async def _send(self, email) -> str | None:
+        try:
+            async with self.pool.connection() as client:
+                await client.send_message(email)
+        except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError) as err:
+            return str(err)[:255] or type(err).__name__
+        return None
+
+    async def run_once(self) -> int:
+        """
+        Sends one batch of due messages.
+
+        :return: Number of messages claimed.
+        :rtype: int
+        """
+        messages = []
+        async with self.session() as db:
+            messages = await repository_outbox.claim_emails(self.batch_size, self.lease, db)
+        if not messages:
+            return 0
+        emails = await build_messages(messages)
+        errors = await asyncio.gather(*(self._send(email) for email in emails))
+        sent = [{"message_id": message.id, "leased_until": message.next_attempt_at}
+                for message, error in zip(messages, errors) if error is None]
+        failures = []
+        for message, error in zip(messages, errors):
+            if error is None:
+                continue
+            attempts = message.attempts + 1
+            retry_at = None
+            if attempts < self.max_attempts:
+                retry_at = datetime.now() + timedelta(seconds=backoff(attempts, self.backoff_base, self.backoff_max))
+            failures.append({"message_id": message.id, "leased_until": message.next_attempt_at,
+                             "attempts": attempts, "last_error": error, "next_attempt_at": retry_at})
+            logger.warning("Email not sent", extra={"message_id": message.id, "kind": message.kind,
+                                                    "attempts": attempts, "error": error, "retry": bool(retry_at)})
+        async with self.session() as db:
+            if sent:
+                await repository_outbox.mark_sent(sent, db)
+            if failures:
+                await repository_outbox.mark_failed(failures, db)
+        logger.info("Email batch processed", extra={"sent": len(sent), "failed": len(failures)})
+        return len(messages)
+
+    async def run(self) -> None:
+        """
+        Sends batches until cancelled, polling the outbox while it is empty.
+        """
+        try:
+            while True:
+                if await self.run_once() < self.batch_size:
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            await self.pool.close()
+
+
+def smtp_pool() -> SMTPPool:
+    """
+    Creates the SMTP pool from the mail settings.
+
+    :return: SMTP pool.
+    :rtype: SMTPPool
+    """
+    return SMTPPool(config.MAIL_SERVER, config.MAIL_PORT, size=config.SMTP_POOL_SIZE,
+                    username=config.MAIL_USERNAME if config.MAIL_USE_CREDENTIALS else None,
+                    password=config.MAIL_PASSWORD, use_tls=config.MAIL_SSL_TLS, start_tls=config.MAIL_STARTTLS)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(EmailWorker(smtp_pool()).run())
@@ -0,0 +1,47 @@
+import hashlib
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*parts) -> str:
+    """
+    Builds a strong entity tag from the values a representation depends on.
+
+    :param parts: Values that change whenever the representation changes.
+    :type parts: Any
+    :return: Quoted entity tag.
+    :rtype: str
+    """
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str | None) -> bool:
+    """
+    Checks ``If-None-Match`` with the weak comparison RFC 9110 prescribes for it.
+
+    :param request: The incoming request.
+    :type request: Request
+    :param etag: Current entity tag, None when it is unknown.
+    :type etag: str | None
+    :return: True when the client already has the current representation.
+    :rtype: bool
+    """
+    header = request.headers.get("if-none-match")
+    if not header or etag is None:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Empty ``304 Not Modified`` response.
+
+    :param etag: Current entity tag.
+    :type etag: str
+    :return: The response.
+    :rtype: Response
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a bounded thread pool.
+
+    bcrypt releases the GIL, so the event loop keeps serving other requests while a
+    hash is computed. At most ``queue_limit`` operations may be pending (running or
+    waiting for a worker), further calls are rejected with ``503`` instead of piling up.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int, queue_limit: int):
+        self.context = context
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Server is busy, try again later", headers={"Retry-After": "1"})
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.pending -= 1
+            self.completed += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password.
+
+        :param password: Password.
+        :type password: str
+        :return: Password hash.
+        :rtype: str
+        """
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify a password against its hash.
+
+        :param plain_password: Password.
+        :type plain_password: str
+        :param hashed_password: Password hash.
+        :type hashed_password: str
+        :return: True when the password matches.
+        :rtype: bool
+        """
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """
+        Queue depth and latency of the hashing pool.
+
+        :return: Counters, latencies are in milliseconds and include the queue wait.
+        :rtype: dict
+        """
+        return {
+            "queue_depth": self.pending,
+            "queue_limit": self.queue_limit,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_ms": round(self.total_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+        }
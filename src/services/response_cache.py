@@ -0,0 +1,238 @@
+import logging
+import time
+from collections import defaultdict
+from typing import Any
+from urllib.parse import urlencode
+
+import redis.asyncio as redis
+from fastapi import Response
+
+from src.config.config import config
+from src.database.cache import get_redis
+from src.services.etags import make_etag
+
+logger = logging.getLogger(__name__)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class CacheLookup:
+    """
+    Result of a :meth:`ResponseCache.lookup`, a hit carries the cached body.
+
+    On a miss the version read before the query is kept, the response is stored under
+    it, so a write that happens while the query runs leaves the new entry stale.
+    """
+
+    __slots__ = ("cache", "user_id", "field", "version", "body", "next_cursor")
+
+    def __init__(self, cache: "ResponseCache", user_id: int, field: str, version: bytes,
+                 body: bytes | None = None, next_cursor: str = ""):
+        self.cache = cache
+        self.user_id = user_id
+        self.field = field
+        self.version = version
+        self.body = body
+        self.next_cursor = next_cursor
+
+    @property
+    def hit(self) -> bool:
+        return self.body is not None
+
+    @property
+    def etag(self) -> str | None:
+        """
+        Entity tag of the response, None while Redis is unavailable.
+
+        :return: Entity tag.
+        :rtype: str | None
+        """
+        return make_etag(self.user_id, self.version.decode(), self.field) if self.version else None
+
+    def response(self) -> Response:
+        """
+        Builds the response of the cached body.
+
+        :return: JSON response.
+        :rtype: Response
+        """
+        headers = {NEXT_CURSOR_HEADER: self.next_cursor} if self.next_cursor else {}
+        if self.version:
+            headers["ETag"] = self.etag
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+    async def store(self, body: bytes, next_cursor: str | None = None) -> Response:
+        """
+        Caches a serialized response and returns it.
+
+        :param body: JSON body.
+        :type body: bytes
+        :param next_cursor: Next page cursor to replay in the ``X-Next-Cursor`` header.
+        :type next_cursor: str | None
+        :return: JSON response.
+        :rtype: Response
+        """
+        self.body, self.next_cursor = body, next_cursor or ""
+        await self.cache.store(self)
+        return self.response()
+
+
+class ResponseCache:
+    """
+    Redis cache of serialized contact responses, invalidated per user by a version counter.
+
+    The entries of a user live in one hash, tagged with the user's contact version at
+    the time of the query. A write only increments the version, older entries stop
+    matching and are overwritten or expire with the hash, no keys are scanned or deleted.
+
+    A missing version starts at the current time in milliseconds, so a version lost
+    with Redis data never goes back to a value an older entry or entity tag was built on.
+
+    With read replicas a query right after a write may still see the old rows, for
+    ``settle_seconds`` after a write nothing is stored or tagged for that user.
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int, max_bytes: int, settle_seconds: float = 0.0):
+        self.client = client
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.settle_seconds = settle_seconds
+        self.hits: defaultdict[str, int] = defaultdict(int)
+        self.misses: defaultdict[str, int] = defaultdict(int)
+        self.errors = 0
+
+    @staticmethod
+    def version_key(user_id: int) -> str:
+        return f"response_cache:version:{user_id}"
+
+    @staticmethod
+    def entries_key(user_id: int) -> str:
+        return f"response_cache:entries:{user_id}"
+
+    @staticmethod
+    def settling_key(user_id: int) -> str:
+        return f"response_cache:settling:{user_id}"
+
+    @staticmethod
+    def seed_version() -> int:
+        return time.time_ns() // 1_000_000
+
+    @staticmethod
+    def field(endpoint: str, params: dict[str, Any]) -> str:
+        """
+        Normalizes the request parameters, equal requests map to the same field.
+
+        :param endpoint: Endpoint name.
+        :type endpoint: str
+        :param params: Query and path parameters, None values are left out.
+        :type params: dict[str, Any]
+        :return: Hash field.
+        :rtype: str
+        """
+        return f"{endpoint}?{urlencode(sorted((name, value) for name, value in params.items() if value is not None))}"
+
+    async def lookup(self, user_id: int, endpoint: str, params: dict[str, Any]) -> CacheLookup:
+        """
+        Reads the version and the entry of a request in one round trip.
+
+        :param user_id: Owner of the contacts.
+        :type user_id: int
+        :param endpoint: Endpoint name.
+        :type endpoint: str
+        :param params: Query and path parameters.
+        :type params: dict[str, Any]
+        :return: The lookup, a hit when the entry has the current version.
+        :rtype: CacheLookup
+        """
+        field = self.field(endpoint, params)
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.set(self.version_key(user_id), self.seed_version(), nx=True)
+                pipe.get(self.version_key(user_id))
+                pipe.hget(self.entries_key(user_id), field)
+                if self.settle_seconds:
+                    pipe.exists(self.settling_key(user_id))
+                _, version, entry, *settling = await pipe.execute()
+        except redis.RedisError as err:
+            self.errors += 1
+            logger.warning("Response cache unavailable: %s", err)
+            return CacheLookup(self, user_id, field, version=b"", body=None)
+        if settling and settling[0]:
+            self.misses[endpoint] += 1
+            return CacheLookup(self, user_id, field, version=b"")
+        if entry is not None:
+            entry_version, next_cursor, body = entry.split(b"\n", 2)
+            if entry_version == version:
+                self.hits[endpoint] += 1
+                return CacheLookup(self, user_id, field, version, body, next_cursor.decode())
+        self.misses[endpoint] += 1
+        return CacheLookup(self, user_id, field, version)
+
+    async def store(self, lookup: CacheLookup) -> None:
+        """
+        Stores the body of a missed lookup under the version it read.
+
+        :param lookup: A lookup with its body set.
+        :type lookup: CacheLookup
+        """
+        if not lookup.version or len(lookup.body) > self.max_bytes:
+            return
+        entry = lookup.version + b"\n" + lookup.next_cursor.encode() + b"\n" + lookup.body
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.hset(self.entries_key(lookup.user_id), lookup.field, entry)
+                pipe.expire(self.entries_key(lookup.user_id), self.ttl)
+                await pipe.execute()
+        except redis.RedisError as err:
+            self.errors += 1
+            logger.warning("Response cache unavailable: %s", err)
+
+    async def invalidate(self, user_id: int) -> None:
+        """
+        Makes every cached response of a user stale by incrementing their version.
+
+        :param user_id: Owner of the contacts.
+        :type user_id: int
+        """
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.set(self.version_key(user_id), self.seed_version(), nx=True)
+                pipe.incr(self.version_key(user_id))
+                if self.settle_seconds:
+                    pipe.set(self.settling_key(user_id), 1, px=int(self.settle_seconds * 1000))
+                await pipe.execute()
+        except redis.RedisError as err:
+            self.errors += 1
+            logger.warning("Response cache invalidation failed: %s", err)
+
+    def stats(self) -> dict:
+        """
+        Hit and miss counters per endpoint.
+
+        :return: Counters and hit ratios.
+        :rtype: dict
+        """
+        endpoints = {}
+        for endpoint in sorted(self.hits.keys() | self.misses.keys()):
+            hits, misses = self.hits[endpoint], self.misses[endpoint]
+            endpoints[endpoint] = {"hits": hits, "misses": misses, "hit_ratio": round(hits / (hits + misses), 4)}
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "errors": self.errors,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+response_cache = ResponseCache(
+    get_redis(),
+    ttl=config.RESPONSE_CACHE_TTL,
+    max_bytes=config.RESPONSE_CACHE_MAX_BYTES,
+    settle_seconds=config.DB_REPLICA_STICKY_SECONDS if config.SQLALCHEMY_REPLICA_URLS else 0.0,
+)
+
+
+def get_response_cache() -> ResponseCache:
+    return response_cache
@@ -9,8 +9,10 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, Asyn
 
 from main import app
 from src.entity.models import Base, User
-from src.database.db import get_db
+from src.database.db import get_db, get_read_db
 from src.services.auth import auth_service
+from src.services.response_cache import ResponseCache, get_response_cache
+from tests.memory_redis import MemoryRedis
 
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
@@ -54,6 +56,9 @@ def client():
             await session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    response_cache = ResponseCache(MemoryRedis(), ttl=300, max_bytes=256 * 1024)
+    app.dependency_overrides[get_response_cache] = lambda: response_cache
 
     yield TestClient(app)
 
@@ -0,0 +1,67 @@
+"""
+In-memory Redis double shared by the tests and the benchmarks.
+"""
+
+
+class MemoryRedis:
+    """
+    In-process stand-in for the Redis commands of the response cache, expiry is ignored.
+
+    ``evalsha`` always answers 0, so it also lets every request past ``RateLimiter``.
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+    async def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    async def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = value
+
+    async def expire(self, key, seconds):
+        return key in self.data
+
+    async def evalsha(self, *args):
+        return 0
+
+    def pipeline(self, transaction=True):
+        return MemoryPipeline(self)
+
+
+class MemoryPipeline:
+
+    def __init__(self, client: MemoryRedis):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((getattr(self.client, name), args, kwargs))
+
+    async def execute(self):
+        return [await command(*args, **kwargs) for command, args, kwargs in self.commands]
@@ -0,0 +1,51 @@
+import sys
+sys.path.append('../')
+
+import io
+import json
+import logging
+import unittest
+from unittest.mock import patch
+
+from src.config.config import config
+from src.config.log import JsonFormatter, setup_logging, stop_logging
+
+
+class TestLogging(unittest.TestCase):
+
+    def tearDown(self):
+        stop_logging()
+        logging.getLogger("tests.log").setLevel(logging.NOTSET)
+
+    def test_json_formatter(self):
+        record = logging.makeLogRecord({"name": "src.services.auth", "levelname": "DEBUG", "msg": "User %s",
+                                        "args": ("loaded",), "source": "cache"})
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry["message"], "User loaded")
+        self.assertEqual(entry["logger"], "src.services.auth")
+        self.assertEqual(entry["source"], "cache")
+        self.assertNotIn("args", entry)
+
+    def test_queue_listener(self):
+        stream = io.StringIO()
+        with patch.object(config, "LOG_LEVELS", {"tests.log": "DEBUG"}):
+            setup_logging(stream)
+        logger = logging.getLogger("tests.log")
+        items = ["a"]
+        logger.debug("items %s", items, extra={"request": 1})
+        items.append("b")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("failed")
+        logging.getLogger("tests.other").debug("hidden")
+        stop_logging()
+
+        entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([entry["message"] for entry in entries], ["items ['a']", "failed"])
+        self.assertEqual(entries[0]["request"], 1)
+        self.assertIn("ValueError: boom", entries[1]["exc_info"])
+
+
+if __name__ == '__main__':
+    unittest.main()
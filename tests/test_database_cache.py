@@ -0,0 +1,57 @@
+import sys
+sys.path.append('../')
+
+import asyncio
+import unittest
+
+import redis.asyncio as redis
+
+from src.database.cache import create_redis_pool, redis_pool
+
+
+class IdleConnection(redis.Connection):
+    """
+    Connection that never touches the network.
+    """
+
+    async def connect(self):
+        pass
+
+    async def can_read_destructive(self):
+        return False
+
+    async def disconnect(self, nowait: bool = False):
+        pass
+
+
+class TestRedisPool(unittest.IsolatedAsyncioTestCase):
+
+    def test_shared_pool_blocks(self):
+        self.assertIsInstance(redis_pool, redis.BlockingConnectionPool)
+
+    async def test_checkouts_above_the_cap_wait(self):
+        pool = create_redis_pool(max_connections=2, timeout=5, connection_class=IdleConnection)
+        in_use = peak = 0
+
+        async def checkout():
+            nonlocal in_use, peak
+            connection = await pool.get_connection("GET")
+            in_use += 1
+            peak = max(peak, in_use)
+            await asyncio.sleep(0.01)
+            in_use -= 1
+            await pool.release(connection)
+
+        await asyncio.gather(*(checkout() for _ in range(10)))
+        self.assertEqual(peak, 2)
+        self.assertEqual(len(pool._connections), 2)
+
+    async def test_checkout_times_out(self):
+        pool = create_redis_pool(max_connections=1, timeout=0.05, connection_class=IdleConnection)
+        await pool.get_connection("GET")
+        with self.assertRaises(redis.ConnectionError):
+            await pool.get_connection("GET")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import sys
+sys.path.append('../')
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+from fastapi import HTTPException
+from jose import jwt
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import exc, text
+from starlette.requests import Request
+
+from src.config.config import config
+from src.database.db import DatabaseSessionManager, InstrumentedAsyncQueuePool, engine_options, sticky_user
+from tests.memory_redis import MemoryRedis
+
+
+class TestEngineOptions(unittest.TestCase):
+
+    def test_postgres_options(self):
+        with patch.object(config, "DB_STATEMENT_CACHE_SIZE", 0), patch.object(config, "DB_POOL_SIZE", 7):
+            url, options = engine_options("postgresql+asyncpg://user:secret@db:5432/contacts")
+        self.assertEqual(url.query["prepared_statement_cache_size"], "0")
+        self.assertIs(options["poolclass"], InstrumentedAsyncQueuePool)
+        self.assertEqual(options["pool_size"], 7)
+        self.assertTrue(options["pool_pre_ping"])
+
+    def test_memory_sqlite_keeps_default_pool(self):
+        _, options = engine_options("sqlite+aiosqlite://")
+        self.assertEqual(options, {})
+
+
+class TestDatabaseSessionManager(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        url = f"sqlite+aiosqlite:///{Path(tempfile.mkdtemp()) / 'pool.db'}"
+        with patch.object(config, "DB_POOL_SIZE", 2), patch.object(config, "DB_MAX_OVERFLOW", 0), \
+                patch.object(config, "DB_POOL_TIMEOUT", 0.2):
+            self.manager = DatabaseSessionManager(url)
+
+    async def asyncTearDown(self):
+        await self.manager.close()
+
+    async def test_warmup(self):
+        self.assertEqual(await self.manager.warmup(5), 2)
+        stats = self.manager.stats()
+        self.assertEqual((stats["idle"], stats["checked_out"]), (2, 0))
+        self.assertEqual(stats["checkouts"], 2)
+
+    async def test_client_errors_roll_back_without_logging(self):
+        with self.assertNoLogs("src.database.db", level="ERROR"), self.assertRaises(HTTPException):
+            async with self.manager.session() as session:
+                await session.execute(text("CREATE TABLE t (x INTEGER)"))
+                await session.execute(text("INSERT INTO t VALUES (1)"))
+                raise HTTPException(status_code=404)
+        async with self.manager.session() as session:
+            self.assertEqual((await session.execute(text("SELECT count(*) FROM t"))).scalar(), 0)
+
+    async def test_unexpected_errors_are_logged(self):
+        with self.assertLogs("src.database.db", level="ERROR") as logs:
+            async with self.manager.read_session() as session:
+                await session.execute(text("SELECT 1"))
+                raise RuntimeError("boom")
+        self.assertIn("rolled back", logs.output[0])
+
+    async def test_stats_count_checkouts_and_timeouts(self):
+        async with self.manager.session() as first, self.manager.session() as second:
+            await first.execute(text("SELECT 1"))
+            await second.execute(text("SELECT 1"))
+            self.assertEqual(self.manager.stats()["checked_out"], 2)
+            engine = self.manager._engine
+            with self.assertRaises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+        stats = self.manager.stats()
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreaterEqual(stats["wait_max_ms"], 200)
+
+
+class TestReadReplicas(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.manager = DatabaseSessionManager(f"sqlite+aiosqlite:///{directory / 'primary.db'}", [
+            f"sqlite+aiosqlite:///{directory / 'missing' / 'replica.db'}",
+            f"sqlite+aiosqlite:///{directory / 'replica.db'}",
+        ], redis_client=MemoryRedis())
+        self.primary, self.broken, self.replica = self.manager._engine, *self.manager._replicas
+
+    async def asyncTearDown(self):
+        await self.manager.close()
+
+    async def bind(self, user_id=None):
+        async with self.manager.read_session(user_id) as session:
+            await session.execute(text("SELECT 1"))
+            return session.bind
+
+    async def test_unhealthy_replica_is_skipped(self):
+        self.assertIs(await self.bind(), self.replica)
+        self.assertIs(await self.bind(), self.replica)
+        health = [replica["healthy"] for replica in self.manager.stats()["replicas"]]
+        self.assertEqual(health, [False, True])
+
+    async def test_fallback_to_primary(self):
+        self.manager._replica_down_until = [float("inf")] * 2
+        self.assertIs(await self.bind(), self.primary)
+
+    async def test_read_your_writes(self):
+        redis = self.manager.redis
+        redis.set = AsyncMock(wraps=redis.set)
+        async with self.manager.session(1) as session:
+            await session.execute(text("CREATE TABLE t (id INTEGER)"))
+            await session.commit()
+            # marked by the commit itself, before the request finishes
+            self.assertTrue(await redis.exists(self.manager.write_key(1)))
+        redis.set.assert_awaited_once_with(self.manager.write_key(1), 1,
+                                           px=int(config.DB_REPLICA_STICKY_SECONDS * 1000))
+        self.assertIs(await self.bind(1), self.primary)
+        self.assertIs(await self.bind(2), self.replica)
+        self.assertIs(await self.bind(), self.replica)
+        await redis.delete(self.manager.write_key(1))  # the marker expired
+        self.assertIs(await self.bind(1), self.replica)
+
+    async def test_rollback_does_not_pin_reads(self):
+        async with self.manager.session(1) as session:
+            await session.execute(text("SELECT 1"))
+        self.assertIs(await self.bind(1), self.replica)
+
+    async def test_redis_outage_reads_from_primary(self):
+        self.manager.redis.exists = AsyncMock(side_effect=RedisConnectionError("down"))
+        with self.assertLogs("src.database.db", "WARNING"):
+            self.assertIs(await self.bind(1), self.primary)
+
+
+class TestStickyUser(unittest.TestCase):
+
+    @staticmethod
+    def request(authorization=None):
+        headers = [(b"authorization", authorization.encode())] if authorization else []
+        return Request({"type": "http", "headers": headers})
+
+    def test_user_id_from_bearer_token(self):
+        token = jwt.encode({"sub": "a@example.com", "uid": 7}, "secret", algorithm="HS256")
+        self.assertEqual(sticky_user(self.request(f"Bearer {token}")), 7)
+
+    def test_anonymous_and_malformed_requests(self):
+        old_token = jwt.encode({"sub": "a@example.com"}, "secret", algorithm="HS256")
+        for authorization in (None, "Basic abc", "Bearer not-a-jwt", f"Bearer {old_token}"):
+            self.assertIsNone(sticky_user(self.request(authorization)), authorization)
+
+
+if __name__ == '__main__':
+    unittest.main()
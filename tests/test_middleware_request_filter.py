@@ -0,0 +1,121 @@
+import sys
+sys.path.append('../')
+
+import asyncio
+import unittest
+from ipaddress import ip_address
+from unittest.mock import AsyncMock
+
+from src.middleware.request_filter import (
+    BANNED_IPS_KEY,
+    USER_AGENTS_KEY,
+    CIDRTrie,
+    RequestFilterMiddleware,
+    compile_user_agents,
+)
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def http_scope(client="172.16.0.1", user_agent: bytes | None = b"Mozilla/5.0"):
+    headers = [(b"host", b"testserver")]
+    if user_agent is not None:
+        headers.append((b"user-agent", user_agent))
+    return {"type": "http", "method": "GET", "path": "/", "raw_path": b"/", "query_string": b"",
+            "headers": headers, "client": (client, 50000)}
+
+
+async def status_of(app, scope):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+class TestCIDRTrie(unittest.TestCase):
+
+    def test_lookup(self):
+        trie = CIDRTrie(["10.1.0.0/16", ip_address("192.168.1.1"), "2001:db8::/32"])
+        self.assertIn("10.1.200.3", trie)
+        self.assertIn("192.168.1.1", trie)
+        self.assertIn("2001:db8::1", trie)
+        self.assertNotIn("10.2.0.1", trie)
+        self.assertNotIn("192.168.1.2", trie)
+        self.assertNotIn("testclient", trie)
+
+    def test_shorter_prefix_wins(self):
+        trie = CIDRTrie(["10.1.2.3", "10.0.0.0/8", "10.1.0.0/16"])
+        self.assertIn("10.200.0.1", trie)
+        self.assertEqual(len(trie), 3)
+
+    def test_compile_user_agents(self):
+        pattern = compile_user_agents([r"Googlebot", r"Python-urllib"])
+        self.assertIsNotNone(pattern.search("Python-urllib/3.11"))
+        self.assertIsNone(pattern.search("Mozilla/5.0"))
+        self.assertIsNone(compile_user_agents([]))
+
+    def test_invalid_user_agents_are_skipped(self):
+        with self.assertLogs("src.middleware.request_filter", "WARNING") as logs:
+            pattern = compile_user_agents([r"Googlebot", r"bad[", r"(?i)curl", r"(?P<bot>x)", r"(?P<bot>y)",
+                                           r"Python-urllib"])
+        self.assertEqual(len(logs.output), 3)
+        self.assertIsNotNone(pattern.search("Googlebot/2.1"))
+        self.assertIsNotNone(pattern.search("Python-urllib/3.11"))
+        self.assertIsNotNone(pattern.search("x"))
+        self.assertIsNone(pattern.search("y"))
+        with self.assertLogs("src.middleware.request_filter", "WARNING"):
+            self.assertIsNone(compile_user_agents([r"bad["]))
+
+
+class TestRequestFilterMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.app = RequestFilterMiddleware(ok_app, user_agents=[r"Googlebot"], banned_networks=["192.168.1.0/24"])
+
+    async def test_filter(self):
+        self.assertEqual(await status_of(self.app, http_scope()), 200)
+        self.assertEqual(await status_of(self.app, http_scope(user_agent=None)), 200)
+        self.assertEqual(await status_of(self.app, http_scope(user_agent=b"Googlebot/2.1")), 403)
+        self.assertEqual(await status_of(self.app, http_scope(client="192.168.1.77")), 403)
+
+    async def test_reload_from_redis(self):
+        members = {USER_AGENTS_KEY: {b"curl"}, BANNED_IPS_KEY: {b"10.0.0.0/8", b"not-an-ip"}}
+        self.app.redis = AsyncMock()
+        self.app.redis.smembers.side_effect = lambda key: members[key]
+        await self.app.reload()
+        self.assertEqual(await status_of(self.app, http_scope()), 200)
+        self.assertEqual(await status_of(self.app, http_scope(user_agent=b"curl/8.0")), 403)
+        self.assertEqual(await status_of(self.app, http_scope(client="10.9.9.9")), 403)
+        self.assertEqual(await status_of(self.app, http_scope(user_agent=b"Googlebot")), 403)
+        self.assertEqual(await status_of(self.app, http_scope(client="192.168.1.5")), 403)
+
+    async def test_reload_keeps_valid_user_agents(self):
+        members = {USER_AGENTS_KEY: {b"curl", b"wget("}, BANNED_IPS_KEY: set()}
+        self.app.redis = AsyncMock()
+        self.app.redis.smembers.side_effect = lambda key: members[key]
+        with self.assertLogs("src.middleware.request_filter", "WARNING"):
+            await self.app.reload()
+        self.assertEqual(await status_of(self.app, http_scope(user_agent=b"curl/8.0")), 403)
+        self.assertEqual(await status_of(self.app, http_scope(user_agent=b"Googlebot")), 403)
+
+    async def test_reloader_survives_unexpected_errors(self):
+        self.app.reload_interval = 0
+        self.app.reload = AsyncMock(side_effect=[RuntimeError("boom"), None, asyncio.CancelledError])
+        with self.assertLogs("src.middleware.request_filter", "ERROR") as logs:
+            with self.assertRaises(asyncio.CancelledError):
+                await self.app._reload_loop()
+        self.assertEqual(self.app.reload.await_count, 3)
+        self.assertIn("Traceback", logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
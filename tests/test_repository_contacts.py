@@ -3,14 +3,15 @@ sys.path.append('../')
 
 import unittest
 
-from datetime import datetime, date
-from unittest.mock import MagicMock, AsyncMock, Mock
+from datetime import datetime, date, timedelta
+from unittest.mock import MagicMock, AsyncMock, Mock, patch
 
+from sqlalchemy import event, text
 from sqlalchemy.orm import Session
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 
-from src.entity.models import Contact, User
-from src.schemas.contacts import ContactModel, ContactResponse
+from src.entity.models import Base, Contact, User
+from src.schemas.contacts import ContactModel, ContactResponse, BatchOperation
 from src.repository.contacts import (
     get_contacts,
     get_contact,
@@ -19,6 +20,18 @@ from src.repository.contacts import (
     create_contact,
     update_contact,
     remove_contact,
+    encode_cursor,
+    decode_cursor,
+    next_cursor,
+    search_contacts,
+    birthday_window,
+    get_contact_rows,
+    batch_contacts,
+    contact_values,
+    _update_rows,
+    get_contact_firstname_rows,
+    get_contact_birthday_rows,
+    ROW_COLUMNS,
 )
 
 
@@ -59,6 +72,26 @@ class TestAsyncContacts(unittest.IsolatedAsyncioTestCase):
         result = await get_contacts(limit, offset, user=self.user, db=self.session)
         self.assertEqual(result, contacts)
 
+    async def test_get_contacts_cursor(self):
+        contact = Contact(id=7, firstname="Ann", lastname="Lee", user=self.user)
+        mocked_contacts = MagicMock()
+        mocked_contacts.scalars.return_value.all.return_value = [contact]
+        self.session.execute.return_value = mocked_contacts
+        result = await get_contacts(1, 0, user=self.user, db=self.session, cursor=encode_cursor(contact))
+        stmt = str(self.session.execute.call_args.args[0])
+        self.assertEqual(result, [contact])
+        self.assertIn("ORDER BY contact.lastname, contact.firstname, contact.id", stmt)
+        self.assertNotIn("OFFSET", stmt)
+
+    def test_cursor_roundtrip(self):
+        contact = Contact(id=42, firstname="Ann", lastname="Lee")
+        self.assertEqual(decode_cursor(encode_cursor(contact)), ("Lee", "Ann", 42))
+        self.assertIsNone(decode_cursor(""))
+        self.assertEqual(next_cursor([contact], 2), None)
+        self.assertEqual(next_cursor([contact], 1), encode_cursor(contact))
+        with self.assertRaises(ValueError):
+            decode_cursor("not-a-cursor")
+
     async def test_get_contact(self):
         contact = Contact(
             id=1,
@@ -149,7 +182,14 @@ class TestAsyncContacts(unittest.IsolatedAsyncioTestCase):
             databirthday=datetime(year=2024,month=1,day=1),
             note="test note_1",
             )
+        self.session.scalar.return_value = Contact(id=1, **body.model_dump(), user_id=self.user.id)
         result = await create_contact(body, self.session, self.user)
+        stmt = self.session.scalar.call_args.args[0]
+        self.assertIn("RETURNING", str(stmt))
+        self.assertEqual(stmt.compile().params["user_id"], self.user.id)
+        self.assertEqual(stmt.compile().params["birthday_mmdd"], 101)
+        self.session.commit.assert_called_once()
+        self.session.refresh.assert_not_called()
         self.assertIsInstance(result, Contact)
         self.assertEqual(result.firstname, body.firstname)
         self.assertEqual(result.lastname, body.lastname)
@@ -170,12 +210,21 @@ class TestAsyncContacts(unittest.IsolatedAsyncioTestCase):
             note="test note_1",
             user=self.user
             )
-        self.session.execute.return_value = mocked_todo
+        self.session.scalar.return_value = mocked_todo.scalar_one_or_none.return_value
         result = await remove_contact(1, self.session, self.user)
-        self.session.delete.assert_called_once()
+        stmt = str(self.session.scalar.call_args.args[0])
+        self.assertTrue(stmt.startswith("DELETE"))
+        self.assertIn("RETURNING", stmt)
+        self.session.execute.assert_not_called()
         self.session.commit.assert_called_once()
         self.assertIsInstance(result, Contact)
 
+    async def test_remove_contact_not_found(self):
+        self.session.scalar.return_value = None
+        result = await remove_contact(1, self.session, self.user)
+        self.assertIsNone(result)
+        self.session.commit.assert_not_called()
+
 
     async def test_update_contact(self):
         body =  ContactModel(
@@ -199,16 +248,192 @@ class TestAsyncContacts(unittest.IsolatedAsyncioTestCase):
             note="test note_1",
             user=self.user
             )
-        self.session.execute.return_value = mocked_contact
+        self.session.scalar.return_value = mocked_contact.scalar_one_or_none.return_value
         result = await update_contact(1, body, self.session, self.user)
+        stmt = self.session.scalar.call_args.args[0]
+        self.assertTrue(str(stmt).startswith("UPDATE"))
+        self.assertIn("RETURNING", str(stmt))
+        self.assertNotIn("createdat", stmt.compile().params)
+        self.session.execute.assert_not_called()
+        self.session.refresh.assert_not_called()
         self.assertIsInstance(result, Contact)
         self.assertEqual(result.firstname, body.firstname)
         self.assertEqual(result.lastname, body.lastname)
         self.assertEqual(result.email, body.email)
         self.assertEqual(result.mobilenamber, body.mobilenamber)
-        self.assertEqual(result.databirthday, body.databirthday)
+        self.assertEqual(result.databirthday.date(), body.databirthday)
         self.assertEqual(result.note, body.note)
 
 
+class TestAsyncContactsSQLite(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)()
+        self.user = User(username='test_user', email="search@test.ua", password="qwerty", confirmed=True)
+        self.session.add(self.user)
+        await self.session.commit()
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.engine.dispose()
+
+    def body(self, firstname, lastname, note="friend", databirthday=date(1990, 5, 17)):
+        return ContactModel(firstname=firstname, lastname=lastname, email=f"{firstname.lower()}@test.ua",
+                            mobilenamber="+380501112233", databirthday=databirthday, note=note)
+
+    async def test_search_index_follows_writes(self):
+        olena = await create_contact(self.body("Olena", "Shevchenko"), self.session, self.user)
+        await create_contact(self.body("Ivan", "Kovalenko", note="colleague from shevchenko street"), self.session, self.user)
+
+        result = await search_contacts("shev", 10, 0, self.session, self.user)
+        self.assertEqual([contact.firstname for contact in result], ["Olena", "Ivan"])
+
+        await update_contact(olena.id, self.body("Olena", "Bondarenko"), self.session, self.user)
+        result = await search_contacts("bond", 10, 0, self.session, self.user)
+        self.assertEqual([contact.id for contact in result], [olena.id])
+
+        await remove_contact(olena.id, self.session, self.user)
+        self.assertEqual(await search_contacts("bond", 10, 0, self.session, self.user), [])
+        self.assertEqual(await search_contacts("  ", 10, 0, self.session, self.user), [])
+
+    async def test_search_index_is_scoped_to_owner(self):
+        other = User(username='other_user', email="other@test.ua", password="qwerty", confirmed=True)
+        self.session.add(other)
+        await self.session.commit()
+        mine = await create_contact(self.body("Olena", "Shevchenko"), self.session, self.user)
+        await create_contact(self.body("Olena", "Shevchuk"), self.session, other)
+
+        match = text("SELECT rowid FROM contact_fts WHERE contact_fts MATCH :match")
+        rows = await self.session.execute(match, {"match": f'"{self.user.id}xshev"*'})
+        self.assertEqual(rows.scalars().all(), [mine.id])
+        self.assertEqual([contact.id for contact in await search_contacts("olena shev", 10, 0, self.session, self.user)],
+                         [mine.id])
+        self.assertEqual(await search_contacts("_", 10, 0, self.session, self.user), [])
+
+    async def test_writes_issue_one_statement(self):
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(self.engine.sync_engine, "before_cursor_execute", record)
+        try:
+            contact = await create_contact(self.body("Olena", "Shevchenko"), self.session, self.user)
+            updated = await update_contact(contact.id, self.body("Olena", "Bondarenko"), self.session, self.user)
+            removed = await remove_contact(contact.id, self.session, self.user)
+            missing = await update_contact(contact.id, self.body("Olena", "Melnyk"), self.session, self.user)
+        finally:
+            event.remove(self.engine.sync_engine, "before_cursor_execute", record)
+        self.assertEqual([statement.split()[0] for statement in statements], ["INSERT", "UPDATE", "DELETE", "UPDATE"])
+        self.assertEqual((updated.lastname, updated.birthday_mmdd), ("Bondarenko", 517))
+        self.assertEqual(removed.id, contact.id)
+        self.assertIsNone(missing)
+
+    async def test_batch_issues_at_most_four_statements(self):
+        existing = [await create_contact(self.body(f"Old{number}", "Test"), self.session, self.user) for number in range(3)]
+        operations = [BatchOperation(op="create", contact=self.body(f"New{number}", "Test")) for number in range(5)]
+        operations += [BatchOperation(op="update", id=existing[0].id, contact=self.body("Changed", "Test")),
+                       BatchOperation(op="update", id=existing[1].id, contact=self.body("Changed", "Test")),
+                       BatchOperation(op="delete", id=existing[2].id)]
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(self.engine.sync_engine, "before_cursor_execute", record)
+        try:
+            results = await batch_contacts(operations, self.session, self.user)
+        finally:
+            event.remove(self.engine.sync_engine, "before_cursor_execute", record)
+        self.assertEqual([statement.split()[0] for statement in statements], ["SELECT", "INSERT", "UPDATE", "DELETE"])
+        self.assertEqual([result.status for result in results], [201] * 5 + [200, 200, 204])
+        for result in results[:5]:
+            contact = await get_contact(result.id, self.session, self.user)
+            self.assertEqual(contact.firstname, result.contact.firstname)
+
+    async def test_batch_creates_keep_parameter_order(self):
+        # the path of the other databases, SQLite runs it one row at a time
+        operations = [BatchOperation(op="create", contact=self.body(f"New{number}", "Test")) for number in range(5)]
+        with patch.object(self.engine.sync_engine.dialect, "name", "postgresql"):
+            results = await batch_contacts(operations, self.session, self.user)
+        self.assertEqual([result.status for result in results], [201] * 5)
+        for result in results:
+            contact = await get_contact(result.id, self.session, self.user)
+            self.assertEqual(contact.firstname, result.contact.firstname)
+
+    async def test_bulk_update_is_scoped_to_owner(self):
+        other = User(username='other_user', email="other@test.ua", password="qwerty", confirmed=True)
+        self.session.add(other)
+        await self.session.commit()
+        theirs = await create_contact(self.body("Theirs", "Test"), self.session, other)
+        rows = [contact_values(self.body("Stolen", "Test"), self.user)]
+        await _update_rows(rows, [theirs.id], self.session, self.user)
+        await self.session.commit()
+        self.session.expunge_all()
+        self.assertEqual((await get_contact(theirs.id, self.session, other)).firstname, "Theirs")
+
+    async def test_birthday_window_wraps_year(self):
+        today = date.today()
+        for delta, firstname in ((3, "Soon"), (40, "Later"), (0, "Today")):
+            born = (today + timedelta(days=delta)).replace(year=2000)
+            await create_contact(self.body(firstname, "Test", databirthday=born), self.session, self.user)
+
+        result = await get_contact_birthday(0, 10, self.session, self.user, days=7)
+        self.assertEqual([contact.firstname for contact in result], ["Today", "Soon"])
+        result = await get_contact_birthday(0, 10, self.session, self.user, days=60)
+        self.assertEqual([contact.firstname for contact in result], ["Today", "Soon", "Later"])
+
+    async def test_birthday_whole_year_starts_today(self):
+        today = date.today()
+        for delta, firstname in ((-1, "Yesterday"), (200, "Later"), (3, "Soon"), (0, "Today")):
+            born = (today + timedelta(days=delta)).replace(year=2000)
+            await create_contact(self.body(firstname, "Test", databirthday=born), self.session, self.user)
+
+        for days in (365, 366):
+            result = await get_contact_birthday(0, 10, self.session, self.user, days=days)
+            self.assertEqual([contact.firstname for contact in result], ["Today", "Soon", "Later", "Yesterday"])
+
+    async def test_row_variants_match_orm_reads(self):
+        today = date.today()
+        for delta, firstname in ((3, "Soon"), (40, "Later"), (0, "Today")):
+            born = (today + timedelta(days=delta)).replace(year=2000)
+            await create_contact(self.body(firstname, "Test", databirthday=born), self.session, self.user)
+        fields = [column.name for column in ROW_COLUMNS]
+        as_tuples = lambda contacts: [tuple(getattr(contact, name) for name in fields) for contact in contacts]
+
+        self.assertEqual(fields, list(ContactResponse.model_fields))
+        self.assertEqual(as_tuples(await get_contact_rows(2, 1, self.session, self.user, cursor="")),
+                         as_tuples(await get_contacts(2, 1, self.session, self.user, cursor="")))
+        self.assertEqual(as_tuples(await get_contact_firstname_rows(10, 0, "Soon", "", "later@test.ua", self.session, self.user)),
+                         as_tuples(await get_contact_firstname(10, 0, "Soon", "", "later@test.ua", self.session, self.user)))
+        rows = await get_contact_birthday_rows(0, 10, self.session, self.user, days=7)
+        self.assertEqual([row.firstname for row in rows], ["Today", "Soon"])
+        self.assertEqual(as_tuples(rows), as_tuples(await get_contact_birthday(0, 10, self.session, self.user, days=7)))
+
+    async def test_row_variants_skip_user_join_and_identity_map(self):
+        await create_contact(self.body("Olena", "Shevchenko"), self.session, self.user)
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(self.engine.sync_engine, "before_cursor_execute", record)
+        try:
+            self.session.expunge_all()
+            rows = await get_contact_rows(10, 0, self.session, self.user)
+        finally:
+            event.remove(self.engine.sync_engine, "before_cursor_execute", record)
+        self.assertNotIn("JOIN", statements[0])
+        self.assertNotIn("users", statements[0])
+        self.assertEqual(rows[0].lastname, "Shevchenko")
+        self.assertEqual(len(self.session.identity_map), 0)
+
+    def test_birthday_window(self):
+        self.assertEqual(birthday_window(7, date(2024, 3, 10)), (310, 317))
+        self.assertEqual(birthday_window(7, date(2024, 12, 28)), (1228, 104))
+        self.assertEqual(birthday_window(2, date(2023, 2, 28)), (228, 302))
+        self.assertIsNone(birthday_window(366, date(2024, 1, 1)))
+
+    def test_birthday_key_follows_databirthday(self):
+        contact = Contact(databirthday=datetime(1990, 12, 31))
+        self.assertEqual(contact.birthday_mmdd, 1231)
+        contact.databirthday = date(1990, 1, 2)
+        self.assertEqual(contact.birthday_mmdd, 102)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -58,10 +58,12 @@ class TestAsyncContacts(unittest.IsolatedAsyncioTestCase):
             avatar="https://test.test.ua",
             refresh_token="test token_1"
         )
-        mocked_contact = MagicMock()
-        mocked_contact.scalar_one_or_none.return_value = user
-        self.session.execute.return_value = mocked_contact
+        self.session.scalar.return_value = user
         result = await pass_change(body, db=self.session)
+        stmt = self.session.scalar.call_args.args[0]
+        self.assertIn("RETURNING", str(stmt))
+        self.assertEqual(stmt.compile().params["password"], body.new_password)
+        self.session.refresh.assert_not_called()
         self.assertEqual(result, user)
         
     async def test_pass_reset(self):
@@ -76,10 +78,9 @@ class TestAsyncContacts(unittest.IsolatedAsyncioTestCase):
             password= "87654321",
             refresh_token="test token_1"
         )
-        mocked_user = MagicMock()
-        mocked_user.scalar_one_or_none.return_value = user
-        self.session.execute.return_value = mocked_user
+        self.session.scalar.return_value = user
         result = await pass_reset(body, new_password='87654321', db=self.session)
+        self.assertEqual(self.session.scalar.call_args.args[0].compile().params["password"], '87654321')
         self.assertEqual(result, user)
 
 
@@ -92,7 +93,11 @@ class TestAsyncContacts(unittest.IsolatedAsyncioTestCase):
             avatar="https://www.gravatar.com/avatar/d3a861d6423f78f33d8bd198ce393ff5",
             refresh_token="test token_1"
             )
+        self.session.scalar.side_effect = lambda stmt: User(**stmt.compile().params)
         result = await create_user(UserSchema(username="test user_1", email="tesmail@i.ua",password= "12345678"), self.session)
+        self.assertIn("RETURNING", str(self.session.scalar.call_args.args[0]))
+        self.session.commit.assert_called_once()
+        self.session.refresh.assert_not_called()
         self.assertIsInstance(result, User)
         self.assertEqual(result.username, body.username)
         self.assertEqual(result.email, body.email)
@@ -105,12 +110,24 @@ class TestAsyncContacts(unittest.IsolatedAsyncioTestCase):
             email="tesmail@i.ua",
             avatar="https://www.test.com/avatar/555"
         )
-        mocked_user = MagicMock()
-        mocked_user.scalar_one_or_none.return_value = user
-        self.session.execute.return_value = mocked_user
+        self.session.scalar.return_value = user
         result = await update_avatar_url(email="tesmail@i.ua", url="https://www.test.com/avatar/555", db=self.session)
         self.assertEqual(result.email, user.email)
         self.assertEqual(result.avatar, user.avatar)
+        self.assertEqual(self.session.scalar.call_args.args[0].compile().params["avatar"], user.avatar)
+        self.session.execute.assert_not_called()
+
+    async def test_update_token(self):
+        await update_token(self.user, "token", self.session)
+        stmt = self.session.execute.call_args.args[0]
+        self.assertTrue(str(stmt).startswith("UPDATE"))
+        self.assertEqual(stmt.compile().params["refresh_token"], "token")
+        self.session.commit.assert_called_once()
+
+    async def test_confirmed_email(self):
+        await confirmed_email("tesmail@i.ua", self.session)
+        self.session.execute.assert_called_once()
+        self.assertTrue(str(self.session.execute.call_args.args[0]).startswith("UPDATE"))
 
 
 
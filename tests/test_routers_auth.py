@@ -7,12 +7,13 @@ from sqlalchemy import select
 from src.entity.models import User
 from tests.conftest import TestingSessionLocal
 from src.config import messages
+from src.services.auth import auth_service
 
 user_data = {"username": "roman", "email": "test@gmail.com", "password": "12345678"}
 
 
 def test_signup(client, monkeypatch):
-    mock_send_email = Mock()
+    mock_send_email = AsyncMock()
     monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
     response = client.post("api/auth/signup", json=user_data)
     assert response.status_code == 201, response.text
@@ -24,7 +25,7 @@ def test_signup(client, monkeypatch):
 
 
 def test_repeat_signup(client, monkeypatch):
-    mock_send_email = Mock()
+    mock_send_email = AsyncMock()
     monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
     response = client.post("api/auth/signup", json=user_data)
     assert response.status_code == 409, response.text
@@ -79,4 +80,15 @@ def test_validation_error_login(client):
                            data={"password": user_data.get("password")})
     assert response.status_code == 422, response.text
     data = response.json()
-    assert "detail" in data
\ No newline at end of file
+    assert "detail" in data
+
+@pytest.mark.asyncio
+async def test_logout(client, monkeypatch):
+    monkeypatch.setattr("src.services.auth.auth_service.cache", AsyncMock(get=AsyncMock(return_value=None)))
+    token = await auth_service.create_access_token(data={"sub": user_data.get("email")})
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.post("api/auth/logout", headers=headers)
+    assert response.status_code == 204, response.text
+    async with TestingSessionLocal() as session:
+        current_user = await session.execute(select(User).where(User.email == user_data.get("email")))
+        assert current_user.scalar_one().refresh_token is None
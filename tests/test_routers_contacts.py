@@ -0,0 +1,176 @@
+import csv
+import io
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import select, func
+
+from main import app
+from src.entity.models import Contact
+from src.services.response_cache import get_response_cache
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture()
+def headers(get_token, monkeypatch):
+    monkeypatch.setattr("src.services.auth.auth_service.cache", AsyncMock(get=AsyncMock(return_value=None)))
+    monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
+    monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
+    monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
+    return {"Authorization": f"Bearer {get_token}"}
+
+
+async def count_contacts(email):
+    async with TestingSessionLocal() as session:
+        result = await session.execute(select(func.count()).select_from(Contact).where(Contact.email == email))
+        return result.scalar_one()
+
+
+def test_import_csv(client, headers):
+    content = (
+        "firstname,lastname,email,mobilenamber,databirthday,note\n"
+        "Olena,Shevchenko,olena@import.ua,+380501112233,1990-05-17,\"multi\nline\"\n"
+        "Ivan,Kovalenko,ivan@import.ua,+380501112234,not-a-date,friend\n"
+    )
+    response = client.post("api/contacts/import/", headers=headers,
+                           files={"file": ("contacts.csv", content.encode(), "text/csv")})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["inserted"] == 1
+    assert data["failed"] == 1
+    assert data["errors"][0]["line"] == 4
+    assert "databirthday" in data["errors"][0]["errors"][0]
+
+
+@pytest.mark.asyncio
+async def test_import_ndjson_upsert(client, headers):
+    row = '{"firstname": "Petro", "lastname": "Melnyk", "email": "petro@import.ua", ' \
+          '"mobilenamber": "+380501112235", "databirthday": "1985-12-31", "note": "%s"}\n'
+    content = (row % "first") + "not json\n" + (row % "second")
+    response = client.post("api/contacts/import/?format=ndjson&upsert=true", headers=headers,
+                           files={"file": ("contacts.txt", content.encode())})
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 1
+    assert response.json()["failed"] == 1
+
+    response = client.post("api/contacts/import/?format=ndjson&upsert=true", headers=headers,
+                           files={"file": ("contacts.txt", (row % "third").encode())})
+    assert response.json()["updated"] == 1
+    assert await count_contacts("petro@import.ua") == 1
+
+
+@pytest.mark.asyncio
+async def test_import_upsert_reports_duplicates(client, headers):
+    row = '{"firstname": "Taras", "lastname": "Boyko", "email": "taras@import.ua", ' \
+          '"mobilenamber": "+380501112236", "databirthday": "1980-01-02", "note": "%s"}\n'
+    response = client.post("api/contacts/import/?format=ndjson&upsert=true", headers=headers,
+                           files={"file": ("contacts.txt", ((row % "first") + (row % "second")).encode())})
+    assert response.status_code == 200, response.text
+    assert (response.json()["inserted"], response.json()["skipped"]) == (1, 1)
+    assert await count_contacts("taras@import.ua") == 1
+
+
+def test_export_ndjson(client, headers):
+    response = client.get("api/contacts/export/", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    emails = [row["email"] for row in rows]
+    assert "olena@import.ua" in emails
+    olena = rows[emails.index("olena@import.ua")]
+    assert olena["databirthday"] == "1990-05-17"
+    assert olena["note"] == "multi\nline"
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+
+def test_export_csv(client, headers):
+    response = client.get("api/contacts/export/?format=csv", headers=headers)
+    assert response.status_code == 200, response.text
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert "petro@import.ua" in [row["email"] for row in rows]
+    assert list(rows[0]) == ["id", "firstname", "lastname", "email", "mobilenamber", "databirthday", "note"]
+
+
+def test_batch(client, headers):
+    contact = {"firstname": "Taras", "lastname": "Boyko", "email": "taras@batch.ua",
+               "mobilenamber": "+380501112236", "databirthday": "1979-03-09", "note": "batch"}
+    response = client.post("api/contacts/batch/", headers=headers, json={"operations": [
+        {"op": "create", "contact": contact},
+        {"op": "create", "contact": contact | {"email": "sofia@batch.ua", "firstname": "Sofia"}},
+    ]})
+    assert response.status_code == 200, response.text
+    first, second = response.json()["results"]
+    assert first["status"] == second["status"] == 201
+    assert second["contact"]["firstname"] == "Sofia"
+
+    response = client.post("api/contacts/batch/", headers=headers, json={"operations": [
+        {"op": "update", "id": first["id"], "contact": contact | {"note": "updated"}},
+        {"op": "delete", "id": second["id"]},
+        {"op": "delete", "id": first["id"]},
+        {"op": "delete", "id": 999999},
+    ]})
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == [200, 204, 409, 404]
+    assert results[0]["contact"]["note"] == "updated"
+
+    assert client.get(f"api/contacts/{second['id']}", headers=headers).status_code == 404
+    assert client.get(f"api/contacts/{first['id']}", headers=headers).json()["note"] == "updated"
+
+
+def test_batch_validation(client, headers):
+    response = client.post("api/contacts/batch/", headers=headers, json={"operations": [{"op": "update", "id": 1}]})
+    assert response.status_code == 422
+
+
+def test_read_contacts_cached_until_write(client, headers):
+    cache = app.dependency_overrides[get_response_cache]()
+    contact = {"firstname": "Iryna", "lastname": "Lysenko", "email": "iryna@cache.ua",
+               "mobilenamber": "+380501112237", "databirthday": "1992-07-01", "note": "cached"}
+    created = client.post("api/contacts/", headers=headers, json=contact).json()
+
+    first = client.get("api/contacts/?limit=500", headers=headers)
+    hits = cache.stats()["hits"]
+    second = client.get("api/contacts/?offset=0&limit=500", headers=headers)
+    assert cache.stats()["hits"] == hits + 1
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.json() == first.json()
+    assert client.get(f"api/contacts/{created['id']}", headers=headers).json() == created
+    assert client.get(f"api/contacts/{created['id']}", headers=headers).json() == created
+
+    client.put(f"api/contacts/{created['id']}", headers=headers, json=contact | {"note": "changed"})
+    notes = {row["id"]: row["note"] for row in client.get("api/contacts/?limit=500", headers=headers).json()}
+    assert notes[created["id"]] == "changed"
+    assert client.get(f"api/contacts/{created['id']}", headers=headers).json()["note"] == "changed"
+
+    client.delete(f"api/contacts/{created['id']}", headers=headers)
+    assert client.get(f"api/contacts/{created['id']}", headers=headers).status_code == 404
+    ids = [row["id"] for row in client.get("api/contacts/?limit=500", headers=headers).json()]
+    assert created["id"] not in ids
+
+
+def test_cached_page_keeps_next_cursor(client, headers):
+    first = client.get("api/contacts/?limit=10&cursor=", headers=headers)
+    second = client.get("api/contacts/?limit=10&cursor=", headers=headers)
+    assert first.headers.get("X-Next-Cursor") == second.headers.get("X-Next-Cursor")
+    assert first.content == second.content
+
+
+def test_read_contacts_not_modified(client, headers):
+    response = client.get("api/contacts/?limit=500", headers=headers)
+    etag = response.headers["etag"]
+    response = client.get("api/contacts/?limit=500", headers=headers | {"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert client.get("api/contacts/?limit=100", headers=headers).headers["etag"] != etag
+
+    contact = {"firstname": "Oleh", "lastname": "Melnyk", "email": "oleh@etag.ua",
+               "mobilenamber": "+380501112238", "databirthday": "1988-02-02", "note": "etag"}
+    client.post("api/contacts/", headers=headers, json=contact)
+    response = client.get("api/contacts/?limit=500", headers=headers | {"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert "oleh@etag.ua" in [row["email"] for row in response.json()]
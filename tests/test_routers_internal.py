@@ -0,0 +1,33 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.entity.models import Role
+from src.routes import internal
+from src.services.auth import auth_service
+
+STATS = ["api/healthchecker/db", "api/healthchecker/cache", "api/healthchecker/responses", "api/healthchecker/hashing"]
+
+
+@pytest.mark.parametrize("url", STATS)
+def test_stats_need_authentication(client, url):
+    response = client.get(url)
+    assert response.status_code == 401, response.text
+
+
+def test_stats_are_admin_only(client, get_token, monkeypatch):
+    with patch.object(auth_service, 'cache', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        for url in ("api/healthchecker/db", "api/healthchecker/responses", "api/healthchecker/hashing"):
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.text
+        monkeypatch.setattr(internal.admin_access, "allowed_roles", [Role.moderator])
+        for url in STATS:
+            response = client.get(url, headers=headers)
+            assert response.status_code == 403, response.text
+
+
+def test_public_healthchecker_stays_open(client):
+    response = client.get("api/healthchecker")
+    assert response.status_code == 200, response.text
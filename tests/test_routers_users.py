@@ -6,7 +6,7 @@ from src.services.auth import auth_service
 
 
 def test_get_me(client, get_token, monkeypatch):
-    with patch.object(auth_service, 'cache') as redis_mock:
+    with patch.object(auth_service, 'cache', new_callable=AsyncMock) as redis_mock:
         redis_mock.get.return_value = None
         monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
         monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
@@ -14,4 +14,58 @@ def test_get_me(client, get_token, monkeypatch):
         token = get_token
         headers = {"Authorization": f"Bearer {token}"}
         response = client.get("api/users/me", headers=headers)
-        assert response.status_code == 200, response.text
\ No newline at end of file
+        assert response.status_code == 200, response.text
+        etag = response.headers["etag"]
+        response = client.get("api/users/me", headers=headers | {"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        response = client.get("api/users/me", headers=headers | {"If-None-Match": '"stale"'})
+        assert response.status_code == 200
+
+@pytest.fixture()
+def local_avatars(client, tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from main import app
+    from src.services.avatars import LocalStorage, get_avatar_storage
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    app.dependency_overrides[get_avatar_storage] = lambda: LocalStorage(executor, tmp_path, "/avatars/")
+    yield tmp_path
+    del app.dependency_overrides[get_avatar_storage]
+    executor.shutdown()
+
+
+def test_update_avatar(client, get_token, local_avatars, monkeypatch):
+    with patch.object(auth_service, 'cache', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
+        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
+        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
+        headers = {"Authorization": f"Bearer {get_token}"}
+        response = client.patch("api/users/avatar", headers=headers,
+                                files={"file": ("avatar.png", b"\x89PNG image", "image/png")})
+        assert response.status_code == 200, response.text
+        avatar = response.json()["avatar"]
+        assert avatar.startswith("/avatars/") and avatar.endswith(".png")
+        assert (local_avatars / avatar.removeprefix("/avatars/")).read_bytes() == b"\x89PNG image"
+        key, snapshot = redis_mock.set.await_args.args
+        assert (key, snapshot.avatar) == ("tes2@gmail.com", avatar)
+
+
+def test_update_avatar_rejects_non_images(client, get_token, local_avatars, monkeypatch):
+    with patch.object(auth_service, 'cache', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
+        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
+        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
+        monkeypatch.setattr("src.routes.users.config.AVATAR_MAX_BYTES", 4)
+        headers = {"Authorization": f"Bearer {get_token}"}
+        response = client.patch("api/users/avatar", headers=headers,
+                                files={"file": ("avatar.txt", b"text", "text/plain")})
+        assert response.status_code == 415, response.text
+        response = client.patch("api/users/avatar", headers=headers,
+                                files={"file": ("avatar.png", b"large", "image/png")})
+        assert response.status_code == 413, response.text
+        assert list(local_avatars.iterdir()) == []
@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import patch
+
+from jose import jwt
+
+from src.entity.models import Role
+from src.entity.snapshot import UserSnapshot
+from src.services.auth import auth_service
+from src.services.cache import UserCache
+from tests.memory_redis import MemoryRedis
+
+
+class TestAccessTokenCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        auth_service.token_cache.clear()
+        self.redis = MemoryRedis()
+        patcher = patch.object(auth_service, "cache", UserCache(self.redis, ttl=300, local_size=10, local_ttl=5))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_token_is_decoded_once(self):
+        token = await auth_service.create_access_token(data={"sub": "cache@test.ua"})
+        self.assertEqual(await auth_service.verify_access_token(token), "cache@test.ua")
+        with patch("src.services.auth.jwt.decode") as decode:
+            self.assertEqual(await auth_service.verify_access_token(token), "cache@test.ua")
+            decode.assert_not_called()
+
+    async def test_invalidate_user(self):
+        token = await auth_service.create_access_token(data={"sub": "logout@test.ua"})
+        await auth_service.verify_access_token(token)
+        await auth_service.cache.set("logout@test.ua", UserSnapshot(1, "logout", "logout@test.ua", None, Role.user,
+                                                                    True, None))
+        await auth_service.invalidate_user("logout@test.ua")
+        self.assertIsNone(await auth_service.cache.get("logout@test.ua"))
+        self.assertEqual(self.redis.data["token_epoch:logout@test.ua"], b"1")
+        with patch("src.services.auth.jwt.decode", wraps=jwt.decode) as decode:
+            self.assertEqual(await auth_service.verify_access_token(token), "logout@test.ua")
+            self.assertEqual(await auth_service.verify_access_token(token), "logout@test.ua")
+            decode.assert_called_once()
+
+    async def test_invalidation_reaches_other_workers(self):
+        token = await auth_service.create_access_token(data={"sub": "worker@test.ua"})
+        await auth_service.verify_access_token(token)
+        other_worker = UserCache(self.redis, ttl=300, local_size=10, local_ttl=5)
+        await other_worker.bump_epoch("worker@test.ua")
+        auth_service.cache.epochs.clear()  # the local tier of this worker expired
+        with patch("src.services.auth.jwt.decode", wraps=jwt.decode) as decode:
+            await auth_service.verify_access_token(token)
+            decode.assert_called_once()
+
+    async def test_rejects_refresh_and_expired_tokens(self):
+        refresh = await auth_service.create_refresh_token(data={"sub": "cache@test.ua"})
+        expired = await auth_service.create_access_token(data={"sub": "cache@test.ua"}, expires_delta=-10)
+        self.assertIsNone(await auth_service.verify_access_token(refresh))
+        self.assertIsNone(await auth_service.verify_access_token(expired))
+        self.assertEqual(len(auth_service.token_cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
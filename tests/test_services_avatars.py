@@ -0,0 +1,94 @@
+import sys
+sys.path.append('../')
+
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.services.avatars import AvatarStorage, CloudinaryStorage, ImmutableStaticFiles, LocalStorage, ThumbnailStorage
+
+
+class TestAvatarStorage(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="avatar-test")
+        self.directory = Path(tempfile.mkdtemp())
+        self.local = LocalStorage(self.executor, self.directory, "/avatars/")
+
+    async def asyncTearDown(self):
+        self.executor.shutdown()
+
+    async def test_local_urls_follow_content(self):
+        first = await self.local.save("a@test.com", b"first", "image/png")
+        again = await self.local.save("b@test.com", b"first", "image/png")
+        second = await self.local.save("a@test.com", b"second", "image/png")
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.startswith("/avatars/") and first.endswith(".png"))
+        self.assertEqual((self.directory / first.removeprefix("/avatars/")).read_bytes(), b"first")
+        self.assertEqual(len(list(self.directory.iterdir())), 2)
+
+    async def test_thumbnail_resizes_once_in_executor(self):
+        calls = []
+
+        def resize(data):
+            calls.append(threading.current_thread().name)
+            return data.upper()
+
+        storage = ThumbnailStorage(self.executor, self.local, resize=resize)
+        url = await storage.save("a@test.com", b"image", "image/png")
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(calls[0].startswith("avatar-test"))
+        self.assertTrue(url.endswith(".jpg"))
+        self.assertEqual((self.directory / url.removeprefix("/avatars/")).read_bytes(), b"IMAGE")
+
+    async def test_undecodable_image_is_rejected(self):
+        def resize(data):
+            raise OSError("cannot identify image file")
+
+        storage = ThumbnailStorage(self.executor, self.local, resize=resize)
+        with self.assertRaises(HTTPException) as raised:
+            await storage.save("a@test.com", b"not an image", "image/png")
+        self.assertEqual(raised.exception.status_code, 415)
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_storage_must_implement_save(self):
+        with self.assertRaises(TypeError):
+            AvatarStorage(self.executor)
+
+    async def test_cloudinary_upload_runs_in_executor(self):
+        threads = []
+
+        def upload(file, **kwargs):
+            threads.append(threading.current_thread().name)
+            self.assertEqual(file.read(), b"image")
+            self.assertEqual(kwargs, {"public_id": "test/a@test.com", "overwrite": True})
+            return {"version": 42}
+
+        storage = CloudinaryStorage(self.executor, "cloud", 1, "secret")
+        with patch("src.services.avatars.cloudinary.uploader.upload", upload):
+            url = await storage.save("a@test.com", b"image", "image/png")
+        self.assertTrue(threads[0].startswith("avatar-test"))
+        self.assertIn("c_fill,h_250,w_250/v42/test/a%40test.com", url)
+
+
+class TestImmutableStaticFiles(unittest.TestCase):
+
+    def test_cache_control(self):
+        directory = Path(tempfile.mkdtemp())
+        (directory / "abc.png").write_bytes(b"image")
+        app = FastAPI()
+        app.mount("/avatars", ImmutableStaticFiles(directory=directory))
+        response = TestClient(app).get("/avatars/abc.png")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["cache-control"], "public, max-age=31536000, immutable")
+
+
+if __name__ == '__main__':
+    unittest.main()
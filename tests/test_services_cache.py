@@ -0,0 +1,108 @@
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+from src.entity.models import Role, User
+from src.entity.snapshot import UserSnapshot
+from src.services.cache import TTLCache, UserCache
+from tests.memory_redis import MemoryRedis
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_expires_entries(self):
+        cache = TTLCache(maxsize=2, ttl=5)
+        with patch("src.services.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+            cache.set("b", 2, ttl=20)
+        with patch("src.services.cache.time.monotonic", return_value=106.0):
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(cache.get("b"), 2)
+
+
+class TestUserSnapshot(unittest.TestCase):
+
+    def test_pack_roundtrip(self):
+        user = User(id=7, username="roman", email="a@test.ua", avatar=None, role=Role.moderator, confirmed=True,
+                    updated_at=datetime(2024, 1, 2, 3, 4, 5, 678000))
+        snapshot = UserSnapshot.from_user(user)
+        self.assertEqual(UserSnapshot.unpack(snapshot.pack()), snapshot)
+        self.assertEqual(UserSnapshot.unpack(snapshot.pack()).updated_at, user.updated_at)
+
+    def test_immutable(self):
+        snapshot = UserSnapshot(1, "roman", "a@test.ua", "https://avatar", Role.user, True, None)
+        with self.assertRaises(AttributeError):
+            snapshot.role = Role.admin
+        self.assertIsNone(UserSnapshot.unpack(snapshot.pack()).updated_at)
+
+    def test_unknown_version(self):
+        self.assertIsNone(UserSnapshot.unpack(b"\x80\x04legacy pickle"))
+
+    def test_corrupt_data(self):
+        data = UserSnapshot(1, "roman", "a@test.ua", "https://avatar", Role.user, True, datetime(2024, 1, 2)).pack()
+        for corrupt in (data[:5], data[:-3], data + b"x", data.replace(b"roman", b"r\xffman"),
+                        data.replace(b"user", b"root")):
+            self.assertIsNone(UserSnapshot.unpack(corrupt), corrupt)
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+        self.cache = UserCache(self.redis, ttl=300, local_size=10, local_ttl=5)
+        self.user = UserSnapshot(1, "roman", "a@test.ua", None, Role.user, True, None)
+
+    async def test_local_tier_skips_redis(self):
+        self.redis.get.return_value = self.user.pack()
+        self.assertEqual(await self.cache.get("a@test.ua"), self.user)
+        self.assertIs(await self.cache.get("a@test.ua"), await self.cache.get("a@test.ua"))
+        self.redis.get.assert_awaited_once_with("a@test.ua")
+        self.assertEqual(self.cache.stats()["local_hits"], 2)
+        self.assertEqual(self.cache.stats()["redis_hits"], 1)
+
+    async def test_miss_and_set(self):
+        self.redis.get.return_value = None
+        self.assertIsNone(await self.cache.get("a@test.ua"))
+        await self.cache.set("a@test.ua", self.user)
+        self.redis.set.assert_awaited_once_with("a@test.ua", self.user.pack(), ex=300)
+        self.assertEqual(await self.cache.get("a@test.ua"), self.user)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    async def test_delete(self):
+        await self.cache.set("a@test.ua", self.user)
+        await self.cache.delete("a@test.ua")
+        self.redis.get.return_value = None
+        self.assertIsNone(await self.cache.get("a@test.ua"))
+        self.redis.delete.assert_awaited_once_with("a@test.ua")
+
+    async def test_corrupt_entry_is_a_miss(self):
+        self.redis.get.return_value = b"\x01garbage"
+        self.assertIsNone(await self.cache.get("a@test.ua"))
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    async def test_epochs_are_shared_through_redis(self):
+        redis = MemoryRedis()
+        worker, other_worker = (UserCache(redis, ttl=300, local_size=1, local_ttl=5) for _ in range(2))
+        self.assertEqual(await other_worker.epoch("a@test.ua"), 0)
+        self.assertEqual(await worker.bump_epoch("a@test.ua"), 1)
+        self.assertEqual(await worker.epoch("a@test.ua"), 1)
+        self.assertEqual(await other_worker.epoch("a@test.ua"), 0)
+        with patch("src.services.cache.time.monotonic", return_value=time.monotonic() + 6):
+            self.assertEqual(await other_worker.epoch("a@test.ua"), 1)
+        await other_worker.epoch("b@test.ua")
+        self.assertEqual(len(other_worker.epochs), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
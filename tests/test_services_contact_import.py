@@ -0,0 +1,49 @@
+import sys
+sys.path.append('../')
+
+import io
+import time
+import unittest
+
+from fastapi import UploadFile
+
+from src.services.contact_import import iter_csv, iter_lines, iter_ndjson
+
+HEADER = "firstname,lastname,email,mobilenamber,databirthday,note\n"
+
+
+def upload(content: str) -> UploadFile:
+    return UploadFile(io.BytesIO(content.encode()))
+
+
+async def parse(parser, content: str, **kwargs) -> list:
+    return [item async for item in parser(iter_lines(upload(content), **kwargs))]
+
+
+class TestContactImportParsers(unittest.IsolatedAsyncioTestCase):
+
+    async def test_quoted_field_spans_lines(self):
+        rows = await parse(iter_csv, HEADER + 'Olena,Shevchenko,o@i.ua,1,1990-05-17,"multi\nline"\nIvan,K,i@i.ua,2,1990-05-17,x\n')
+        self.assertEqual([(line, row["note"]) for line, row in rows], [(2, "multi\nline"), (4, "x")])
+
+    async def test_unbalanced_quote_rejects_one_row(self):
+        row = "Ivan,Kovalenko,ivan{}@import.ua,+380501112234,1990-05-17,friend\n"
+        content = HEADER + 'Olena,"Shevchenko,o@i.ua,1,1990-05-17,x\n' + "".join(row.format(i) for i in range(20_000))
+        start = time.perf_counter()
+        rows = await parse(iter_csv, content)
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertEqual(rows[0], (2, None))
+        self.assertEqual(len(rows), 20_001)
+        self.assertEqual(rows[-1][0], 20_002)
+        self.assertTrue(all(row is not None for _, row in rows[1:]))
+
+    async def test_overlong_line_is_not_buffered(self):
+        content = HEADER + "x" * 200 + "\nIvan,K,i@i.ua,2,1990-05-17,x\n" + "y" * 300
+        rows = await parse(iter_csv, content, chunk_size=16, max_line_length=100)
+        self.assertEqual([(line, row and row["firstname"]) for line, row in rows], [(2, None), (3, "Ivan"), (4, None)])
+        rows = await parse(iter_ndjson, "z" * 200 + '\n{"a": 1}\n', chunk_size=16, max_line_length=100)
+        self.assertEqual(rows, [(1, None), (2, {"a": 1})])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import sys
+sys.path.append('../')
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.services.email_templates import EmailTemplates, email_templates
+
+
+class TestEmailTemplates(unittest.TestCase):
+
+    def test_matches_jinja_rendering(self):
+        context = {"username": "<b>O'Neil & co</b>", "token": "a.b.c", "password": "p<a>ss\"word"}
+        for name in ("verify_email.html", "email_reset_pass.html"):
+            with self.subTest(name=name):
+                expected = email_templates.templates[name].render(host="http://host/", **context)
+                self.assertEqual(email_templates.render(name, "http://host/", **context), expected)
+
+    def test_host_links_are_precomputed(self):
+        templates = EmailTemplates()
+        for number in range(3):
+            html = templates.render("verify_email.html", "https://contacts.example/", username=f"user{number}",
+                                    token="t")
+            self.assertIn('href="https://contacts.example/api/auth/confirmed_email/t"', html)
+        info = templates.parts.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 2))
+
+    def test_missing_field_renders_empty(self):
+        html = email_templates.render("email_reset_pass.html", "http://host/", username="test")
+        self.assertIn("<h3></h3>", html)
+
+    def test_falls_back_to_jinja(self):
+        folder = Path(tempfile.mkdtemp())
+        (folder / "upper.html").write_text("<p>{{ username|upper }} {{host}}</p>")
+        (folder / "extra.html").write_text("<p>{{ username }} {{ code }}</p>")
+        templates = EmailTemplates(folder)
+        self.assertEqual(templates.render("upper.html", "h/", username="ann"), "<p>ANN h/</p>")
+        self.assertIsNone(templates.parts("upper.html", "h/"))
+        self.assertEqual(templates.render("extra.html", "h/", username="ann", code=7), "<p>ann 7</p>")
+
+
+if __name__ == '__main__':
+    unittest.main()
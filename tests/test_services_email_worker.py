@@ -0,0 +1,214 @@
+import sys
+sys.path.append('../')
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from email import message_from_bytes
+
+import aiosmtplib
+from sqlalchemy import select
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from benchmarks.smtp_sink import SMTPSink
+from src.entity.models import Base, EmailOutbox
+from src.repository import outbox as repository_outbox
+from src.services.email import payload_cipher, send_email, send_email_reset_pass
+from src.services.email_worker import EmailWorker, SMTPPool, backoff
+
+
+def body(data: bytes) -> str:
+    return message_from_bytes(data).get_payload(decode=True).decode()
+
+
+class TestEmailOutbox(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def messages(self):
+        async with self.session() as db:
+            return (await db.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars().all()
+
+    async def test_repeated_confirmation_is_queued_once(self):
+        async with self.session() as db:
+            self.assertTrue(await send_email("test@test.com", "test", "http://host/", db))
+            self.assertFalse(await send_email("test@test.com", "test", "http://host/", db))
+        messages = await self.messages()
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0].dedupe_key, "verify:test@test.com")
+
+    async def test_reset_replaces_pending_password(self):
+        async with self.session() as db:
+            await send_email_reset_pass("first-password", "test@test.com", "test", "http://host/", db)
+            await send_email_reset_pass("second-password", "test@test.com", "test", "http://host/", db)
+        messages = await self.messages()
+        self.assertEqual(len(messages), 1)
+        self.assertNotIn("second-password", messages[0].payload)
+        self.assertEqual(payload_cipher.decrypt(messages[0].payload.encode()), b"second-password")
+
+    async def test_claim_leases_messages(self):
+        async with self.session() as db:
+            await send_email("test@test.com", "test", "http://host/", db)
+            claimed = await repository_outbox.claim_emails(10, 60, db)
+            self.assertEqual(len(claimed), 1)
+            self.assertEqual(await repository_outbox.claim_emails(10, 60, db), [])
+        self.assertGreater((await self.messages())[0].next_attempt_at, datetime.now() + timedelta(seconds=30))
+
+    async def test_mark_sent_and_failed(self):
+        async with self.session() as db:
+            await send_email_reset_pass("secret-password", "a@test.com", "a", "http://host/", db)
+            await send_email("b@test.com", "b", "http://host/", db)
+            await send_email("c@test.com", "c", "http://host/", db)
+            first, second, third = await repository_outbox.claim_emails(10, 60, db)
+            await repository_outbox.mark_sent([{"message_id": first.id, "leased_until": first.next_attempt_at}], db)
+            retry_at = datetime.now() + timedelta(minutes=5)
+            await repository_outbox.mark_failed([
+                {"message_id": second.id, "leased_until": second.next_attempt_at, "attempts": 1,
+                 "last_error": "busy", "next_attempt_at": retry_at},
+                {"message_id": third.id, "leased_until": third.next_attempt_at, "attempts": 5,
+                 "last_error": "refused", "next_attempt_at": None},
+            ], db)
+        sent, retried, failed = await self.messages()
+        self.assertEqual((sent.status, sent.payload, sent.dedupe_key), ("sent", None, None))
+        self.assertEqual((retried.status, retried.attempts, retried.next_attempt_at), ("pending", 1, retry_at))
+        self.assertEqual((failed.status, failed.last_error, failed.dedupe_key), ("failed", "refused", None))
+
+
+class TestEmailWorker(TestEmailOutbox):
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.sink = await SMTPSink(reject={"bounce@test.com"}).start()
+        self.pool = SMTPPool(self.sink.host, self.sink.port, size=2)
+        self.worker = EmailWorker(self.pool, batch_size=10, max_attempts=2, backoff_base=60, backoff_max=600,
+                                  session=self.session)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+        await self.sink.stop()
+        await super().asyncTearDown()
+
+    async def test_sends_batch_over_pooled_connections(self):
+        async with self.session() as db:
+            for number in range(6):
+                await send_email(f"user{number}@test.com", f"user{number}", "http://host/", db)
+        self.assertEqual(await self.worker.run_once(), 6)
+        self.assertEqual(await self.worker.run_once(), 0)
+        self.assertEqual(len(self.sink.messages), 6)
+        self.assertLessEqual(self.pool.opened, 2)
+        self.assertEqual({message.status for message in await self.messages()}, {"sent"})
+        self.assertIn('href="http://host/api/auth/confirmed_email/', body(self.sink.messages[0][2]))
+
+    async def test_reset_password_is_dropped_after_sending(self):
+        async with self.session() as db:
+            await send_email_reset_pass("secret-password", "test@test.com", "test", "http://host/", db)
+        await self.worker.run_once()
+        self.assertIn("<h3>secret-password</h3>", body(self.sink.messages[0][2]))
+        self.assertIsNone((await self.messages())[0].payload)
+
+    async def test_reset_replaced_while_sending_is_sent_again(self):
+        async with self.session() as db:
+            await send_email_reset_pass("first-password", "test@test.com", "test", "http://host/", db)
+        send = self.worker._send
+
+        async def replace_then_send(email):
+            # a second reset lands while the first one is on the wire
+            async with self.session() as db:
+                await send_email_reset_pass("second-password", "test@test.com", "test", "http://host/", db)
+            return await send(email)
+
+        self.worker._send = replace_then_send
+        await self.worker.run_once()
+        message, = await self.messages()
+        self.assertEqual((message.status, message.attempts), ("pending", 0))
+        self.assertEqual(payload_cipher.decrypt(message.payload.encode()), b"second-password")
+
+        self.worker._send = send
+        await self.worker.run_once()
+        self.assertEqual([body(data).count("second-password") for _, _, data in self.sink.messages], [0, 1])
+        message, = await self.messages()
+        self.assertEqual((message.status, message.payload), ("sent", None))
+
+    async def test_failure_of_replaced_message_is_not_recorded(self):
+        async with self.session() as db:
+            await send_email_reset_pass("first-password", "bounce@test.com", "bounce", "http://host/", db)
+        send = self.worker._send
+
+        async def replace_then_send(email):
+            async with self.session() as db:
+                await send_email_reset_pass("second-password", "bounce@test.com", "bounce", "http://host/", db)
+            return await send(email)
+
+        self.worker._send = replace_then_send
+        await self.worker.run_once()
+        message, = await self.messages()
+        self.assertEqual((message.status, message.attempts, message.last_error), ("pending", 0, None))
+        self.assertLessEqual(message.next_attempt_at, datetime.now())
+
+    async def test_failed_message_is_retried_then_given_up(self):
+        async with self.session() as db:
+            await send_email("bounce@test.com", "bounce", "http://host/", db)
+        await self.worker.run_once()
+        message, = await self.messages()
+        self.assertEqual((message.status, message.attempts), ("pending", 1))
+        self.assertGreater(message.next_attempt_at, datetime.now() + timedelta(seconds=25))
+
+        async with self.session() as db:
+            await db.execute(EmailOutbox.__table__.update().values(next_attempt_at=datetime.now()))
+            await db.commit()
+        await self.worker.run_once()
+        message, = await self.messages()
+        self.assertEqual((message.status, message.attempts), ("failed", 2))
+        self.assertEqual(self.sink.messages, [])
+
+    async def test_unreachable_server_keeps_messages(self):
+        await self.sink.stop()
+        async with self.session() as db:
+            await send_email("test@test.com", "test", "http://host/", db)
+        await self.worker.run_once()
+        message, = await self.messages()
+        self.assertEqual((message.status, message.attempts), ("pending", 1))
+        self.assertIsNotNone(message.last_error)
+
+    async def test_refused_recipient_keeps_connection(self):
+        with self.assertRaises(aiosmtplib.SMTPRecipientsRefused):
+            async with self.pool.connection() as client:
+                await client.sendmail("test@test.com", ["bounce@test.com"], "Subject: hi\r\n\r\nhi")
+        async with self.pool.connection() as again:
+            self.assertIs(again, client)
+            await again.sendmail("test@test.com", ["test@test.com"], "Subject: hi\r\n\r\nhi")
+        self.assertEqual((self.pool.opened, self.sink.connections, len(self.sink.messages)), (1, 1, 1))
+
+    async def test_cancelled_send_closes_connection(self):
+        checked_out = asyncio.Event()
+
+        async def send():
+            async with self.pool.connection() as client:
+                self.client = client
+                checked_out.set()
+                await asyncio.sleep(60)
+
+        task = asyncio.create_task(send())
+        await checked_out.wait()
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertFalse(self.client.is_connected)
+        self.assertTrue(self.pool._idle.empty())
+
+    def test_backoff_grows_to_maximum(self):
+        self.assertTrue(15 <= backoff(1, 30, 3600) <= 30)
+        self.assertTrue(120 <= backoff(4, 30, 3600) <= 240)
+        self.assertTrue(1800 <= backoff(20, 30, 3600) <= 3600)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import sys
+sys.path.append('../')
+
+import unittest
+
+from starlette.requests import Request
+
+from src.services.etags import etag_matches, make_etag, not_modified
+
+
+def request(if_none_match: str | None = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+class TestETags(unittest.TestCase):
+
+    def test_make_etag(self):
+        self.assertEqual(make_etag(1, "a"), make_etag(1, "a"))
+        self.assertNotEqual(make_etag(1, "a"), make_etag(1, "b"))
+        self.assertNotEqual(make_etag("1\x1fa"), make_etag(1, "a\x1f"))
+        self.assertRegex(make_etag(1), r'^"[0-9a-f]{24}"$')
+
+    def test_etag_matches(self):
+        etag = make_etag(1)
+        self.assertTrue(etag_matches(request(etag), etag))
+        self.assertTrue(etag_matches(request(f'"other", W/{etag}'), etag))
+        self.assertTrue(etag_matches(request("*"), etag))
+        self.assertFalse(etag_matches(request('"other"'), etag))
+        self.assertFalse(etag_matches(request(), etag))
+        self.assertFalse(etag_matches(request("*"), None))
+
+    def test_not_modified(self):
+        response = not_modified('"abc"')
+        self.assertEqual((response.status_code, response.body, response.headers["etag"]), (304, b"", '"abc"'))
+
+
+if __name__ == '__main__':
+    unittest.main()
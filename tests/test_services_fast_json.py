@@ -0,0 +1,68 @@
+import sys
+sys.path.append('../')
+
+import json
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+from pydantic import ValidationError
+
+from src.entity.models import Contact
+from src.schemas.contacts import ContactResponse
+from src.services import fast_json
+
+
+def contacts():
+    return [Contact(id=i, firstname="Olena", lastname="Шевченко", email=f"o{i}@ex.com", mobilenamber="+380501112233",
+                    databirthday=datetime(1990, 5, 17), note='say "hi"') for i in range(1, 4)]
+
+
+class TestFastJson(unittest.TestCase):
+
+    def expected(self, contact):
+        return ContactResponse.model_validate(contact).model_dump(mode="json")
+
+    def setUp(self):
+        patcher = patch.object(fast_json.config, "JSON_FAST_PATH", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_orjson_matches_schema(self):
+        self.assertIsNotNone(fast_json.orjson)
+        self.assertTrue(fast_json.fast_path())
+        rows = contacts()
+        self.assertEqual(json.loads(fast_json.dump_contacts(rows)), [self.expected(row) for row in rows])
+        self.assertEqual(json.loads(fast_json.dump_contact(rows[0])), self.expected(rows[0]))
+
+    def test_adapter_fallback_matches_orjson(self):
+        rows = contacts()
+        fast = fast_json.dump_contacts(rows), fast_json.dump_contact(rows[0])
+        with patch.object(fast_json, "orjson", None):
+            self.assertEqual((fast_json.dump_contacts(rows), fast_json.dump_contact(rows[0])), fast)
+
+    def test_fast_path_is_opt_in(self):
+        with patch.object(fast_json.config, "JSON_FAST_PATH", False), \
+                patch.object(fast_json, "orjson") as orjson:
+            self.assertFalse(fast_json.fast_path())
+            fast_json.dump_contacts(contacts())
+        orjson.dumps.assert_not_called()
+
+    def test_null_required_field_is_rejected_on_both_paths(self):
+        self.assertIn("note", fast_json.REQUIRED_FIELDS)
+        rows = contacts()
+        rows[1].note = None
+        for enabled in (True, False):
+            with patch.object(fast_json.config, "JSON_FAST_PATH", enabled):
+                with self.assertRaises(ValidationError):
+                    fast_json.dump_contacts(rows)
+                with self.assertRaises(ValidationError):
+                    fast_json.dump_contact(rows[1])
+
+    def test_date_fields(self):
+        self.assertEqual(fast_json.DATE_FIELDS, ("databirthday",))
+        self.assertEqual(fast_json.contact_dict(contacts()[0])["databirthday"], date(1990, 5, 17))
+
+
+if __name__ == '__main__':
+    unittest.main()
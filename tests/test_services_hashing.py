@@ -0,0 +1,31 @@
+import unittest
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from src.services.hashing import PasswordHasher
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=4), max_workers=2, queue_limit=4)
+
+    async def test_hash_and_verify(self):
+        hashed = await self.hasher.hash("12345678")
+        self.assertTrue(await self.hasher.verify("12345678", hashed))
+        self.assertFalse(await self.hasher.verify("87654321", hashed))
+        stats = self.hasher.stats()
+        self.assertEqual(stats["completed"], 3)
+        self.assertEqual(stats["queue_depth"], 0)
+
+    async def test_rejects_when_queue_is_full(self):
+        self.hasher.queue_limit = 0
+        with self.assertRaises(HTTPException) as err:
+            await self.hasher.hash("12345678")
+        self.assertEqual(err.exception.status_code, 503)
+        self.assertEqual(self.hasher.stats()["rejected"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
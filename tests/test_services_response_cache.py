@@ -0,0 +1,95 @@
+import sys
+sys.path.append('../')
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import redis.asyncio as redis
+
+from src.services.response_cache import ResponseCache
+from tests.memory_redis import MemoryRedis
+
+
+class TestResponseCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = MemoryRedis()
+        self.cache = ResponseCache(self.redis, ttl=300, max_bytes=64)
+
+    def test_field_normalizes_params(self):
+        self.assertEqual(ResponseCache.field("contacts", {"offset": 0, "limit": 10, "cursor": None}),
+                         ResponseCache.field("contacts", {"limit": 10, "offset": 0}))
+        self.assertEqual(ResponseCache.field("by_name", {"firstname": "a&b=c"}), "by_name?firstname=a%26b%3Dc")
+
+    async def test_hit_after_store(self):
+        lookup = await self.cache.lookup(1, "contacts", {"limit": 10})
+        self.assertFalse(lookup.hit)
+        response = await lookup.store(b'[{"id":1}]', next_cursor="abc")
+        self.assertEqual(response.body, b'[{"id":1}]')
+
+        lookup = await self.cache.lookup(1, "contacts", {"limit": 10})
+        self.assertTrue(lookup.hit)
+        response = lookup.response()
+        self.assertEqual((response.body, response.headers["X-Next-Cursor"]), (b'[{"id":1}]', "abc"))
+        self.assertEqual(response.media_type, "application/json")
+        self.assertFalse((await self.cache.lookup(2, "contacts", {"limit": 10})).hit)
+        self.assertEqual(self.cache.stats()["endpoints"]["contacts"], {"hits": 1, "misses": 2, "hit_ratio": 0.3333})
+
+    async def test_invalidate_only_bumps_version(self):
+        await (await self.cache.lookup(1, "contacts", {})).store(b"[]")
+        await (await self.cache.lookup(1, "contact", {"id": 5})).store(b"{}")
+        version = self.redis.data["response_cache:version:1"]
+        await self.cache.invalidate(1)
+        self.assertEqual(int(self.redis.data["response_cache:version:1"]), int(version) + 1)
+        self.assertEqual(len(self.redis.data["response_cache:entries:1"]), 2)
+        self.assertFalse((await self.cache.lookup(1, "contacts", {})).hit)
+        self.assertFalse((await self.cache.lookup(1, "contact", {"id": 5})).hit)
+
+    async def test_write_during_query_leaves_entry_stale(self):
+        lookup = await self.cache.lookup(1, "contacts", {})
+        await self.cache.invalidate(1)
+        await lookup.store(b"[old]")
+        self.assertFalse((await self.cache.lookup(1, "contacts", {})).hit)
+
+    async def test_lost_version_restarts_above_old_ones(self):
+        with patch("src.services.response_cache.time.time_ns", return_value=1_000_000_000_000):
+            old = await self.cache.lookup(1, "contacts", {})
+            for _ in range(3):
+                await self.cache.invalidate(1)
+        self.redis.data.clear()
+        with patch("src.services.response_cache.time.time_ns", return_value=1_000_010_000_000):
+            new = await self.cache.lookup(1, "contacts", {})
+        self.assertGreater(int(new.version), int(old.version) + 3)
+        self.assertNotEqual(new.etag, old.etag)
+
+    async def test_nothing_is_stored_while_replicas_settle(self):
+        cache = ResponseCache(self.redis, ttl=300, max_bytes=64, settle_seconds=5)
+        await cache.invalidate(1)
+        lookup = await cache.lookup(1, "contacts", {})
+        self.assertIsNone(lookup.etag)
+        response = await lookup.store(b"[]")
+        self.assertNotIn("etag", response.headers)
+        self.assertNotIn("response_cache:entries:1", self.redis.data)
+
+        del self.redis.data["response_cache:settling:1"]
+        await (await cache.lookup(1, "contacts", {})).store(b"[]")
+        self.assertTrue((await cache.lookup(1, "contacts", {})).hit)
+
+    async def test_large_bodies_are_not_stored(self):
+        await (await self.cache.lookup(1, "contacts", {})).store(b"x" * 65)
+        self.assertNotIn("response_cache:entries:1", self.redis.data)
+
+    async def test_redis_errors_are_misses(self):
+        client = MagicMock()
+        client.pipeline.side_effect = redis.ConnectionError("down")
+        client.incr.side_effect = redis.ConnectionError("down")
+        cache = ResponseCache(client, ttl=300, max_bytes=64)
+        lookup = await cache.lookup(1, "contacts", {})
+        self.assertFalse(lookup.hit)
+        self.assertEqual((await lookup.store(b"[]")).body, b"[]")
+        await cache.invalidate(1)
+        self.assertEqual(cache.stats()["errors"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()